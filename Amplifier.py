@@ -1,39 +1,55 @@
+import Scpi
+from Log import log
 from socketInstrument import SocketInstrument
 
 
-class PaRsBBA150(SocketInstrument):
+class PaRsBBA150(Scpi.ScpiInstrument):
+    staticResponses = {
+        "*IDN?": "Rohde & Schwarz,simulated BBA150,102044,SW:01.96,FPGA:01.05",
+        "SENS:NFR?": "2600000000,5900000000",
+        "SENS:NPOW?": "47.7",
+        "SYST:ERR?": "Simulated error",
+        "CONT1:AMOD:FGA?": "47.7",
+    }
+
     def __init__(self):
         super().__init__()
         self.port = 5025  # According to R&S manual
+        self.powerUnit = "DBM"
+        self.noErrorResponse = self.staticResponses["SYST:ERR?"]
 
-    def responseFunction(self, command):
-        command = command.strip()
-
-        if command.upper() == "*IDN?":
-            return "Rohde & Schwarz,simulated BBA150,102044,SW:01.96,FPGA:01.05"
-
-        elif command.upper() == "SENS:NFR?":
-            return "2600000000,5900000000"
-
-        elif command.upper() == "UNIT:POW DBM":
+    def unknownCommand(self, programUnit):
+        header = programUnit.split()[0]
+        if header[-1] == "?":
+            return "example BBS150 response value for '%s'" % programUnit
+        else:
             return ""
 
-        elif command.upper() == "SENS:NPOW?":
-            return "47.7"
+    def setPowerUnit(self, parameters, suffixes):
+        self.powerUnit = parameters[0]
+        return ""
 
-        elif command.upper() == "SYST:ERR?":
-            return "Simulated error"
+    def getPowerUnit(self, parameters, suffixes):
+        return self.powerUnit
 
-        elif command.upper() == "CONT1:AMOD:FGA?":
-            return "47.7"
-
-        elif command[-1] == "?":
-            return "example BBS150 response value for '%s'" % command
-        else:
-            return ""
+    commandTree = Scpi.ScpiCommandTree(unknownCommand)
+    commandTree.add("*IDN?", Scpi.StaticQuery("*IDN?"))
+    commandTree.add("SENSe:NFRequency?", Scpi.StaticQuery("SENS:NFR?"))
+    commandTree.add("SENSe:NPOWer?", Scpi.StaticQuery("SENS:NPOW?"))
+    commandTree.add("SYSTem:ERRor[:NEXT]?", Scpi.ScpiInstrument.systemError)
+    commandTree.add("CONTrol#:AMODe:FGAin?", Scpi.StaticQuery("CONT1:AMOD:FGA?"))
+    commandTree.add("UNIT:POWer", setPowerUnit, [Scpi.discrete("DBM", "W")])
+    commandTree.add("UNIT:POWer?", getPowerUnit)
 
 
 class PaEmpower(SocketInstrument):
+    staticResponses = {
+        "IN?": "BBS3G6QHM",
+        "IM": " Empower RF Systems, Inc.",
+        "IS?": "4711",
+        "IV?": "4.2",
+    }
+
     def __init__(self):
         super().__init__()
         self.port = 5025  # According to R&S manual, guessing Empower has the same.
@@ -44,16 +60,9 @@ class PaEmpower(SocketInstrument):
     def responseFunction(self, command):
         command = command.strip()
 
-        if command == "IN?":
-            return "BBS3G6QHM"
-        elif command == "IM":
-            return " Empower RF Systems, Inc."
-
-        elif command == "IS?":
-            return "4711"
-
-        elif command == "IV?":
-            return "4.2"
+        response = self.staticResponses.get(command)
+        if response is not None:
+            return response
 
         elif command == "G?":
             return "%i" % self.gain*100
@@ -61,26 +70,26 @@ class PaEmpower(SocketInstrument):
         elif command.startswith("G"):
             g = int(float(command[1:]))
             self.gain = g/100.0
-            print("Gain is %d * 0.01 dB = %g dB." % (g, self.gain))
+            log.info("Gain is %d * 0.01 dB = %g dB.", g, self.gain)
             return ""
 
         elif command == "MA":
-            print("Setting mode to ALC")
+            log.info("Setting mode to ALC")
             self.mode = "ALC"
             return ""
 
         elif command == "MV":
-            print("Setting mode to VVA")
+            log.info("Setting mode to VVA")
             self.mode = "VVA"
             return ""
 
         elif command == "MS":
-            print("Standby")
+            log.info("Standby")
             self.active = False
             return ""
 
         elif command == "MO":
-            print("Active")
+            log.info("Active")
             self.active = True
             return ""
 
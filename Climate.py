@@ -1,10 +1,36 @@
-from socketInstrument import SocketInstrument
-import time
+import Clock
+from ClimateProgram import Profile
+from PlantModel import Lag, overshootProperty, plantProperty
+from socketInstrument import SocketInstrument, EncodedResponse
 
 
 class VotschBase(SocketInstrument):
-    def __init__(self):
+    # How the actual values follow the targets, see PlantModel. With time constants of 0,
+    # they are at the targets at once.
+    temperatureTimeConstant = 0.0  # Seconds
+    temperatureOvershootValue = 0.0  # Fraction of the step
+    temperatureOvershoot = overshootProperty('temperatureOvershootValue')
+    humidityTimeConstant = 0.0
+    humidityOvershootValue = 0.0
+    humidityOvershoot = overshootProperty('humidityOvershootValue')
+
+    actualTemperature = plantProperty('temperatureLag', 'temperatureTimeConstant', 'temperatureOvershoot')
+    actualHumidity = plantProperty('humidityLag', 'humidityTimeConstant', 'humidityOvershoot')
+
+    address = "$01"  # The ASCII-2 bus address, that each command starts with. See VotschBus.
+
+    # The I-command response is cached, and formatted again only when the state of the chamber has
+    # changed, or while its values change with time, when the time has moved on by the quantum.
+    stateVersion = 0  # Counts the changes of the attributes, see __setattr__.
+    actualValuesCache = None  # (state version, quantized time, response)
+    actualValuesTimeQuantum = 0.01  # Seconds
+    unversionedAttributes = frozenset(('command', 'stateVersion', 'actualValuesCache'))
+
+    def __init__(self, clock=None):
         super().__init__()
+        self.clock = Clock.clockFor(clock)
+        self.temperatureLag = Lag(0, self.clock.now())
+        self.humidityLag = Lag(0, self.clock.now())
         self.command = None
         self.port = 2049  # Vötsch standard port. According to Wikipedia, it's usually used for nfs.
         self.CcType = 'Vc'
@@ -16,14 +42,20 @@ class VotschBase(SocketInstrument):
         self.command = None
         self.bits = None
         self.currentWantedTemp = None
-        self.tempUp, self.tempDown = 0, 0
+        self.tempUp, self.tempDown = 0, 0  # Kelvin per minute, set by the $01U command
         self.humUp, self.humDown = 0, 0
-        self.rampStartTime = time.time()
-        self.tempStart = self.nominalTemp
+        self.temperatureProfile = None  # The setpoints while they ramp, see ClimateProgram.
+        self.humidityProfile = None
+        self.programStep = None  # The current step of a running program, see runProgram.
         self.chamberTempOffset = 3
         self.startBit = False
         self.humidityBit = False
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name not in self.unversionedAttributes:
+            object.__setattr__(self, 'stateVersion', self.stateVersion + 1)
+
     def setTempActual(self, temperature):
         self.actualTemperature = temperature
 
@@ -32,36 +64,96 @@ class VotschBase(SocketInstrument):
         return "%06.1f" % x
 
     def responseFunction(self, command):
+        if self.programStep is not None:
+            self.followProgram()
         command = command.strip()
         parts = command.split(" ")
         cmd = parts[0]
         self.command = cmd
-        if cmd == "$01I":
-            return self.getActualValues()
-        elif cmd == "$01?":
+        if cmd[:3] != self.address:
+            return "'" + command + "' is an unknown command."
+        letter = cmd[3:]
+        if letter == "I":
+            return self.actualValuesResponse()
+        elif letter == "?":
             return self.helpText()
-        elif cmd == "$01E":
+        elif letter == "E":
             return self.setTargetsCommand(parts)
 
-        elif cmd == "$01U":
+        elif letter == "U":
             return self.setSlopeCommand(parts[1:])
 
         else:
             return "'" + command + "' is an unknown command."
 
     def getMovingSetpoint(self):
-        if self.tempUp == 0 and self.tempDown == 0:
-            return self.nominalTemp
-        dtime = time.time() - self.rampStartTime
-        if self.tempUp > 0:
-            dtemp = self.tempUp/60 * dtime
-            movingSetpoint = self.tempStart + dtemp
-            return min(movingSetpoint, self.nominalTemp)
-        if self.tempDown > 0:
-            dtemp = - self.tempDown/60 * dtime
-            movingSetpoint = self.tempStart + dtemp
-            return min(movingSetpoint, self.nominalTemp)
-        raise ValueError("Values must be non-negative")
+        return self.setpoint(self.temperatureProfile, self.nominalTemp)
+
+    def getMovingHumiditySetpoint(self):
+        return self.setpoint(self.humidityProfile, self.nominalHumidity)
+
+    def setpoint(self, profile, nominalValue):
+        if profile is None:
+            return nominalValue
+        now = self.clock.now()
+        if now >= profile.endTime:
+            return nominalValue
+        return profile.valueAt(now)
+
+    def rampSetpoints(self, temperature, humidity):
+        """Make these the nominal values, and ramp the setpoints to them at the rates of the $01U command."""
+        now = self.clock.now()
+        temperatureNow, humidityNow = self.getMovingSetpoint(), self.getMovingHumiditySetpoint()
+        self.programStep = None
+        self.temperatureProfile = Profile.ramp(now, temperatureNow, temperature,
+                                               self.tempUp if temperature > temperatureNow else self.tempDown)
+        self.humidityProfile = Profile.ramp(now, humidityNow, humidity,
+                                            self.humUp if humidity > humidityNow else self.humDown)
+        self.nominalTemp, self.nominalHumidity = temperature, humidity
+
+    def runProgram(self, program):
+        """Run a ClimateProgram.Program, from the current setpoints. An E-command stops it."""
+        self.temperatureProfile, self.humidityProfile = program.profiles(
+            self.clock.now(), self.getMovingSetpoint(), self.getMovingHumiditySetpoint())
+        self.programStep = -1
+        self.followProgram()
+        self.approachNominalValues()
+
+    def followProgram(self):
+        """Make the nominal values those of the current step of the program, as if set by an E-command.
+        The actual values already follow the whole program, see approachNominalValues."""
+        now = self.clock.now()
+        step = self.temperatureProfile.pointBefore(now)
+        if step == self.programStep:
+            return
+        self.programStep = None if now >= self.temperatureProfile.endTime else step
+        self.nominalTemp = self.temperatureProfile.targetAt(now)
+        self.nominalHumidity = self.humidityProfile.targetAt(now)
+
+    def actualValuesResponse(self):
+        """The response to the I-command, from the cache if it can't have changed."""
+        now = self.clock.now()
+        if now >= self.changesUntil():
+            timeKey = None
+        elif self.actualValuesTimeQuantum > 0:
+            timeKey = now // self.actualValuesTimeQuantum
+        else:
+            timeKey = now
+        cache = self.actualValuesCache
+        if cache is not None and cache[0] == self.stateVersion and cache[1] == timeKey:
+            return cache[2]
+        response = EncodedResponse(self.getActualValues(), self.responseEOL)
+        self.actualValuesCache = (self.stateVersion, timeKey, response)
+        return response
+
+    def changesUntil(self):
+        """The time until which the values of the I-command change, with the time alone."""
+        times = [self.temperatureLag.settledAt(self.temperatureTimeConstant),
+                 self.humidityLag.settledAt(self.humidityTimeConstant)]
+        for profile in (self.temperatureProfile, self.humidityProfile):
+            if profile is not None:
+                times.append(profile.endTime)
+        return max(times)
 
     def getActualValues(self):
         # Depending on Vötsch model, the format is different.
@@ -78,6 +170,21 @@ class VotschBase(SocketInstrument):
     def chamberTempOffsetFunc(self):
         return self.chamberTempOffset
 
+    def followSetpoint(self, lag, profile, nominalValue, offset, timeConstant, overshoot):
+        """Make lag follow the moving setpoint of profile plus offset, or once the profile has ended,
+        nominalValue plus offset."""
+        now = self.clock.now()
+        if profile is None or now >= profile.endTime:
+            lag.setTarget(nominalValue + offset, now, timeConstant, overshoot)
+        else:
+            lag.follow(profile, offset, now, timeConstant, overshoot)
+
+    def approachNominalValues(self):
+        self.followSetpoint(self.temperatureLag, self.temperatureProfile, self.nominalTemp,
+                            self.chamberTempOffsetFunc(), self.temperatureTimeConstant, self.temperatureOvershoot)
+        self.followSetpoint(self.humidityLag, self.humidityProfile, self.nominalHumidity, 5,
+                            self.humidityTimeConstant, self.humidityOvershoot)
+
     # @abstractmethod
     def setTargetsCommand(self, command):
         raise NotImplementedError
@@ -93,7 +200,7 @@ class VotschBase(SocketInstrument):
                 if not (hu == 0 or hd == 0):  # Only one slope parameter can be active at a time
                     raise ValueError
                 self.tempUp, self.tempDown, self.humUp, self.humDown = tu, td, hu, hd
-                self.rampStartTime = time.time()
+                self.rampSetpoints(self.nominalTemp, self.nominalHumidity)
                 return "0"
             except ValueError:
                 return ""
@@ -106,10 +213,12 @@ class VotschBase(SocketInstrument):
         hbit = "1" if humidity else "0"
         return "0" + tbit + hbit + 29 * "0"
 
-    def helpText(self):
-        return """ASCII description of the protocol
+    helpResponse = EncodedResponse("""ASCII description of the protocol
 Contains multiple lines
-        """
+        """)
+
+    def helpText(self):
+        return self.helpResponse
 
 
 class Vc37060(VotschBase):
@@ -119,22 +228,20 @@ class Vc37060(VotschBase):
     I-command: 14 decimal numbers, 32 bits
     """
 
-    def __init__(self):
+    def __init__(self, clock=None):
         """Initialize a Vc3 7060 chamber object"""
-        super().__init__()
+        super().__init__(clock)
         self.CcType = 'Vc'
 
+    actualValuesFormat = " ".join(5 * ["%06.1f"] + 9 * ["0000.0"]) + " " + 32 * "0"
+
     def getActualValues(self):
-        # noinspection PyPep8
-        pp = [self.getMovingSetpoint(), self.actualTemperature, self.nominalHumidity, self.actualHumidity, self.fanSpeed] \
-             + 9*[0]
-        values = [self.decimal(part) for part in pp]
-        response = " ".join(values) + " " + 32 * "0"
-        return response
+        return self.actualValuesFormat % (self.getMovingSetpoint(), self.actualTemperature,
+                                          self.getMovingHumiditySetpoint(), self.actualHumidity, self.fanSpeed)
 
-    def helpText(self):
-        # noinspection PyPep8
-        helptext = """Simulated Vc3 7060 climate chamber.
+    # The help text is long, so it is joined and encoded only once.
+    # noinspection PyPep8
+    helpResponse = EncodedResponse("\r\n".join("""Simulated Vc3 7060 climate chamber.
 STANDARD ASCII 2 PROTOCOL FOR E-STRING AND CHAMBERS WITH 2 CONTROLLED VALUES  
 EXAMPLE OF AN ASCII E-STRING 
 $01E CV01 CV02 SV01 MV01 MV02 MV03 MV04 DO00 DO01 DO02 DO17 DO18 DO19 DO20 DO21 DO22 DO23 DO24 DO25 DO26 DO27 DO28 DO29 DO30 DO31 <CR>
@@ -238,17 +345,13 @@ EXAMPLE OF AN ASCII I-STRING
 $01I<CR>
 0050.0 0024.6 0080.0 0066.7 0090.0 0090.0 0000.0 0023.8 0000.0 0022.2 0000.0 0025.5 0000.0 0024.4 01100000000000000000000000000000<CR>
 
-        """
-        return "\r\n".join(helptext.splitlines())
+        """.splitlines()))
 
     def setTargetsCommand(self, parts):
         self.command = parts[0]
 
-        self.tempStart = self.nominalTemp
-        self.nominalTemp = float(parts[1])
-        self.actualTemperature = self.nominalTemp + self.chamberTempOffsetFunc()
-        self.nominalHumidity = float(parts[2])
-        self.actualHumidity = self.nominalHumidity + 5
+        self.rampSetpoints(float(parts[1]), float(parts[2]))
+        self.approachNominalValues()
         self.fanSpeed = float(parts[3])
         # four unused parts
         float(parts[4])
@@ -261,7 +364,30 @@ $01I<CR>
 
         return "0"
 
-class Vt37060ExtCab(Vc37060):
+
+class ExternalCabinet:
+    """The actual temperature of the external cabinet of a chamber, which follows the temperature
+    setpoint plus extCabinetTempOffset. For a subclass of VotschBase."""
+
+    cabinetTimeConstant = 0.0
+    cabinetOvershootValue = 0.0
+    cabinetOvershoot = overshootProperty('cabinetOvershootValue')
+    actualCabinetTemp = plantProperty('cabinetLag', 'cabinetTimeConstant', 'cabinetOvershoot')
+
+    def __init__(self, clock=None):
+        super().__init__(clock)
+        self.cabinetLag = Lag(0, self.clock.now())
+
+    def approachNominalValues(self):
+        super().approachNominalValues()
+        self.followSetpoint(self.cabinetLag, self.temperatureProfile, self.nominalTemp, self.extCabinetTempOffset,
+                            self.cabinetTimeConstant, self.cabinetOvershoot)
+
+    def changesUntil(self):
+        return max(super().changesUntil(), self.cabinetLag.settledAt(self.cabinetTimeConstant))
+
+
+class Vt37060ExtCab(ExternalCabinet, Vc37060):
     """The Vt37060ExtCab is a modified Vt3 7060 with external cabinet. The main chamber
     has two large holes in the side, to which air ducts to the external cabinet can be connected.
     The number of parameters of the E-command a I-command are (see help text)
@@ -272,11 +398,10 @@ class Vt37060ExtCab(Vc37060):
     # TODO: Verify that all known physical Vt37060ExtCab have the same command syntax
     #
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, clock=None):
+        super().__init__(clock)
         self.extCabinetTempOffset = 0.3
         self.chamberTempOffset = 4.0
-        self.actualCabinetTemp = 0
 
     def getActualValues(self):
         """The I-command response contains the following numbers:
@@ -299,19 +424,16 @@ class Vt37060ExtCab(Vc37060):
 [16] bits DO00 .. DO31
         """
 
-        parameters = [self.getMovingSetpoint(), self.actualTemperature,
-              self.getMovingSetpoint(), self.actualCabinetTemp,
-              0, 0, # CV03 values, exernal and unused
-              self.fanSpeed] \
-             + 9*[0]
-        values = [self.decimal(parameter) for parameter in parameters]
+        setpoint = self.getMovingSetpoint()
+        # CV03 values are external and unused.
         # TODO: Replace bits with actual values
-        response = " ".join(values) + " " + self.makeBits(self.startBit, self.humidityBit)
-        return response
+        return self.actualValuesFormat % (setpoint, self.actualTemperature, setpoint, self.actualCabinetTemp,
+                                          0, 0, self.fanSpeed, self.startBit, self.humidityBit)
 
-    def helpText(self):
-        # noinspection PyPep8
-        helptext = """Simulated Vc3 7060 climate chamber with external cabinet
+    actualValuesFormat = " ".join(7 * ["%06.1f"] + 9 * ["0000.0"]) + " 0%d%d" + 29 * "0"
+
+    # noinspection PyPep8
+    helpResponse = EncodedResponse("\r\n".join("""Simulated Vc3 7060 climate chamber with external cabinet
 ASCII-2 PROTOCOL CONFIGURATION
 
 Example of an ASCII E-String:
@@ -416,8 +538,7 @@ DO31  unused
 --------------------------------------------------------------------------------
 Configured Messages:
 none
-"""
-        return "\r\n".join(helptext.splitlines())
+""".splitlines()))
 
     def setTargetsCommand(self, parts):
         """Interpretation of the E-command
@@ -438,12 +559,8 @@ There are 9 decimal numbers, starting with [1]
         try:
             self.command = parts[0]
 
-            self.tempStart = self.nominalTemp
-            self.nominalTemp = float(parts[1])
-            self.actualTemperature = self.nominalTemp + self.chamberTempOffset
-            self.actualCabinetTemp = self.nominalTemp + self.extCabinetTempOffset
-            self.nominalHumidity = float(parts[2])
-            self.actualHumidity = self.nominalHumidity + 5
+            self.rampSetpoints(float(parts[1]), float(parts[2]))
+            self.approachNominalValues()
             self.fanSpeed = float(parts[4])
             # five unused parts
             float(parts[5])
@@ -460,7 +577,7 @@ There are 9 decimal numbers, starting with [1]
         except IndexError:
             return "bad command, too short"
 
-class Vt37060ExtCabOttawa(Vc37060):
+class Vt37060ExtCabOttawa(ExternalCabinet, Vc37060):
     """The Vt37060ExtCab is a modified Vt3 7060 with external cabinet. The main chamber
     has two large holes in the side, to which air ducts to the external cabinet can be connected.
     The number of parameters of the E-command a I-command are (see help text)
@@ -471,11 +588,10 @@ class Vt37060ExtCabOttawa(Vc37060):
     # TODO: Verify that all known physical Vt37060ExtCab have the same command syntax
     #
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, clock=None):
+        super().__init__(clock)
         self.extCabinetTempOffset = 0.3
         self.chamberTempOffset = 4.0
-        self.actualCabinetTemp = 0
 
     def getActualValues(self):
         """The I-command response contains the following numbers:
@@ -496,18 +612,15 @@ class Vt37060ExtCabOttawa(Vc37060):
 [14] bits DO00 .. DO31
         """
 
-        parameters = [self.getMovingSetpoint(), self.actualTemperature,
-              self.getMovingSetpoint(), self.actualCabinetTemp,
-              self.fanSpeed, self.fanSpeed] \
-             + 8*[0]
-        values = [self.decimal(parameter) for parameter in parameters]
+        setpoint = self.getMovingSetpoint()
         # TODO: Replace bits with actual values
-        response = " ".join(values) + " " + self.makeBits(self.startBit, self.humidityBit)
-        return response
+        return self.actualValuesFormat % (setpoint, self.actualTemperature, setpoint, self.actualCabinetTemp,
+                                          self.fanSpeed, self.fanSpeed, self.startBit, self.humidityBit)
 
-    def helpText(self):
-        # noinspection PyPep8
-        helptext = """Simulated Vc3 7060 climate chamber with external cabinet, in Ottawa
+    actualValuesFormat = " ".join(6 * ["%06.1f"] + 8 * ["0000.0"]) + " 0%d%d" + 29 * "0"
+
+    # noinspection PyPep8
+    helpResponse = EncodedResponse("\r\n".join("""Simulated Vc3 7060 climate chamber with external cabinet, in Ottawa
 ASCII-2 PROTOCOL CONFIGURATION
 
 Example of an ASCII E-String:
@@ -610,8 +723,7 @@ DO31  unused
 --------------------------------------------------------------------------------
 Configured Messages:
 none
-"""
-        return "\r\n".join(helptext.splitlines())
+""".splitlines()))
 
     def setTargetsCommand(self, parts):
         """Interpretation of the E-command
@@ -632,12 +744,8 @@ There are 9 decimal numbers, starting with [1]
         try:
             self.command = parts[0]
 
-            self.tempStart = self.nominalTemp
-            self.nominalTemp = float(parts[1])
-            self.actualTemperature = self.nominalTemp + self.chamberTempOffset
-            self.actualCabinetTemp = self.nominalTemp + self.extCabinetTempOffset
-            self.nominalHumidity = float(parts[2])
-            self.actualHumidity = self.nominalHumidity + 5
+            self.rampSetpoints(float(parts[1]), float(parts[2]))
+            self.approachNominalValues()
             self.fanSpeed = float(parts[3])
             # five unused parts
             float(parts[5])
@@ -651,3 +759,46 @@ There are 9 decimal numbers, starting with [1]
             return "0"
         except IndexError:
             return "bad command, too short"
+
+
+chamberTypes = {
+    'Vc37060': Vc37060,
+    'Vt37060ExtCab': Vt37060ExtCab,
+    'Vt37060ExtCabOttawa': Vt37060ExtCabOttawa,
+}
+
+
+class VotschBus(SocketInstrument):
+    """Several chambers on one ASCII-2 bus, served on one port. Each chamber has its own address,
+    $01 to $32, and its own state. A command is passed on to the chamber at its address."""
+    maxAddress = 32
+
+    def __init__(self, chambers=()):
+        super().__init__()
+        self.port = 2049
+        self.chambers = {}  # By address, such as "$01"
+        for number, chamber in enumerate(chambers, 1):
+            self.connect(chamber, number)
+
+    @classmethod
+    def ofTypes(cls, typeNames, clock=None):
+        """A bus with chambers of the named types, see chamberTypes, at the addresses $01, $02, ..."""
+        for typeName in typeNames:
+            if typeName not in chamberTypes:
+                raise ValueError("Unknown chamber type %s" % typeName)
+        return cls([chamberTypes[typeName](clock) for typeName in typeNames])
+
+    def connect(self, chamber, number):
+        if not 1 <= number <= self.maxAddress:
+            raise ValueError("The bus addresses are 1 to %d" % self.maxAddress)
+        chamber.address = "$%02d" % number
+        self.chambers[chamber.address] = chamber
+
+    def chamber(self, number):
+        return self.chambers["$%02d" % number]
+
+    def responseFunction(self, command):
+        chamber = self.chambers.get(command.lstrip()[:3])
+        if chamber is None:
+            return "'" + command.strip() + "' is an unknown command."
+        return chamber.responseFunction(command)
@@ -0,0 +1,95 @@
+"""
+Climate programs: setpoints that ramp and hold over time, as the chambers run them.
+
+A Profile is a setpoint that changes linearly between points (time, value). The point at or before a
+time is found by bisection, and the point of the last lookup is remembered, so polling is O(1), and
+any lookup O(log n), also in programs with thousands of steps.
+
+A Program is a list of steps, each with a duration in seconds, and the temperature, and optionally
+the humidity, to ramp to during the step. A step to the same values is a hold, and a step with
+duration 0 is a jump. Programs are read from TOML, JSON or YAML files, see instruments/ClimateCycle.toml:
+
+    [[steps]]
+    duration = 600
+    temperature = 40
+    humidity = 80
+"""
+import bisect
+
+from GenericInstrument import parseDescription
+
+
+class Profile:
+    __slots__ = ('times', 'values', 'index')
+
+    def __init__(self, times, values):
+        self.times = times
+        self.values = values
+        self.index = 0
+
+    @classmethod
+    def ramp(cls, startTime, startValue, target, ratePerMinute):
+        """From startValue to target, at ratePerMinute. Without a rate, the target is reached at once."""
+        if ratePerMinute <= 0 or startValue == target:
+            return cls([startTime], [target])
+        duration = abs(target - startValue) / ratePerMinute * 60
+        return cls([startTime, startTime + duration], [startValue, target])
+
+    @property
+    def endTime(self):
+        return self.times[-1]
+
+    def pointBefore(self, t):
+        """The index of the last point at or before t, or 0 before the first."""
+        i = self.index
+        times = self.times
+        if t < times[i] or (i + 1 < len(times) and t >= times[i + 1]):
+            i = self.index = max(0, bisect.bisect_right(times, t) - 1)
+        return i
+
+    def valueAt(self, t):
+        times = self.times
+        if t < times[0]:
+            return self.values[0]
+        i = self.pointBefore(t)
+        if i + 1 == len(times):
+            return self.values[i]
+        v0, v1 = self.values[i], self.values[i + 1]
+        return v0 + (v1 - v0) * (t - times[i]) / (times[i + 1] - times[i])
+
+    def targetAt(self, t):
+        """The value at the end of the ramp or hold at t."""
+        return self.values[min(self.pointBefore(t) + 1, len(self.values) - 1)]
+
+
+class Program:
+    def __init__(self, steps):
+        self.steps = steps  # (duration, temperature, humidity), with humidity None to keep it.
+
+    @classmethod
+    def fromDescription(cls, description):
+        return cls([(float(step['duration']), float(step['temperature']),
+                     None if step.get('humidity') is None else float(step['humidity']))
+                    for step in description['steps']])
+
+    @property
+    def duration(self):
+        return sum(step[0] for step in self.steps)
+
+    def profiles(self, startTime, temperature, humidity):
+        """The temperature and humidity setpoints, when the program is started at startTime from these values."""
+        times, temperatures, humidities = [startTime], [temperature], [humidity]
+        t = startTime
+        for duration, temperature, stepHumidity in self.steps:
+            if duration < 0:
+                raise ValueError("A program step has a negative duration")
+            t += duration
+            times.append(t)
+            temperatures.append(temperature)
+            humidities.append(humidities[-1] if stepHumidity is None else stepHumidity)
+        return Profile(times, temperatures), Profile(times, humidities)
+
+
+def loadProgram(path):
+    with open(path, 'rb') as f:
+        return Program.fromDescription(parseDescription(path, f.read()))
@@ -0,0 +1,56 @@
+"""
+The time that the simulated instruments see.
+
+Every time-dependent behavior reads the time from a clock object, instead of calling
+time.time() itself. The default is monotonic real time, which doesn't jump when the wall
+clock is adjusted. A ScaledClock makes simulated time run faster, so that a 90 degree turn
+or an 8 hour climate ramp takes a fraction of the real time, and a SteppedClock only moves
+when it is told to, which makes tests independent of real time.
+
+Behaviors take the default clock when they are created, so it must be set before that,
+as socketMain does with --time-scale.
+"""
+import time
+
+
+class RealClock:
+    @staticmethod
+    def now():
+        return time.monotonic()
+
+
+class ScaledClock:
+    """Simulated time runs factor times faster than real time."""
+
+    def __init__(self, factor):
+        self.factor = factor
+        self.realStart = time.monotonic()
+
+    def now(self):
+        return self.realStart + (time.monotonic() - self.realStart) * self.factor
+
+
+class SteppedClock:
+    """Simulated time that only moves with advance()."""
+
+    def __init__(self, start=0.0):
+        self.time = start
+
+    def now(self):
+        return self.time
+
+    def advance(self, seconds):
+        self.time += seconds
+
+
+defaultClock = RealClock()
+
+
+def setDefaultClock(clock):
+    global defaultClock
+    defaultClock = clock
+
+
+def clockFor(clock=None):
+    """The given clock, or the default clock if none is given."""
+    return clock if clock is not None else defaultClock
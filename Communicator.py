@@ -1,7 +1,12 @@
+import asyncio
+import logging
 import socket
 import time
 from abc import abstractmethod
 
+from Framing import CommandFramer, defaultTerminators
+from Log import log
+
 
 class Communicator:
 
@@ -10,24 +15,41 @@ class Communicator:
         pass
 
 
+printableTable = str.maketrans({'\r': '<CR>', '\n': '<LF>'})
+
+
 def toPrintable(unpretty):
-    result = ""
-    for char in unpretty:
-        if char == '\r':
-            result += '<CR>'
-        elif char == '\n':
-            result += '<LF>'
-        else:
-            result += char
-    return result
+    return unpretty.translate(printableTable)
+
+
+class EncodedResponse(str):
+    """A constant response, encoded once together with its end of line.
+
+    It is still a str, so it compares equal to the plain response text, but the communicators
+    send the encoded form as it is, without formatting or encoding it again.
+    """
+
+    def __new__(cls, text, eol="\r"):
+        self = super().__new__(cls, text)
+        self.encoded = bytes(text + eol, 'utf-8')
+        return self
 
 
 class SocketCommunicator(Communicator):
+    # Settings are class attributes, shared by all communicators unless set on one.
+    responseEOL = "\r"
+    maxLineLength = 4096
 
-    def __init__(self, resp_function):
+    def __init__(self, resp_function, inputTerminators=defaultTerminators):
         self.port = 2049  # TODO: Take the socket number from the behavior model.
-        self.responseEOL = "\r"
         self.responseFunction = resp_function
+        self.inputTerminators = inputTerminators
+        self.commandCount = 0  # Commands received, for the command rate of the instrument.
+
+    metrics = None  # Metrics.InstrumentMetrics, when the metrics are served.
+
+    def makeFramer(self):
+        return CommandFramer(self.inputTerminators, self.maxLineLength)
 
     def start(self):
         # DONE: se till att avslutning fungerar snyggare, utan felmeddelanden till terminalen
@@ -35,45 +57,203 @@ class SocketCommunicator(Communicator):
 
         HOST = ''  # Symbolic name meaning all available interfaces
         PORT = self.port
-        print("port is ", PORT)
+        log.info("port is %d", PORT)
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             s.bind((HOST, PORT))
             s.listen(1)
             while True:
                 conn, addr = s.accept()
-                print('Connected by', addr, "\n")
+                log.info("Connected by %s", addr)
                 with conn:
                     self.serveForever(conn)
-                print("Exited 'with conn'")
+                log.info("Connection closed")
 
-    # TODO: Make this work correctly for a real stream, not just strings ended by CRLF
     def serveForever(self, conn):
-        loopCount = 0
+        framer = self.makeFramer()
         while True:
-            data = conn.recv(1024) # TODO: Read one character at a time, and sum up the resulting string/list
-            print("%d: '%s'" % (loopCount, data.decode('utf-8')))
-            loopCount += 1
-            try:
-                receivedCommand = data.decode('utf-8')
-            except UnicodeDecodeError:
-                print("UnicodeDecodeError")
-                continue
-            receivedText = receivedCommand.strip()
-            if not data:
-                print(".", end='', flush=True)
+            n = conn.recv_into(framer.receiveView())
+            if not n:
                 time.sleep(0.1)  # Sleep for 100 ms before continuing
                 # TODO: See if there is a better way to wait for commands without choking the CPU.
                 break
-            print("Received: '%s'" % toPrintable(receivedText))
-            r = self.responseFunction(data.decode('utf-8'))
+            if self.metrics is not None:
+                self.metrics.bytesReceived += n
+            response = self.responsesFor(framer.received(n))
+            if response:
+                conn.sendall(response)
+                if self.metrics is not None:
+                    self.metrics.bytesSent += len(response)
+
+    def responsesFor(self, commands):
+        """Return the responses to all commands, joined in the order the commands came.
+        A command whose response function raises is logged, and gets no response."""
+        self.commandCount += len(commands)
+        responses = []
+        for command in commands:
+            try:
+                response = self.responseFor(command)
+            except Exception:
+                log.exception("Error in the response to '%s'", toPrintable(command.strip()))
+                continue
+            if response:
+                responses.append(response)
+        return b"".join(responses)
+
+    def responseFor(self, receivedCommand):
+        """Return the encoded response to one command, or None if nothing should be sent."""
+        logCommands = log.isEnabledFor(logging.DEBUG)
+        if logCommands:
+            log.debug("Received: '%s'", toPrintable(receivedCommand.strip()))
+        metrics = self.metrics
+        if metrics is not None:
+            startTime = time.perf_counter_ns()
+        r = self.responseFunction(receivedCommand)
+        if metrics is not None:
+            dispatchedTime = time.perf_counter_ns()
+        response = self.encode(r)
+        if metrics is not None:
+            metrics.countCommand(receivedCommand.strip(), dispatchedTime - startTime,
+                                 time.perf_counter_ns() - dispatchedTime)
+        if logCommands and response is not None:
+            log.debug("Sent:     '%s' (length: %d)", toPrintable(str(r).strip()), len(response))
+        return response
+
+    def encode(self, r):
+        """The response to send, or None if nothing should be sent."""
+        # Don't send empty responses.
+        if not r:
+            return None
+        # The response function can return bytes, or an EncodedResponse, ready to be sent, including EOL.
+        if type(r) is EncodedResponse:
+            response = r.encoded
+        elif isinstance(r, bytes):
+            response = r
+        else:
             response = bytes(r + self.responseEOL,
                              'utf-8')  # At least Vötsch doesn't send LF after response string.
-            # TODO: Use a configurable post-response string that can be overridden.
+        # TODO: Use a configurable post-response string that can be overridden.
+        return response
 
-            # Don't send empty responses.
-            if r:
-                # TODO: Don't print embedded CR characters on the same lime as the length info.
-                print("Sent:     '%s' (length: %d)" % (r.strip(), len(response)))
-                print()
-                conn.sendall(response)
+
+class AsyncSocketCommunicator(SocketCommunicator):
+    """Serve any number of concurrent clients on one port, using asyncio.
+
+    Each connection gets a reader task, which calls the response function, and a writer task,
+    which sends the responses. A client that is slow to read its responses only stalls its own
+    tasks, never those of other connections.
+    The blocking SocketCommunicator is still available as a fallback.
+    """
+    backlog = 100
+    maxQueuedResponses = 100  # Per connection. The reader waits when the writer is this far behind.
+
+    def start(self):
+        log.info("port is %d", self.port)
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+
+    def openListeningSocket(self):
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind(('', self.port))
+        s.listen(self.backlog)
+        s.setblocking(False)
+        return s
+
+    async def serve(self, listeningSocket=None):
+        """Accept connections until cancelled. Each connection is served by its own task."""
+        if listeningSocket is None:
+            listeningSocket = self.openListeningSocket()
+        loop = asyncio.get_running_loop()
+        connectionTasks = set()
+        with listeningSocket:
+            try:
+                while True:
+                    conn, addr = await loop.sock_accept(listeningSocket)
+                    log.info("Connected by %s", addr)
+                    task = asyncio.create_task(self.serveConnection(conn))
+                    connectionTasks.add(task)
+                    task.add_done_callback(connectionTasks.discard)
+            finally:
+                for task in list(connectionTasks):
+                    task.cancel()
+
+    async def serveConnection(self, conn):
+        conn.setblocking(False)
+        if self.metrics is not None:
+            self.metrics.connections += 1
+        responses = asyncio.Queue(self.maxQueuedResponses)
+        reader = asyncio.create_task(self.readCommands(conn, responses))
+        writer = asyncio.create_task(self.writeResponses(conn, responses))
+        try:
+            await asyncio.wait({reader, writer}, return_when=asyncio.FIRST_COMPLETED)
+            if reader.done():
+                await responses.put(None)  # Let the writer send what is queued, then stop.
+                await writer
+            else:
+                reader.cancel()  # The client can no longer receive responses.
+        finally:
+            reader.cancel()
+            writer.cancel()
+            conn.close()
+            if self.metrics is not None:
+                self.metrics.connections -= 1
+        log.info("Connection closed")
+
+    async def readCommands(self, conn, responses):
+        loop = asyncio.get_running_loop()
+        framer = self.makeFramer()
+        while True:
+            try:
+                n = await loop.sock_recv_into(conn, framer.receiveView())
+            except ConnectionError:
+                return
+            if not n:
+                return
+            metrics = self.metrics
+            if metrics is None:
+                commands = framer.received(n)
+            else:
+                metrics.bytesReceived += n
+                startTime = time.perf_counter_ns()
+                commands = framer.received(n)
+                metrics.latencies['decode'].record(time.perf_counter_ns() - startTime)
+            response = self.responsesFor(commands)
+            if response:
+                await responses.put(response)
+
+    async def writeResponses(self, conn, responses):
+        loop = asyncio.get_running_loop()
+        while True:
+            response = await responses.get()
+            if response is None:
+                return
+            metrics = self.metrics
+            startTime = time.perf_counter_ns() if metrics is not None else 0
+            try:
+                await loop.sock_sendall(conn, response)
+            except ConnectionError:
+                return
+            if metrics is not None:
+                metrics.latencies['send'].record(time.perf_counter_ns() - startTime)
+                metrics.bytesSent += len(response)
+
+
+def serveAll(communicators, listeningSockets=None):
+    """Serve several AsyncSocketCommunicators, each on its own port, from one event loop."""
+    if listeningSockets is None:
+        for communicator in communicators:
+            log.info("port is %d", communicator.port)
+    try:
+        asyncio.run(serveTogether(communicators, listeningSockets))
+    except KeyboardInterrupt:
+        pass
+
+
+async def serveTogether(communicators, listeningSockets=None):
+    if listeningSockets is None:
+        # All ports are opened before any is served, so that a port in use stops the whole bench.
+        listeningSockets = [communicator.openListeningSocket() for communicator in communicators]
+    await asyncio.gather(*(communicator.serve(s) for communicator, s in zip(communicators, listeningSockets)))
@@ -0,0 +1,80 @@
+"""
+Fleet mode: many instances of the same instruments, on consecutive ports, for scale tests.
+
+    python3 socketMain.py NCD:20000 Vc37060:30000 --fleet 1000
+
+serves 1000 NCDs on ports 20000-20999 and 1000 climate chambers on ports 30000-30999, all from one
+process. In a topology file, an instrument with count = 1000 is expanded in the same way.
+
+An instance must not need more memory than its budget below, which tests/fleet_test.py checks.
+To keep instances small, settings and static responses are class attributes shared by all instances,
+and the devices of the positioners have __slots__.
+"""
+import gc
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Not on Windows.
+
+# Bytes per instance, communicator and devices included, as measured by memoryPerInstance on CPython 3.11.
+memoryBaselines = {
+    'NCD': 1070,
+    'RotaryDisc': 1190,
+    'Vc37060': 650,  # Not counting the cached I-command response, which is about 400 bytes when polled.
+    'BBA150': 360,
+}
+# The sizes of objects and their dicts change between Python versions by some percent, and the budget
+# must not fail on that. A new per-instance list or dict, or a device without __slots__, takes more.
+memoryTolerance = 0.25
+memoryBudgets = {typeName: round(baseline * (1 + memoryTolerance)) for typeName, baseline in memoryBaselines.items()}
+
+
+def expand(specifications, count=1):
+    """Replace each specification with count of them, or as many as its own count, with consecutive ports
+    from its port and numbered names."""
+    expanded = []
+    for specification in specifications:
+        n = specification.get('count', count)
+        if n == 1:
+            expanded.append(specification)
+            continue
+        port = specification.get('port')
+        if port is None:
+            raise ValueError("%d instruments of type %s need a first port, as in %s:20000"
+                             % (n, specification['type'], specification['type']))
+        if port and port + n - 1 > 65535:
+            raise ValueError("The ports of %d instruments from %d go past 65535" % (n, port))
+        name = specification.get('name', specification['type'])
+        for i in range(n):
+            instance = dict(specification, name="%s-%d" % (name, i), port=port + i if port else 0)
+            instance.pop('count', None)
+            expanded.append(instance)
+    return expanded
+
+
+def memoryPerInstance(makeInstrument, specification, count=200):
+    """The memory that an instrument takes, in bytes, as the average over count instances."""
+    makeInstrument(specification)  # Anything that is created once, such as imported modules, isn't counted.
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        instruments = [makeInstrument(specification) for _ in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del instruments
+    return (after - before) / count
+
+
+def raiseOpenFileLimit(needed):
+    """Raise the limit on open files, if it is lower than needed and the hard limit allows it.
+    Each instrument has a listening socket, and each connection to it is one more file."""
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        newLimit = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (newLimit, hard))
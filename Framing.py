@@ -0,0 +1,87 @@
+"""
+Split a stream of bytes from a client into commands.
+
+A TCP stream has no message boundaries. One recv can hold several pipelined commands,
+or only a part of one. The CommandFramer collects the bytes, and hands out one command
+for each input terminator it finds.
+
+The bytes are received straight into a buffer that is allocated once per connection,
+with recv_into(framer.receiveView()), followed by framer.received(n). Terminators are
+searched for in that buffer, and each complete command is decoded exactly once.
+"""
+import re
+
+defaultTerminators = (b"\r\n", b"\r", b"\n")
+
+nonAsciiPattern = re.compile(b"[\x80-\xff]")
+
+
+class CommandFramer:
+    def __init__(self, terminators=defaultTerminators, maxLineLength=4096, receiveSize=4096):
+        # Longest first, so that CRLF is taken as one terminator, not as CR followed by an empty line.
+        ordered = sorted(set(terminators), key=len, reverse=True)
+        self.terminatorPattern = re.compile(b"|".join(re.escape(t) for t in ordered))
+        self.terminatorOverlap = len(ordered[0]) - 1  # A terminator can start this far back in old data.
+        self.maxLineLength = maxLineLength
+        self.receiveSize = receiveSize
+        # A kept partial command is never longer than maxLineLength, so there is always room for one receive.
+        self.buffer = bytearray(maxLineLength + receiveSize)
+        self.view = memoryview(self.buffer)
+        self.filled = 0
+        self.discarding = False  # True while skipping the rest of a line that was too long.
+        self.overlongCount = 0
+        self.decodeErrorCount = 0
+
+    def receiveView(self):
+        """The free part of the buffer, to receive into."""
+        return self.view[self.filled:self.filled + self.receiveSize]
+
+    def received(self, n):
+        """Account for n bytes written into receiveView(), and return the complete commands as strings,
+        in the order they were sent. A partial command at the end is kept until the rest of it arrives.
+        Empty commands are dropped, and so are commands that are too long or not valid UTF-8.
+        """
+        view = self.view
+        oldFilled = self.filled
+        filled = oldFilled + n
+        self.filled = filled
+        # Pure ASCII is the normal case. It can be decoded as latin-1, which is a plain copy.
+        # The kept partial command, at the start of the buffer, is checked too, since it is decoded with the rest.
+        encoding = 'utf-8' if nonAsciiPattern.search(self.buffer, 0, filled) else 'latin-1'
+
+        commands = []
+        start = 0
+        for match in self.terminatorPattern.finditer(self.buffer, max(0, oldFilled - self.terminatorOverlap),
+                                                     filled):
+            end = match.start()
+            if self.discarding:
+                self.discarding = False
+            elif end - start > self.maxLineLength:
+                self.overlongCount += 1
+            elif end > start:
+                try:
+                    commands.append(str(view[start:end], encoding))
+                except UnicodeDecodeError:
+                    self.decodeErrorCount += 1
+            start = match.end()
+
+        remaining = filled - start
+        if remaining > self.maxLineLength:
+            # Don't let a client without terminators fill up the buffer.
+            if not self.discarding:
+                self.overlongCount += 1
+            self.discarding = True
+            remaining = 0
+        elif start:
+            view[:remaining] = view[start:filled]
+        self.filled = remaining
+        return commands
+
+    def feed(self, data):
+        """Add received bytes that are already in a bytes object, and return the complete commands."""
+        commands = []
+        for offset in range(0, len(data), self.receiveSize):
+            chunk = data[offset:offset + self.receiveSize]
+            self.receiveView()[:len(chunk)] = chunk
+            commands += self.received(len(chunk))
+        return commands
@@ -0,0 +1,179 @@
+"""
+A SCPI instrument that is described by a file instead of a Python class.
+
+The description is a JSON, TOML or YAML file (YAML needs PyYAML), with these parts:
+
+    [instrument]
+    port = 5025
+    unknownQuery = "0"      # Response to undeclared queries. Without it, they are errors.
+
+    [state]                 # State variables and their start values.
+    frequency = 1e9
+
+    [responses]             # Static responses, by header.
+    "*IDN?" = "Simulated,Signal generator,1,1.0"
+
+    [[commands]]            # A set command stores its parameter in a state variable,
+    header = "SOURce:FREQuency[:CW]"
+    set = "frequency"
+    type = "numeric"        # numeric, boolean, string, or discrete, with choices = [...]
+    unit = "Hz"             # Of a numeric parameter, which then accepts 2 GHz, as 2e9. Optional.
+
+    [[commands]]            # and a query returns one, formatted.
+    header = "SOURce:FREQuency[:CW]?"
+    query = "frequency"
+    format = "%.0f"
+
+The description is compiled into a SCPI command tree. The compiled form is cached on disk,
+keyed by a hash of the file contents, so large descriptions are only compiled once.
+"""
+import hashlib
+import json
+import os
+import pickle
+
+import Scpi
+from socketInstrument import EncodedResponse
+
+defaultCacheDirectory = os.path.join(os.path.expanduser("~"), ".cache", "socketInstrument")
+cacheFormatVersion = 2  # Change when the compiled form changes, so that old cache files are not used.
+
+
+class CompiledDescription:
+    def __init__(self, commandTree, staticResponses, initialState, port):
+        self.commandTree = commandTree
+        self.staticResponses = staticResponses
+        self.initialState = initialState
+        self.port = port
+        self.loadedFromCache = False
+
+
+class StateSetter:
+    def __init__(self, variable):
+        self.variable = variable
+
+    def __call__(self, instrument, parameters, suffixes):
+        instrument.state[self.variable] = parameters[0]
+        return ""
+
+
+class StateQuery:
+    def __init__(self, variable, responseFormat):
+        self.variable = variable
+        self.responseFormat = responseFormat
+
+    def __call__(self, instrument, parameters, suffixes):
+        return self.responseFormat % instrument.state[self.variable]
+
+
+class UnknownQuery:
+    def __init__(self, response):
+        self.response = response
+
+    def __call__(self, instrument, programUnit):
+        if programUnit.split()[0].endswith("?"):
+            return self.response
+        return ""
+
+
+parameterTypes = {
+    'numeric': Scpi.numeric,
+    'boolean': Scpi.boolean,
+    'string': Scpi.string,
+}
+
+
+def parameterType(commandDescription):
+    typeName = commandDescription.get('type', 'numeric')
+    if typeName == 'discrete':
+        return Scpi.discrete(*commandDescription['choices'])
+    if typeName == 'numeric' and 'unit' in commandDescription:
+        return Scpi.quantity(commandDescription['unit'])
+    return parameterTypes[typeName]
+
+
+def compileDescription(description, path="the description"):
+    instrument = description.get('instrument', {})
+    state = description.get('state', {})
+    unknownQuery = instrument.get('unknownQuery')
+    tree = Scpi.ScpiCommandTree(UnknownQuery(unknownQuery) if unknownQuery is not None else None)
+    tree.add("SYSTem:ERRor[:NEXT]?", Scpi.ScpiInstrument.systemError)
+
+    staticResponses = {}
+    for header, text in description.get('responses', {}).items():
+        staticResponses[header] = EncodedResponse(text)
+        tree.add(header, Scpi.StaticQuery(header))
+
+    for commandDescription in description.get('commands', []):
+        header = commandDescription['header']
+        variable = commandDescription.get('set', commandDescription.get('query'))
+        if variable is not None and variable not in state:
+            raise ValueError("%s: the command '%s' uses the state variable '%s', which has no start value in [state]"
+                             % (path, header, variable))
+        if 'set' in commandDescription:
+            tree.add(header, StateSetter(commandDescription['set']), [parameterType(commandDescription)])
+        elif 'query' in commandDescription:
+            tree.add(header, StateQuery(commandDescription['query'], commandDescription.get('format', "%s")))
+        else:
+            raise ValueError("The command '%s' neither sets nor queries a state variable" % header)
+
+    return CompiledDescription(tree, staticResponses, dict(state),
+                               instrument.get('port', 2049))
+
+
+def parseDescription(path, content):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.json':
+        return json.loads(content)
+    if extension == '.toml':
+        try:
+            import tomllib
+        except ImportError:  # Before Python 3.11
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ImportError("Python 3.11, or tomli, is needed to read %s" % path)
+        return tomllib.loads(content.decode('utf-8'))
+    if extension in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("PyYAML is needed to read the instrument description %s" % path)
+        return yaml.safe_load(content)
+    raise ValueError("Unknown instrument description format: %s" % path)
+
+
+def loadDescription(path, cacheDirectory=defaultCacheDirectory):
+    """Return the compiled description in a file, from the cache if it has been compiled before."""
+    with open(path, 'rb') as f:
+        content = f.read()
+    key = hashlib.sha256(content).hexdigest()
+    cachePath = os.path.join(cacheDirectory, "%s-%d.pickle" % (key, cacheFormatVersion))
+    try:
+        with open(cachePath, 'rb') as f:
+            compiled = pickle.load(f)
+        compiled.loadedFromCache = True
+        return compiled
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        pass
+
+    compiled = compileDescription(parseDescription(path, content), path)
+    try:
+        os.makedirs(cacheDirectory, exist_ok=True)
+        temporaryPath = "%s.%d.tmp" % (cachePath, os.getpid())
+        with open(temporaryPath, 'wb') as f:
+            pickle.dump(compiled, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporaryPath, cachePath)
+    except OSError:
+        pass  # The cache is only an optimization.
+    return compiled
+
+
+class GenericInstrument(Scpi.ScpiInstrument):
+    def __init__(self, descriptionPath, cacheDirectory=defaultCacheDirectory):
+        self.description = description = loadDescription(descriptionPath, cacheDirectory)
+        super().__init__()
+        self.commandTree = description.commandTree
+        self.staticResponses = description.staticResponses
+        self.state = dict(description.initialState)
+        self.port = description.port
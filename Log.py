@@ -0,0 +1,113 @@
+"""
+Logging that doesn't slow down the serving loop.
+
+The modules log to one logger, with levels: each command and response at DEBUG, connections and
+ports at INFO. The messages are formatted lazily, in a background thread, which writes them to
+stdout, or another stream. The records wait for it in a bounded ring buffer. When the writer falls
+behind, as with a slow pipe, the oldest records are dropped and counted, instead of the serving loop
+waiting for it. The number of dropped records is written with the next record that gets through.
+
+Until start is called, nothing below WARNING is written, as with the logging module's defaults.
+"""
+import atexit
+import collections
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+
+log = logging.getLogger("socketInstrument")
+
+defaultBufferSize = 10000  # Records
+
+
+class RingBufferQueue:
+    """A queue of log records that keeps the newest maxsize records. When it is full, put_nowait drops
+    the oldest record. It has the methods that QueueHandler and QueueListener use."""
+
+    def __init__(self, maxsize=defaultBufferSize):
+        self.records = collections.deque(maxlen=maxsize)
+        self.condition = threading.Condition()
+        self.dropped = 0
+
+    def put_nowait(self, record):
+        with self.condition:
+            if len(self.records) == self.records.maxlen:
+                self.dropped += 1
+            self.records.append(record)
+            self.condition.notify()
+
+    def get(self, block=True):
+        with self.condition:
+            while not self.records:
+                if not block:
+                    raise queue.Empty
+                self.condition.wait()
+            return self.records.popleft()
+
+
+class RingBufferHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # The records stay in this process, so they are formatted by the listener, not here.
+        return record
+
+
+class RingBufferListener(logging.handlers.QueueListener):
+    """Writes the records, and a warning with the number of records dropped since the last one."""
+
+    def __init__(self, ringBuffer, *handlers):
+        super().__init__(ringBuffer, *handlers)
+        self.reportedDrops = 0
+
+    def handle(self, record):
+        dropped = self.queue.dropped
+        if dropped > self.reportedDrops:
+            super().handle(log.makeRecord(log.name, logging.WARNING, __file__, 0,
+                                          "%d log messages dropped", (dropped - self.reportedDrops,), None))
+            self.reportedDrops = dropped
+        super().handle(record)
+
+
+listener = None
+
+
+def start(level=logging.INFO, stream=None, bufferSize=defaultBufferSize):
+    """Write the records of level and above to stream, stdout by default, from a background thread.
+    Started again, for instance in a new process, it replaces the previous writer."""
+    global listener
+    stop()
+    ringBuffer = RingBufferQueue(bufferSize)
+    handler = logging.StreamHandler(stream if stream is not None else sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    for previous in [h for h in log.handlers if isinstance(h, RingBufferHandler)]:
+        log.removeHandler(previous)
+    log.addHandler(RingBufferHandler(ringBuffer))
+    log.setLevel(level)
+    log.propagate = False
+    listener = RingBufferListener(ringBuffer, handler)
+    listener.start()
+    return listener
+
+
+def stop():
+    """Write what is in the buffer, and stop the writer."""
+    global listener
+    if listener is not None:
+        listener.stop()
+    listener = None
+
+
+def droppedCount():
+    return listener.queue.dropped if listener is not None else 0
+
+
+def forgetListener():
+    # A forked process, such as a rack worker, has no writer thread, but the parent's writer object.
+    global listener
+    listener = None
+
+
+atexit.register(stop)
+os.register_at_fork(after_in_child=forgetListener)
@@ -0,0 +1,204 @@
+"""
+Metrics of the served instruments, in the Prometheus text format, on a local HTTP port:
+
+    python3 socketMain.py --topology instruments/Bench.toml --metrics-port 9100
+    curl localhost:9100/metrics
+
+For each instrument:
+- socketinstrument_commands_total: commands, by Command.name, the name of the handler, as the query
+  cache metrics are. Instruments without declared commands label them by their first word, with
+  the numbers in it replaced by #, as in G# for G100.
+- socketinstrument_bad_commands_total: commands that match no declared command.
+- socketinstrument_stage_seconds: latencies of the stages of a command, as quantiles. decode is the
+  framing of the received bytes into commands, dispatch the response function, format the encoding
+  of the response, and send the sending of the responses to the received bytes.
+- socketinstrument_connections: connected clients.
+- socketinstrument_received_bytes_total and socketinstrument_sent_bytes_total.
+- socketinstrument_query_cache_hits_total and socketinstrument_query_cache_misses_total: queries
+  answered from the ResponseCache, and not, by command, for instruments with a query cache.
+
+With --rack, each worker sends copies of the metrics of its instruments to the supervisor with its
+command counts, every few seconds, and the supervisor serves those of all workers. See Rack.
+
+Without a metrics port, the communicators don't measure anything. With one, they count and record
+latencies in plain integers, and the text is only made when the metrics are scraped.
+"""
+import collections
+import copy
+import http.server
+import re
+import threading
+
+from Log import log
+
+stages = ('decode', 'dispatch', 'format', 'send')
+quantiles = (0.5, 0.9, 0.99, 0.999)
+numberPattern = re.compile(r"[-+]?\d+(?:\.\d*)?")
+
+
+class Histogram:
+    """Durations in nanoseconds, counted in log-linear buckets, as in HdrHistogram: below 2**bits ns,
+    there is a bucket for each ns, and above, each power of two is split into 2**(bits - 1) buckets.
+    A quantile is within 1 / 2**(bits - 1) of the recorded durations."""
+
+    def __init__(self, bits=5):
+        self.bits = bits
+        self.subBuckets = 1 << bits
+        self.halfSubBuckets = self.subBuckets >> 1
+        self.counts = []
+        self.count = 0
+        self.sum = 0
+
+    def record(self, value):
+        if value < self.subBuckets:
+            index = max(0, value)
+        else:
+            shift = value.bit_length() - self.bits
+            index = self.subBuckets + (shift - 1) * self.halfSubBuckets + (value >> shift) - self.halfSubBuckets
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def highestValueIn(self, index):
+        if index < self.subBuckets:
+            return index
+        shift = (index - self.subBuckets) // self.halfSubBuckets + 1
+        subBucket = (index - self.subBuckets) % self.halfSubBuckets + self.halfSubBuckets
+        return ((subBucket + 1) << shift) - 1
+
+    def quantile(self, q):
+        """The value that a fraction q of the recorded values are at or below."""
+        rank = max(1, q * self.count)
+        total = 0
+        for index, count in enumerate(self.counts):
+            total += count
+            if total >= rank:
+                return self.highestValueIn(index)
+        return 0
+
+
+class InstrumentMetrics:
+    maxCommandLabels = 64  # Per instrument. Commands with other first words are counted as "other".
+
+    def __init__(self, name, behavior=None):
+        self.name = name
+        self.behavior = behavior  # A CommandBehavior, whose commands are counted by the Command it dispatched.
+        self.declaresCommands = behavior is not None
+        self.commands = collections.Counter()  # By label
+        self.badCommands = 0
+        self.latencies = {stage: Histogram() for stage in stages}
+        self.connections = 0
+        self.bytesReceived = 0
+        self.bytesSent = 0
+        self.cacheCounts = None  # The query cache hits and misses of a copy, see snapshot.
+
+    def __getstate__(self):
+        # Copied and pickled without the instrument, but with the counts of its query cache.
+        return dict(self.__dict__, behavior=None, cacheCounts=self.queryCacheCounts())
+
+    def snapshot(self):
+        """A copy of the metrics as they are now, which can be sent to another process."""
+        return copy.deepcopy(self)
+
+    def queryCacheCounts(self):
+        """The hits and misses of the query cache, by command, or None for instruments without one."""
+        if self.behavior is not None and self.behavior.queryCache is not None:
+            return self.behavior.queryCache.hits, self.behavior.queryCache.misses
+        return self.cacheCounts
+
+    def commandLabel(self, command):
+        if self.declaresCommands:
+            dispatched = self.behavior.dispatchedCommand
+            if dispatched is None:
+                self.badCommands += 1
+                return "unknown"
+            return dispatched.name
+        words = command.split(None, 1)
+        label = numberPattern.sub("#", words[0]) if words else ""
+        if label not in self.commands and len(self.commands) >= self.maxCommandLabels:
+            return "other"
+        return label
+
+    def countCommand(self, command, dispatchTime, formatTime):
+        self.commands[self.commandLabel(command)] += 1
+        self.latencies['dispatch'].record(dispatchTime)
+        self.latencies['format'].record(formatTime)
+
+
+def metricsFor(instrument):
+    """Start measuring an instrument's communicator, and return its metrics."""
+    metrics = InstrumentMetrics(instrument.name, instrument if hasattr(instrument, 'commandTable') else None)
+    instrument.communicator.metrics = metrics
+    return metrics
+
+
+def escape(labelValue):
+    return str(labelValue).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def text(allMetrics):
+    """The metrics of several instruments, in the Prometheus text format."""
+    lines = []
+
+    def family(name, kind, helpText, samples):
+        lines.append("# HELP %s %s" % (name, helpText))
+        lines.append("# TYPE %s %s" % (name, kind))
+        for suffix, labels, value in samples:
+            labelText = ",".join('%s="%s"' % (key, escape(labelValue)) for key, labelValue in labels)
+            lines.append("%s%s{%s} %s" % (name, suffix, labelText, value))
+
+    family("socketinstrument_commands_total", "counter", "Commands received, by command.",
+           [("", (("instrument", m.name), ("command", label)), count)
+            for m in allMetrics for label, count in sorted(m.commands.items())])
+    family("socketinstrument_bad_commands_total", "counter", "Commands that match no declared command.",
+           [("", (("instrument", m.name),), m.badCommands) for m in allMetrics if m.declaresCommands])
+    samples = []
+    for m in allMetrics:
+        for stage, histogram in m.latencies.items():
+            labels = (("instrument", m.name), ("stage", stage))
+            samples += [("", labels + (("quantile", q),), histogram.quantile(q) / 1e9) for q in quantiles]
+            samples.append(("_sum", labels, histogram.sum / 1e9))
+            samples.append(("_count", labels, histogram.count))
+    family("socketinstrument_stage_seconds", "summary", "Latencies of the stages of the commands.", samples)
+    family("socketinstrument_connections", "gauge", "Connected clients.",
+           [("", (("instrument", m.name),), m.connections) for m in allMetrics])
+    family("socketinstrument_received_bytes_total", "counter", "Bytes received.",
+           [("", (("instrument", m.name),), m.bytesReceived) for m in allMetrics])
+    family("socketinstrument_sent_bytes_total", "counter", "Bytes sent.",
+           [("", (("instrument", m.name),), m.bytesSent) for m in allMetrics])
+    caches = [(m.name, m.queryCacheCounts()) for m in allMetrics if m.queryCacheCounts() is not None]
+    family("socketinstrument_query_cache_hits_total", "counter", "Queries answered from the query cache.",
+           [("", (("instrument", name), ("command", command)), count)
+            for name, (hits, misses) in caches for command, count in sorted(hits.items())])
+    family("socketinstrument_query_cache_misses_total", "counter", "Queries not answered from the query cache.",
+           [("", (("instrument", name), ("command", command)), count)
+            for name, (hits, misses) in caches for command, count in sorted(misses.items())])
+    return "\n".join(lines) + "\n"
+
+
+def serve(allMetrics, port, host='127.0.0.1'):
+    """Serve the metrics on http://host:port/metrics, from a daemon thread, and return the server.
+    allMetrics is a list, or a function that returns one for each scrape."""
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = text(allMetrics() if callable(allMetrics) else allMetrics).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes aren't logged.
+
+    server = http.server.ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    log.info("metrics port is %d", server.server_address[1])
+    return server
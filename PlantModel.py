@@ -0,0 +1,157 @@
+"""
+How the actual values of a climate chamber follow their setpoints.
+
+After a step of the setpoint, the actual value approaches it exponentially, with a time constant.
+With an overshoot, it goes past the setpoint by that fraction of the step, and settles in a damped
+oscillation, whose envelope has the same time constant. While the setpoint ramps, the actual value
+follows it, a little behind. With a time constant of 0, the actual value is at the setpoint at once.
+
+The setpoint is linear in time between the points of a ClimateProgram.Profile, and the response to
+a linear input has a closed form. The value is evaluated from the time since the last point, when it
+is queried, so a chamber costs nothing between queries. lagResponse also works on NumPy arrays, for
+many chambers at once, when numpy is passed as math.
+"""
+import math as standardMath
+
+# After this many time constants, a value is at its target, to well within the resolution of any display.
+settlingTimeConstants = 20
+
+
+def dampingRatio(overshoot):
+    """The damping ratio of a second-order response that overshoots a step by this fraction of it."""
+    if not 0 < overshoot < 1:
+        raise ValueError("The overshoot must be more than 0 and less than 1, not %s" % overshoot)
+    logOvershoot = standardMath.log(overshoot)
+    return -logOvershoot / standardMath.sqrt(standardMath.pi ** 2 + logOvershoot ** 2)
+
+
+def lagState(startValue, target, elapsed, timeConstant, overshoot=0.0, slope=0.0, startVelocity=0.0,
+             math=standardMath):
+    """The value and its rate of change, elapsed seconds after it was startValue, changing by startVelocity,
+    and started following an input that was target, and changes by slope, per second."""
+    inputValue = target + slope * elapsed
+    if timeConstant <= 0:
+        return inputValue, slope + 0 * elapsed
+    decay = math.exp(-elapsed / timeConstant)
+    if overshoot <= 0:
+        lagError = startValue - target + slope * timeConstant
+        return inputValue - slope * timeConstant + lagError * decay, slope - lagError / timeConstant * decay
+    # A damped second-order response, with damping ratio zeta and the decay rate zeta * omega = 1 / timeConstant.
+    zeta = dampingRatio(overshoot)
+    omega = 1 / (zeta * timeConstant)
+    dampedFrequency = omega * standardMath.sqrt(1 - zeta ** 2)
+    lag = 2 * zeta * slope / omega  # How far behind a ramp the value settles.
+    c1 = startValue - target + lag
+    c2 = (startVelocity - slope + c1 / timeConstant) / dampedFrequency
+    phase = dampedFrequency * elapsed
+    cos, sin = math.cos(phase), math.sin(phase)
+    value = inputValue - lag + decay * (c1 * cos + c2 * sin)
+    velocity = slope + decay * ((c2 * dampedFrequency - c1 / timeConstant) * cos
+                                - (c2 / timeConstant + c1 * dampedFrequency) * sin)
+    return value, velocity
+
+
+def lagResponse(startValue, target, elapsed, timeConstant, overshoot=0.0, math=standardMath):
+    """The value, elapsed seconds after a step from startValue to target."""
+    return lagState(startValue, target, elapsed, timeConstant, overshoot, math=math)[0]
+
+
+class Lag:
+    """A value that follows an input, which is constant, or a Profile with an offset. The time constant
+    and overshoot are given when it is evaluated, so that they can be changed at any time."""
+    __slots__ = ('value', 'velocity', 'time', 'profile', 'offset')  # offset is the input, without a profile.
+
+    def __init__(self, value=0.0, now=0.0):
+        self.set(value, now)
+
+    def set(self, value, now):
+        """Jump to a value, and stay there."""
+        self.value = self.offset = value
+        self.velocity = 0.0
+        self.time = now
+        self.profile = None
+
+    def setTarget(self, target, now, timeConstant, overshoot=0.0):
+        """Start approaching target, from the value now."""
+        self.restartAt(now, timeConstant, overshoot)
+        self.profile = None
+        self.offset = target
+
+    def follow(self, profile, offset, now, timeConstant, overshoot=0.0):
+        """Start following the values of profile, plus offset."""
+        self.restartAt(now, timeConstant, overshoot)
+        self.profile = profile
+        self.offset = offset
+
+    def restartAt(self, now, timeConstant, overshoot):
+        self.catchUp(now, timeConstant, overshoot)
+        self.value, self.velocity = self.stateAt(now, timeConstant, overshoot)
+        self.time = now
+
+    def inputAt(self, t):
+        """The input at t, and its slope until the next point of the profile."""
+        profile = self.profile
+        if profile is None:
+            return self.offset, 0.0
+        times, values = profile.times, profile.values
+        i = profile.pointBefore(t)
+        if i + 1 == len(times):
+            return values[i] + self.offset, 0.0
+        slope = (values[i + 1] - values[i]) / (times[i + 1] - times[i])
+        return values[i] + slope * (t - times[i]) + self.offset, slope
+
+    def catchUp(self, now, timeConstant, overshoot):
+        """Move the state on to the last point of the profile before now."""
+        profile = self.profile
+        while profile is not None:
+            i = profile.pointBefore(self.time)
+            if i + 1 == len(profile.times):
+                self.offset += profile.values[-1]  # The input is constant from here.
+                self.profile = None
+                break
+            nextTime = profile.times[i + 1]
+            if nextTime > now:
+                break
+            self.value, self.velocity = self.stateAt(nextTime, timeConstant, overshoot)
+            self.time = nextTime
+
+    def stateAt(self, now, timeConstant, overshoot):
+        inputValue, slope = self.inputAt(self.time)
+        return lagState(self.value, inputValue, now - self.time, timeConstant, overshoot, slope, self.velocity)
+
+    def settledAt(self, timeConstant):
+        """The time from which the value is at the input, and the input constant."""
+        inputEnd = self.profile.endTime if self.profile is not None else self.time
+        if timeConstant <= 0 or (self.profile is None and self.value == self.offset and self.velocity == 0):
+            return inputEnd
+        return inputEnd + settlingTimeConstants * timeConstant
+
+    def valueAt(self, now, timeConstant, overshoot=0.0):
+        self.catchUp(now, timeConstant, overshoot)
+        return self.stateAt(now, timeConstant, overshoot)[0]
+
+
+def overshootProperty(valueName):
+    """A property for an overshoot, kept in the named attribute, which must be at least 0 and less than 1."""
+    def get(self):
+        return getattr(self, valueName)
+
+    def set(self, overshoot):
+        if not 0 <= overshoot < 1:
+            raise ValueError("An overshoot must be at least 0 and less than 1, not %s" % overshoot)
+        setattr(self, valueName, overshoot)
+
+    return property(get, set)
+
+
+def plantProperty(lagName, timeConstantName, overshootName):
+    """A property for an actual value, which follows its target as the named Lag of the instance does,
+    with the time constant and overshoot in the named attributes. Setting it makes the value jump."""
+    def get(self):
+        return getattr(self, lagName).valueAt(self.clock.now(), getattr(self, timeConstantName),
+                                              getattr(self, overshootName))
+
+    def set(self, value):
+        getattr(self, lagName).set(value, self.clock.now())
+
+    return property(get, set)
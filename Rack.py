@@ -0,0 +1,238 @@
+"""
+Rack mode: the instruments of a bench served by several worker processes, to use several cores.
+
+The supervisor assigns the instruments to the workers, so that each worker gets about the same
+command rate, as measured in an earlier run and saved in a rates file. Each worker serves its
+instruments from one event loop, and sends its output and command counts to the supervisor, and with
+a metrics port, copies of the metrics of its instruments, which the supervisor serves, see Metrics.
+The supervisor prints the output of all workers, restarts workers that exit, and saves the
+measured command rates when it stops. A worker that exits before it serves its instruments, as when
+its port is in use, stops the rack, since a restart would fail the same way. So does a worker that
+keeps exiting: it is restarted after a delay that doubles each time, at most maxRestarts times in a row.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+import Clock
+import Communicator
+import Log
+import Metrics
+import Topology
+from Log import log
+
+
+def rateKey(specification):
+    """The key of an instrument in the rates: its name and port, since the names default to the type."""
+    name = specification.get('name', specification['type'])
+    port = specification.get('port')
+    return name if port is None else "%s:%d" % (name, port)
+
+
+def assignToWorkers(specifications, rates, workerCount):
+    """Spread the specifications over at most workerCount lists, with about the same total command rate
+    in each. The busiest instruments are placed first, each with the least loaded worker.
+    Instruments without a measured rate count as one command per second."""
+    loads = [0.0] * workerCount
+    assignment = [[] for _ in range(workerCount)]
+    busiestFirst = sorted(specifications, key=lambda spec: -rates.get(rateKey(spec), 1.0))
+    for specification in busiestFirst:
+        worker = loads.index(min(loads))
+        assignment[worker].append(specification)
+        loads[worker] += rates.get(rateKey(specification), 1.0)
+    return [specifications for specifications in assignment if specifications]
+
+
+class QueueWriter:
+    """A file to print to, which sends each line to the supervisor."""
+
+    def __init__(self, messages, workerIndex):
+        self.messages = messages
+        self.workerIndex = workerIndex
+        self.partialLine = ""
+
+    def write(self, text):
+        lines = (self.partialLine + text).split("\n")
+        self.partialLine = lines.pop()
+        for line in lines:
+            self.messages.put(('log', self.workerIndex, line))
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def runWorker(workerIndex, specifications, makeInstrument, messages, clock, reportInterval, logLevel, measure):
+    sys.stdout = QueueWriter(messages, workerIndex)
+    Log.start(logLevel, sys.stdout)
+    Clock.setDefaultClock(clock)
+    instruments = Topology.bringUp(specifications, makeInstrument)
+    allMetrics = [Metrics.metricsFor(instrument) for instrument in instruments] if measure else []
+    communicators = [instrument.communicator for instrument in instruments]
+    listeningSockets = [communicator.openListeningSocket() for communicator in communicators]
+    messages.put(('ports', workerIndex, Topology.boundPorts(instruments, listeningSockets)))
+    try:
+        asyncio.run(serveAndReport(workerIndex, instruments, [rateKey(s) for s in specifications],
+                                   listeningSockets, messages, reportInterval, allMetrics))
+    except KeyboardInterrupt:
+        pass
+
+
+async def serveAndReport(workerIndex, instruments, rateKeys, listeningSockets, messages, reportInterval,
+                         allMetrics=()):
+    communicators = [instrument.communicator for instrument in instruments]
+    server = asyncio.ensure_future(Communicator.serveTogether(communicators, listeningSockets))
+    startTime = time.monotonic()
+    while not server.done():
+        await asyncio.wait({server}, timeout=reportInterval)
+        counts = {key: instrument.communicator.commandCount for key, instrument in zip(rateKeys, instruments)}
+        messages.put(('commands', workerIndex, time.monotonic() - startTime, counts))
+        if allMetrics:
+            messages.put(('metrics', workerIndex, [metrics.snapshot() for metrics in allMetrics]))
+    server.result()
+
+
+class Supervisor:
+    def __init__(self, specifications, makeInstrument, workerCount=None, ratesPath=None, clock=None,
+                 reportInterval=5.0, logLevel=logging.INFO, metricsPort=None):
+        self.specifications = specifications
+        self.makeInstrument = makeInstrument  # Made in the workers, so it must be a module-level function.
+        self.workerCount = workerCount or os.cpu_count() or 1
+        self.ratesPath = ratesPath
+        self.clock = Clock.clockFor(clock)
+        self.reportInterval = reportInterval
+        self.logLevel = logLevel  # Of the workers
+        self.metricsPort = metricsPort
+        self.restartDelay = 1.0  # Seconds before a worker is restarted, doubled for each restart in a row.
+        self.maxRestartDelay = 60.0  # A worker that has served this long starts a new row of restarts.
+        self.maxRestarts = 10  # In a row, of one worker.
+        self.rates = self.loadRates()  # Commands per second, by rateKey.
+        self.assignment = assignToWorkers(specifications, self.rates, self.workerCount)
+        self.messages = multiprocessing.Queue()
+        self.workers = []
+        self.startTimes = []
+        self.ports = {}  # Bound ports, by worker index.
+        self.restartCount = 0
+        self.restartsInARow = []  # By worker index
+        self.restartTimes = []  # By worker index, when an exited worker is restarted, or None.
+        self.workerMetrics = [[] for _ in self.assignment]  # The latest copies, by worker index.
+        self.metricsServer = None
+        self.running = False
+
+    def loadRates(self):
+        if not self.ratesPath:
+            return {}
+        try:
+            with open(self.ratesPath) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def saveRates(self):
+        if not self.ratesPath:
+            return
+        temporaryPath = self.ratesPath + ".tmp"
+        with open(temporaryPath, 'w') as f:
+            json.dump(self.rates, f, indent=1, sort_keys=True)
+        os.replace(temporaryPath, self.ratesPath)
+
+    def startWorker(self, workerIndex):
+        worker = multiprocessing.Process(target=runWorker, daemon=True,
+                                         args=(workerIndex, self.assignment[workerIndex], self.makeInstrument,
+                                               self.messages, self.clock, self.reportInterval, self.logLevel,
+                                               self.metricsPort is not None))
+        worker.start()
+        return worker
+
+    def run(self):
+        """Start the workers, and supervise them until stopped or interrupted.
+        Raise RuntimeError if a worker fails, see restartExitedWorkers."""
+        self.running = True
+        self.workers = [self.startWorker(i) for i in range(len(self.assignment))]
+        self.startTimes = [time.monotonic()] * len(self.workers)
+        self.restartsInARow = [0] * len(self.workers)
+        self.restartTimes = [None] * len(self.workers)
+        if self.metricsPort is not None:
+            self.metricsServer = Metrics.serve(self.allMetrics, self.metricsPort)
+        try:
+            while self.running:
+                self.handleMessages(timeout=0.2)
+                self.restartExitedWorkers()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for worker in self.workers:
+                worker.terminate()
+            for worker in self.workers:
+                worker.join()
+            if self.metricsServer is not None:
+                self.metricsServer.shutdown()
+                self.metricsServer.server_close()
+            self.saveRates()
+            print(json.dumps({'commandRates': self.rates}), flush=True)
+
+    def stop(self):
+        self.running = False
+
+    def allMetrics(self):
+        """The metrics of the instruments of all workers, as of their latest reports."""
+        return [metrics for workerMetrics in list(self.workerMetrics) for metrics in workerMetrics]
+
+    def handleMessages(self, timeout):
+        try:
+            message = self.messages.get(timeout=timeout)
+            while True:
+                self.handle(message)
+                message = self.messages.get_nowait()
+        except queue.Empty:
+            pass
+
+    def handle(self, message):
+        kind, workerIndex = message[:2]
+        if kind == 'log':
+            print("[worker %d] %s" % (workerIndex, message[2]), flush=True)
+        elif kind == 'ports':
+            self.ports[workerIndex] = message[2]
+            if len(self.ports) == len(self.workers):
+                instruments = [entry for i in sorted(self.ports) for entry in self.ports[i]]
+                print(json.dumps({'instruments': instruments}), flush=True)
+        elif kind == 'commands':
+            elapsed, counts = message[2:]
+            if elapsed > 0:
+                for key, count in counts.items():
+                    self.rates[key] = count / elapsed
+        elif kind == 'metrics':
+            self.workerMetrics[workerIndex] = message[2]
+
+    def restartExitedWorkers(self):
+        """Restart the workers that have exited, after a delay. Raise RuntimeError for a worker that exited
+        before it reported its ports, or that has been restarted maxRestarts times in a row."""
+        now = time.monotonic()
+        for i, worker in enumerate(self.workers):
+            if worker.exitcode is None:
+                continue
+            if self.restartTimes[i] is None:
+                self.handleMessages(timeout=0)  # Its ports may be waiting in the queue.
+                if i not in self.ports:
+                    raise RuntimeError("Worker %d exited with code %s before it served its instruments"
+                                       % (i, worker.exitcode))
+                if now - self.startTimes[i] >= self.maxRestartDelay:
+                    self.restartsInARow[i] = 0
+                if self.restartsInARow[i] >= self.maxRestarts:
+                    raise RuntimeError("Worker %d exited with code %s, after %d restarts in a row"
+                                       % (i, worker.exitcode, self.restartsInARow[i]))
+                delay = min(self.maxRestartDelay, self.restartDelay * 2 ** self.restartsInARow[i])
+                log.warning("worker %d exited with code %s, restarting it in %.1f s", i, worker.exitcode, delay)
+                self.ports.pop(i, None)
+                self.restartTimes[i] = now + delay
+            elif now >= self.restartTimes[i]:
+                self.workers[i] = self.startWorker(i)
+                self.startTimes[i] = now
+                self.restartTimes[i] = None
+                self.restartsInARow[i] += 1
+                self.restartCount += 1
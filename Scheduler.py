@@ -0,0 +1,77 @@
+"""
+Change the state of the simulated instruments as of the simulated time when a movement ends.
+
+A movement registers an event at the time when it ends, and the event changes the state once.
+The events are kept in a heap, ordered by time. They fire lazily: nothing runs them in the
+background, but PositionerBehavior.responseFunction and Axis.update run the events that are due
+before they read the state, so a command sees the state as of its time, whenever it comes.
+Climate ramps and programs don't need events, since their values are worked out from the time,
+see PlantModel.
+"""
+import heapq
+import itertools
+import threading
+import weakref
+
+import Clock
+
+
+class Event:
+    def __init__(self, time, action):
+        self.time = time
+        self.action = action
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler:
+    def __init__(self, clock=None):
+        self.clock = Clock.clockFor(clock)
+        self.queue = []  # (time, sequence number, event), so events at the same time run in order.
+        self.sequence = itertools.count()
+
+    def at(self, time, action):
+        """Run action() at the given clock time. Return the event, which can be cancelled."""
+        event = Event(time, action)
+        heapq.heappush(self.queue, (time, next(self.sequence), event))
+        return event
+
+    def after(self, delay, action):
+        return self.at(self.clock.now() + delay, action)
+
+    def nextTime(self):
+        """The time of the next event, or None if there are none."""
+        while self.queue and self.queue[0][2].cancelled:
+            heapq.heappop(self.queue)
+        return self.queue[0][0] if self.queue else None
+
+    def runDue(self):
+        """Run the events that are due, in time order. Return the number of events run."""
+        queue = self.queue
+        if not queue:
+            return 0
+        now = self.clock.now()
+        count = 0
+        while queue and queue[0][0] <= now:
+            event = heapq.heappop(queue)[2]
+            if not event.cancelled:
+                event.cancelled = True  # An event runs once.
+                event.action()
+                count += 1
+        return count
+
+
+schedulersByClock = weakref.WeakKeyDictionary()
+schedulersLock = threading.Lock()  # Instruments can be created in parallel.
+
+
+def schedulerFor(clock=None):
+    """The scheduler shared by everything that uses the same clock."""
+    clock = Clock.clockFor(clock)
+    with schedulersLock:
+        scheduler = schedulersByClock.get(clock)
+        if scheduler is None:
+            scheduler = schedulersByClock[clock] = Scheduler(clock)
+    return scheduler
@@ -0,0 +1,274 @@
+"""
+Parse and execute SCPI messages.
+
+Commands are declared with their headers in the usual SCPI notation, where the upper case
+letters of a mnemonic are its short form: "SENSe:NPOWer?" accepts SENS:NPOW?, sense:npower?
+and any mix of short and long forms. A '#' after a mnemonic allows a numeric suffix, as in
+"CONTrol#:AMODe:FGAin?". A mnemonic in brackets, like "[SOURce]:" or "[:NEXT]", is optional.
+
+The headers are built into a tree once. A header in a message is then resolved with one dict
+lookup per level. Messages can be compound, "SENS:NFR?;NPOW?;:SYST:ERR?", and the responses to
+the queries in them are joined with ';', as a real instrument does.
+"""
+import itertools
+import re
+
+from socketInstrument import SocketInstrument
+
+
+class ScpiError(Exception):
+    """An error that a SCPI instrument puts in its error queue."""
+
+    def __init__(self, code, message):
+        super().__init__('%d,"%s"' % (code, message))
+        self.code = code
+
+
+class StaticQuery:
+    """A handler that returns the static response of the instrument to a command."""
+
+    def __init__(self, command):
+        self.command = command
+
+    def __call__(self, instrument, parameters, suffixes):
+        return instrument.staticResponses[self.command]
+
+
+class NumericParameter:
+    """A decimal number, optionally followed by one of the units, with an SI multiplier, as in 2 GHz
+    or 500 mV. The value is in the unit without a multiplier. Without units, no suffix is allowed."""
+    # By SCPI, M is milli, and mega is MA, except in MHZ and MOHM.
+    multipliers = {'EX': 1e18, 'PE': 1e15, 'T': 1e12, 'G': 1e9, 'MA': 1e6, 'K': 1e3,
+                   'M': 1e-3, 'U': 1e-6, 'N': 1e-9, 'P': 1e-12, 'F': 1e-15, 'A': 1e-18}
+    megaUnits = ('HZ', 'OHM')
+
+    def __init__(self, units=()):
+        self.units = tuple(unit.upper() for unit in units)
+
+    def __call__(self, text):
+        match = numericPattern.match(text)
+        if not match:
+            raise ScpiError(-104, "Data type error")
+        value = float(match.group(1))
+        suffix = match.group(2).upper()
+        if not suffix:
+            return value
+        for unit in self.units:
+            if suffix == unit:
+                return value
+            if suffix.endswith(unit):
+                prefix = suffix[:-len(unit)]
+                if prefix == 'M' and unit in self.megaUnits:
+                    return value * 1e6
+                if prefix in self.multipliers:
+                    return value * self.multipliers[prefix]
+        raise ScpiError(-131, "Invalid suffix")
+
+
+def quantity(*units):
+    """A numeric parameter in one of the given units, such as quantity("Hz")."""
+    return NumericParameter(units)
+
+
+numeric = NumericParameter()  # A plain number.
+numericPattern = re.compile(r"([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*([A-Za-z]*)$")
+
+
+def boolean(text):
+    upper = text.upper()
+    if upper in ("ON", "1"):
+        return True
+    if upper in ("OFF", "0"):
+        return False
+    raise ScpiError(-224, "Illegal parameter value")
+
+
+def string(text):
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "'\"":
+        return text[1:-1]
+    raise ScpiError(-151, "Invalid string data")
+
+
+def discrete(*mnemonics):
+    """A parameter with one of the given mnemonics, such as discrete("DBM", "Watt").
+    The value is the short form in upper case, whichever form was sent."""
+    return DiscreteParameter(mnemonics)
+
+
+class DiscreteParameter:
+    # A class rather than a closure, so that compiled command trees can be pickled.
+    def __init__(self, mnemonics):
+        self.choices = {}
+        for mnemonic in mnemonics:
+            short, long = shortAndLongForm(mnemonic)
+            self.choices[short] = self.choices[long] = short
+
+    def __call__(self, text):
+        try:
+            return self.choices[text.upper()]
+        except KeyError:
+            raise ScpiError(-224, "Illegal parameter value")
+
+
+def shortAndLongForm(mnemonic):
+    short = "".join(c for c in mnemonic if not c.islower())
+    return short.upper(), mnemonic.upper()
+
+
+class ScpiNode:
+    def __init__(self, acceptsSuffix=False):
+        self.children = {}
+        self.acceptsSuffix = acceptsSuffix
+        self.setCommand = None  # (handler, parameter types)
+        self.queryCommand = None
+
+
+class ScpiCommandTree:
+    """The commands of one instrument model.
+
+    A handler is called as handler(context, parameters, suffixes), where context is what was given
+    to execute, usually the instrument, parameters are converted by the declared parameter types,
+    and suffixes are the numeric suffixes of the header, 1 where a suffix was left out.
+    It returns the response to a query, and is expected to return "" for a set command.
+    """
+
+    def __init__(self, unknownHeader=None):
+        self.root = ScpiNode()
+        # Called as unknownHeader(context, programUnit) for headers that are not in the tree.
+        # Without it, they are an error.
+        self.unknownHeader = unknownHeader
+
+    def add(self, header, handler, parameterTypes=()):
+        isQuery = header.endswith("?")
+        mnemonics = header.rstrip("?").lstrip(":").replace("[:", ":[").replace(":]", "]:").split(":")
+        alternatives = [[m[1:-1], None] if m.startswith("[") else [m] for m in mnemonics]
+        for path in itertools.product(*alternatives):
+            node = self.root
+            for mnemonic in path:
+                if mnemonic is not None:
+                    node = self.childNode(node, mnemonic)
+            if isQuery:
+                node.queryCommand = (handler, parameterTypes)
+            else:
+                node.setCommand = (handler, parameterTypes)
+
+    @staticmethod
+    def childNode(node, mnemonic):
+        acceptsSuffix = mnemonic.endswith("#")
+        short, long = shortAndLongForm(mnemonic.rstrip("#"))
+        child = node.children.get(short) or node.children.get(long)
+        if child is None:
+            child = ScpiNode(acceptsSuffix)
+        child.acceptsSuffix = child.acceptsSuffix or acceptsSuffix
+        node.children[short] = node.children[long] = child
+        return child
+
+    def resolve(self, header, start):
+        """Find the node of a header, starting at the node start. Return the node, the numeric suffixes,
+        and the node that following relative headers in a compound message start from."""
+        node = start
+        parent = start
+        suffixes = []
+        for mnemonic in header.upper().split(":"):
+            parent = node
+            child = node.children.get(mnemonic)
+            if child is None:
+                key = mnemonic.rstrip("0123456789")
+                child = node.children.get(key)
+                if child is None or not child.acceptsSuffix or key == mnemonic:
+                    return None, suffixes, start
+                suffixes.append(int(mnemonic[len(key):]))
+            elif child.acceptsSuffix:
+                suffixes.append(1)
+            node = child
+        return node, suffixes, parent
+
+    def execute(self, message, context, errorQueue=None):
+        """Execute all commands in a message, and return the joined responses to the queries in it.
+        A single response is returned as it is, so that an EncodedResponse stays encoded.
+        With an errorQueue, the error of a command is appended to it, and the other commands are
+        executed, as by an instrument. Without one, the first error is raised."""
+        responses = []
+        current = self.root
+        for unit in splitOutsideQuotes(message, ";"):
+            unit = unit.strip()
+            if not unit:
+                continue
+            header, _, parameterText = unit.partition(" ")
+            isQuery = header.endswith("?")
+            header = header.rstrip("?")
+            if header.startswith("*"):
+                node, suffixes, _ = self.resolve(header, self.root)
+            elif header.startswith(":"):
+                node, suffixes, current = self.resolve(header[1:], self.root)
+            else:
+                node, suffixes, current = self.resolve(header, current)
+
+            command = node and (node.queryCommand if isQuery else node.setCommand)
+            try:
+                if command is None:
+                    if self.unknownHeader is None:
+                        raise ScpiError(-113, "Undefined header")
+                    response = self.unknownHeader(context, unit)
+                else:
+                    handler, parameterTypes = command
+                    parameters = self.parameters(parameterText, parameterTypes)
+                    response = handler(context, parameters, suffixes)
+            except ScpiError as error:
+                if errorQueue is None:
+                    raise
+                errorQueue.append(str(error))
+                continue
+            if response:
+                responses.append(response)
+
+        if len(responses) == 1:
+            return responses[0]
+        return ";".join(responses)
+
+    @staticmethod
+    def parameters(parameterText, parameterTypes):
+        texts = [p.strip() for p in splitOutsideQuotes(parameterText, ",")] if parameterText.strip() else []
+        if len(texts) < len(parameterTypes):
+            raise ScpiError(-109, "Missing parameter")
+        if len(texts) > len(parameterTypes):
+            raise ScpiError(-108, "Parameter not allowed")
+        return [parse(text) for parse, text in zip(parameterTypes, texts)]
+
+
+def splitOutsideQuotes(text, separator):
+    if '"' not in text and "'" not in text:
+        return text.split(separator)
+    parts = []
+    start = 0
+    quote = None
+    for i, c in enumerate(text):
+        if quote:
+            if c == quote:
+                quote = None
+        elif c in "'\"":
+            quote = c
+        elif c == separator:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+class ScpiInstrument(SocketInstrument):
+    """An instrument that executes SCPI messages with its commandTree, and has an error queue."""
+
+    commandTree = ScpiCommandTree()
+    noErrorResponse = '0,"No error"'
+
+    def __init__(self):
+        super().__init__()
+        self.errorQueue = []
+
+    def responseFunction(self, command):
+        return self.commandTree.execute(command.strip(), self, self.errorQueue)
+
+    def systemError(self, parameters, suffixes):
+        if self.errorQueue:
+            return self.errorQueue.pop(0)
+        return self.noErrorResponse
@@ -0,0 +1,138 @@
+"""
+A simulated test bench: several instruments, described by a topology file.
+
+The file is TOML, JSON or YAML, with one entry per instrument:
+
+    [[instruments]]
+    type = "NCD"                # An instrument type of socketMain.
+    name = "turntable"          # Optional, the type by default. Used in the port report.
+    port = 2200                 # Optional, the instrument's standard port by default. 0 lets the OS pick one.
+    commands = ["LD 1 DV"]      # Optional, sent to the instrument when it has been set up.
+    count = 1                   # Optional, the number of instances, on consecutive ports. See Fleet.
+    chambers = ["Vc37060"]      # For a VotschBus, the chamber types at the addresses $01, $02, ...
+    queryCache = 0.001          # Optional, seconds that responses to queries are reused. See behaviors.ResponseCache.
+
+    [instruments.parameters]    # Attributes of the instrument, such as offset or chamberTempOffset.
+    offset = 1.5
+
+    [instruments.devices.1]     # Attributes of the attached device with that name.
+    speedInDegPerSecond = 3
+    profile = {type = "trapezoid", acceleration = 20}   # See behaviors.MotionProfile.
+
+    [instruments.devices.5]     # With a type, a new device is attached, see PositionerBehavior.deviceTypes.
+    type = "Axis"
+
+Devices are detached with detach = ["3"], before any are attached.
+
+The chambers of a VotschBus can have sections of their own, by address, with parameters, commands
+and a program, as for an instrument:
+
+    [[instruments.chamber]]
+    address = 2                 # The chamber at $02.
+    program = "ClimateCycle.toml"
+
+    [instruments.chamber.parameters]
+    temperatureTimeConstant = 60
+
+A Generic instrument has a description, a path relative to the topology file. A climate chamber
+can be given a program, also a path relative to the topology file, which it starts running when it
+has been set up, see ClimateProgram.
+"""
+import concurrent.futures
+import json
+import os
+
+import ClimateProgram
+from GenericInstrument import parseDescription
+from behaviors import MotionProfile, PositionerBehavior
+
+
+def loadTopology(path):
+    """Return the instrument specifications in a topology file, as dicts."""
+    with open(path, 'rb') as f:
+        topology = parseDescription(path, f.read())
+    specifications = topology.get('instruments', [])
+    directory = os.path.dirname(os.path.abspath(path))
+    for specification in specifications:
+        if 'type' not in specification:
+            raise ValueError("An instrument in %s has no type" % path)
+        for section in [specification] + specification.get('chamber', []):
+            for pathEntry in ('description', 'program'):
+                if pathEntry in section:
+                    section[pathEntry] = os.path.join(directory, section[pathEntry])
+    return specifications
+
+
+def configure(instrument, specification):
+    """Set up an instrument as its specification says."""
+    instrument.name = specification.get('name', specification['type'])
+    if specification.get('port') is not None:
+        instrument.port = specification['port']
+    for parameter, value in specification.get('parameters', {}).items():
+        setParameter(instrument, parameter, value)
+    if specification.get('queryCache') and hasattr(instrument, 'queryCacheQuantum'):
+        instrument.queryCacheQuantum = specification['queryCache']
+    devices = specification.get('devices', {})
+    if (devices or 'detach' in specification) and not hasattr(instrument, 'deviceByName'):
+        raise ValueError("%s has no devices" % instrument.name)
+    for deviceName in specification.get('detach', []):
+        instrument.detach(str(deviceName))
+    for deviceName, parameters in devices.items():
+        parameters = dict(parameters)
+        typeName = parameters.pop('type', None)
+        if typeName is not None:
+            if typeName not in PositionerBehavior.deviceTypes:
+                raise ValueError("Unknown device type %s" % typeName)
+            instrument.attach(PositionerBehavior.deviceTypes[typeName](str(deviceName)))
+        device = instrument.deviceByName(str(deviceName))
+        for parameter, value in parameters.items():
+            if parameter == 'profile':
+                value = MotionProfile.profileFrom(value)
+            setParameter(device, parameter, value)
+    chambers = specification.get('chamber', [])
+    if chambers and not hasattr(instrument, 'chambers'):
+        raise ValueError("%s has no chambers on a bus" % instrument.name)
+    for chamberSpecification in chambers:
+        configureChamber(instrument, chamberSpecification)
+    for command in specification.get('commands', []):
+        instrument.responseFunction(command)
+    if 'program' in specification:
+        if not hasattr(instrument, 'runProgram'):
+            raise ValueError("%s runs no climate programs" % instrument.name)
+        instrument.runProgram(ClimateProgram.loadProgram(specification['program']))
+    return instrument
+
+
+def configureChamber(bus, specification):
+    """Set up the chamber at an address of a bus, as configure does an instrument."""
+    address = specification.get('address')
+    if not isinstance(address, int) or "$%02d" % address not in bus.chambers:
+        raise ValueError("%s has no chamber at address %s" % (bus.name, address))
+    chamber = bus.chamber(address)
+    name = "%s %s" % (bus.name, chamber.address)
+    return configure(chamber, dict(specification, type=type(chamber).__name__, name=name))
+
+
+def setParameter(target, parameter, value):
+    if not hasattr(target, parameter):
+        raise ValueError("%s has no parameter %s" % (getattr(target, 'name', target), parameter))
+    setattr(target, parameter, value)
+
+
+def bringUp(specifications, makeInstrument):
+    """Make and configure the instruments of a bench in parallel, and return them in the order specified.
+    makeInstrument(specification) makes an instrument of the specified type."""
+    def bringUpOne(specification):
+        return configure(makeInstrument(specification), specification)
+
+    with concurrent.futures.ThreadPoolExecutor(max(1, min(32, len(specifications)))) as executor:
+        return list(executor.map(bringUpOne, specifications))
+
+
+def boundPorts(instruments, listeningSockets):
+    return [{'name': instrument.name, 'port': s.getsockname()[1]} for instrument, s in zip(instruments, listeningSockets)]
+
+
+def portReport(instruments, listeningSockets):
+    """The ports that the instruments are served on, as one line of JSON."""
+    return json.dumps({'instruments': boundPorts(instruments, listeningSockets)})
@@ -2,6 +2,9 @@ from behaviors.SubDevice import SubDevice
 
 
 class AntennaStand(SubDevice):
+    # The limits and the speed can be set, but have no values until they are.
+    __slots__ = ('polarization', 'limit_clockwise', 'limit_anticlockwise', 'speedInDegPerSecond')
+
     def __init__(self, name):
         super().__init__(name)
         self.polarization = "H"
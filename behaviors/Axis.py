@@ -1,23 +1,47 @@
 import math
-import time
 
+import Clock
+import Scheduler
+from behaviors import MotionProfile
 from behaviors.SubDevice import SubDevice
 
 
 class Axis(SubDevice):
-    def __init__(self, name, slowDown=0):
+    __slots__ = ('clock', 'scheduler', 'completion', 'currentPosition', 'startPosition', 'speedValue', 'speed',
+                 'targetPosition', 'movementStartTime', 'triesCount', 'limit_clockwise', 'limit_anticlockwise',
+                 'slowDown', 'profile', 'motion', 'offset')
+
+    def __init__(self, name, slowDown=0, clock=None, profile=None):
         super().__init__(name)
+        self.clock = Clock.clockFor(clock)
+        self.scheduler = Scheduler.schedulerFor(self.clock)
+        self.completion = None  # The scheduled end of the current movement.
         self.currentPosition = 0
         self.startPosition = 0
         self.speedInDegPerSecond = 4.9
         self.speed = 3
         self.busy = False
         self.targetPosition = 1
-        self.movementStartTime = time.time()
+        self.movementStartTime = self.clock.now()
         self.triesCount = 0
+        self.offset = None  # The offset of the controller is used.
         self.limit_clockwise = 90
         self.limit_anticlockwise = -91
         self.slowDown = slowDown
+        self.profile = profile or MotionProfile.constantSpeed
+        self.motion = None  # The plan of the current movement.
+
+    @property
+    def speedInDegPerSecond(self):
+        return self.speedValue
+
+    @speedInDegPerSecond.setter
+    def speedInDegPerSecond(self, speed):
+        if self.busy:
+            self.update()  # Up to now, at the old speed.
+        self.speedValue = speed
+        if self.busy:  # The rest of the movement is at the new speed.
+            self.start_movement(self.targetPosition)
 
     def get_currentPosition(self):
         """"current position"""
@@ -29,22 +53,47 @@ class Axis(SubDevice):
         self.startPosition = self.currentPosition
         self.targetPosition = target
         self.busy = True
+        self.movementStartTime = self.clock.now()
+        self.motion = self.planMotion()
+        if self.completion is not None:
+            self.completion.cancel()
+        self.completion = None
+        if self.motion.duration < math.inf:
+            self.completion = self.scheduler.at(self.movementStartTime + self.motion.duration, self.finalizeMovement)
+
+    def planMotion(self):
+        return self.profile.plan(abs(self.targetPosition - self.startPosition), self.speedInDegPerSecond)
 
     def update(self):
-        slowDown = 0.8
-        elapsed = time.time() - self.movementStartTime
-        dist = slowDown * elapsed * self.speedInDegPerSecond
-        distToTravel = self.startPosition - self.targetPosition
-        if self.busy:
-            if dist > abs(distToTravel):
-                self.currentPosition = self.targetPosition
-                self.busy = False
-            else:
-                self.currentPosition = self.startPosition + slowDown * self.signedSpeed() * elapsed
+        self.scheduler.runDue()
+        if not self.busy:
+            return
+        if self.motion is None:  # Made busy without start_movement.
+            self.motion = self.planMotion()
+        elapsed = self.clock.now() - self.movementStartTime
+        if elapsed >= self.motion.duration:
+            self.finalizeMovement()
+        else:
+            distance = self.motion.distanceAt(elapsed)
+            self.currentPosition = self.startPosition + math.copysign(distance, self.targetPosition - self.startPosition)
 
     def signedSpeed(self):
         return math.copysign(self.speedInDegPerSecond, self.targetPosition - self.startPosition)
 
     def finalizeMovement(self):
         self.currentPosition = self.targetPosition
-        self.busy = False
\ No newline at end of file
+        self.busy = False
+        self.motion = None
+        if self.completion is not None:
+            self.completion.cancel()
+            self.completion = None
+
+    def stop(self):
+        """Stop where the device is now."""
+        if self.busy:
+            self.update()
+        self.busy = False
+        self.motion = None
+        if self.completion is not None:
+            self.completion.cancel()
+            self.completion = None
@@ -0,0 +1,136 @@
+"""
+Many axes, with their state in NumPy arrays, so that all of them can be updated with one vectorized call.
+
+    bank = AxisBank()
+    axes = [bank.axis(str(i)) for i in range(1000)]
+    ...
+    bank.update()   # Instead of axis.update() for each axis.
+
+Each BankAxis is an Axis, and works like one, but its movement state is a row in the arrays of its bank.
+The axes of a bank move at constant speed, as with MotionProfile.constantSpeed, and other profiles are
+rejected. A movement has no Motion and no scheduled end: it ends when the bank, or the axis, is updated.
+A positioner with bank axes updates their banks before it answers, see runDue.
+NumPy is only needed when a bank is used.
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import math
+
+import Clock
+from behaviors import MotionProfile
+from behaviors.Axis import Axis
+
+
+class AxisBank:
+    def __init__(self, capacity=16, clock=None):
+        if numpy is None:
+            raise ImportError("NumPy is needed for an AxisBank")
+        self.clock = Clock.clockFor(clock)
+        self.count = 0
+        self.axes = []
+        self.startPosition = numpy.zeros(capacity)
+        self.targetPosition = numpy.zeros(capacity)
+        self.currentPosition = numpy.zeros(capacity)
+        self.speed = numpy.zeros(capacity)
+        self.startTime = numpy.zeros(capacity)
+        self.busy = numpy.zeros(capacity, dtype=bool)
+
+    def axis(self, name):
+        """A new axis in this bank."""
+        if self.count == len(self.busy):
+            self.grow(2 * len(self.busy))
+        row = self.count
+        self.count += 1
+        axis = BankAxis(self, row, name)
+        self.axes.append(axis)
+        return axis
+
+    def grow(self, capacity):
+        for array in ('startPosition', 'targetPosition', 'currentPosition', 'speed', 'startTime', 'busy'):
+            old = getattr(self, array)
+            new = numpy.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, array, new)
+
+    def update(self):
+        """Update the positions of all axes, as Axis.update does for one."""
+        n = self.count
+        busy = self.busy[:n]
+        if not busy.any():
+            return
+        start = self.startPosition[:n]
+        target = self.targetPosition[:n]
+        slowDownFactor = MotionProfile.constantSpeed.slowDownFactor
+        travelled = slowDownFactor * (self.clock.now() - self.startTime[:n]) * self.speed[:n]
+        arrived = busy & (travelled >= numpy.abs(start - target))
+        moving = busy & ~arrived
+        self.currentPosition[:n][arrived] = target[arrived]
+        busy[arrived] = False
+        for row in numpy.flatnonzero(arrived):
+            owner = self.axes[row].owner
+            if owner is not None:
+                owner.busyCount -= 1
+        self.currentPosition[:n][moving] = start[moving] + numpy.copysign(travelled[moving],
+                                                                          target[moving] - start[moving])
+
+    def runDue(self):
+        """As Scheduler.runDue, so that a positioner brings the axes of the bank up to date before it answers."""
+        self.update()
+
+
+def rowProperty(array):
+    def get(self):
+        return getattr(self.bank, array)[self.row].item()
+
+    def set(self, value):
+        getattr(self.bank, array)[self.row] = value
+
+    return property(get, set)
+
+
+class BankAxis(Axis):
+    __slots__ = ('bank', 'row')
+
+    def __init__(self, bank, row, name):
+        self.bank = bank
+        self.row = row
+        super().__init__(name, clock=bank.clock)
+        self.scheduler = bank  # Its movements end when the bank is updated, see AxisBank.runDue.
+
+    @property
+    def profile(self):
+        return MotionProfile.constantSpeed
+
+    @profile.setter
+    def profile(self, profile):
+        if not (isinstance(profile, MotionProfile.ConstantSpeed)
+                and profile.slowDownFactor == MotionProfile.constantSpeed.slowDownFactor):
+            raise ValueError("The axes of a bank move at constant speed, as with MotionProfile.constantSpeed")
+
+    def start_movement(self, target):
+        self.startPosition = self.currentPosition
+        self.targetPosition = target
+        self.busy = True
+        self.movementStartTime = self.clock.now()
+
+    def update(self):
+        """As AxisBank.update, for this axis only."""
+        if not self.busy:
+            return
+        start = self.startPosition
+        target = self.targetPosition
+        travelled = self.profile.slowDownFactor * (self.clock.now() - self.movementStartTime) * self.speedValue
+        if travelled >= abs(start - target):
+            self.finalizeMovement()
+        else:
+            self.currentPosition = start + math.copysign(travelled, target - start)
+
+    currentPosition = rowProperty('currentPosition')
+    startPosition = rowProperty('startPosition')
+    targetPosition = rowProperty('targetPosition')
+    speedValue = rowProperty('speed')  # Axis.speedInDegPerSecond re-plans a movement in progress.
+    movementStartTime = rowProperty('startTime')
+    busyFlag = rowProperty('busy')  # SubDevice.busy keeps the owner's busy count.
@@ -0,0 +1,63 @@
+from behaviors.CommandTable import CommandTable
+from behaviors.ResponseCache import ResponseCache
+from socketInstrument import SocketInstrument
+
+
+class CommandBehavior(SocketInstrument):
+    """A behavior whose commands are declared with @command on their handler methods.
+
+    The declared commands of a class and its base classes are built into one CommandTable when
+    the class is created, in the order they are declared, base class commands first.
+    A subclass can override a handler by defining a method with the same name.
+    """
+
+    commandTable = CommandTable([])
+    queryCache = None  # A ResponseCache, if queryCacheQuantum has been set.
+    dispatchedCommand = None  # The Command that the last command string matched, None if it matched none.
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        commands = {}
+        for klass in reversed(cls.__mro__):
+            for name, member in vars(klass).items():
+                declared = getattr(member, 'declaredCommand', None)
+                if declared is not None:
+                    commands[name] = declared
+                elif name in commands:
+                    del commands[name]  # Overridden by something that is not a command.
+        cls.commandTable = CommandTable(commands.values())
+
+    def __init__(self):
+        super().__init__()
+        self.command = ""
+
+    @property
+    def queryCacheQuantum(self):
+        """Seconds that the responses to queries are reused for, see ResponseCache. 0 means no cache."""
+        return self.queryCache.quantum if self.queryCache is not None else 0
+
+    @queryCacheQuantum.setter
+    def queryCacheQuantum(self, quantum):
+        self.queryCache = ResponseCache(quantum, responseEOL=self.responseEOL) if quantum > 0 else None
+
+    def commandFor(self, commandString):
+        return self.commandTable.match(commandString)[0]
+
+    def responseFunction(self, commandString):
+        commandString = commandString.strip()
+        command, arguments = self.commandTable.lookup(commandString)
+        self.dispatchedCommand = command
+        if command is None:
+            return self.badCommand()
+        self.command = commandString
+        if self.queryCache is not None:
+            if command.isQuery:
+                return self.queryCache.response(self, command, arguments)
+            self.queryCache.invalidate()
+        return self.execute(command, arguments)
+
+    def execute(self, command, arguments):
+        return command.respond(self, arguments)
+
+    def badCommand(self):
+        return "E - x"
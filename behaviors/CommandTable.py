@@ -0,0 +1,91 @@
+import re
+
+
+class Command:
+    """A declared command: the pattern that recognizes it, the types of its arguments,
+    the handler, the format of the response, and whether it is a query.
+    """
+
+    def __init__(self, pattern, handler, argumentTypes=(), responseFormat=None, isQuery=False):
+        self.pattern = pattern
+        self.handler = handler
+        self.argumentTypes = tuple(argumentTypes)
+        self.responseFormat = responseFormat
+        self.isQuery = isQuery
+
+    @property
+    def name(self):
+        return self.handler.__name__
+
+    def respond(self, behavior, arguments):
+        value = self.handler(behavior, *arguments)
+        if self.responseFormat is None:
+            return value
+        return self.responseFormat % value
+
+
+def command(pattern, *argumentTypes, response=None, query=False):
+    """Declare a method of a CommandBehavior as the handler of the commands that match pattern.
+
+    Capturing groups in the pattern are the arguments, converted by argumentTypes (float by default)
+    and passed to the handler. If a response format is given, the handler returns the value to format.
+    """
+    def declare(handler):
+        handler.declaredCommand = Command(pattern, handler, argumentTypes, response, query)
+        return handler
+    return declare
+
+
+class CommandTable:
+    """Select the command for a command string, and extract its arguments, with one regex match.
+
+    The table is made from Commands, or from an ordered dict of regular expressions and handlers.
+    All patterns are compiled once, into a single regular expression with one alternative per pattern,
+    so the command of the first pattern that matches the start of the string is found in one pass.
+    This is the same selection as trying re.match with each pattern in turn.
+
+    Capturing groups in a pattern mark its arguments, which are floats unless other argument types
+    are declared. They must not be optional. Use (?:...) for groups that are not arguments.
+    """
+
+    def __init__(self, commands):
+        if isinstance(commands, dict):
+            commands = [Command(pattern, handler) for pattern, handler in commands.items()]
+        self.commands = list(commands)
+        alternatives = []
+        self.commandByGroup = {}
+        groupIndex = 1
+        for cmd in self.commands:
+            argumentCount = re.compile(cmd.pattern).groups
+            argumentTypes = cmd.argumentTypes or argumentCount * (float,)
+            if len(argumentTypes) != argumentCount:
+                raise ValueError("%d argument types for the %d arguments of '%s'"
+                                 % (len(argumentTypes), argumentCount, cmd.pattern))
+            alternatives.append("(%s)" % cmd.pattern)
+            # The outer group of an alternative is the last one to close, so it is the lastindex of a match.
+            self.commandByGroup[groupIndex] = (cmd, argumentTypes, groupIndex + 1)
+            groupIndex += 1 + argumentCount
+        self.regex = re.compile("|".join(alternatives)) if alternatives else re.compile("(?!)")
+
+    @property
+    def patternsToHandlers(self):
+        return {cmd.pattern: cmd.handler for cmd in self.commands}
+
+    def lookup(self, commandString):
+        """Return the Command and the arguments of a command string, or (None, ()) if no pattern matches."""
+        m = self.regex.match(commandString)
+        if m is None:
+            return None, ()
+        cmd, argumentTypes, firstArgument = self.commandByGroup[m.lastindex]
+        if not argumentTypes:
+            return cmd, ()
+        if len(argumentTypes) == 1:
+            return cmd, (argumentTypes[0](m.group(firstArgument)),)
+        return cmd, tuple(convert(m.group(i)) for i, convert in enumerate(argumentTypes, firstArgument))
+
+    def match(self, commandString):
+        """Return the handler and the arguments of a command string, or (None, ()) if no pattern matches."""
+        cmd, arguments = self.lookup(commandString)
+        if cmd is None:
+            return None, ()
+        return cmd.handler, arguments
@@ -1,11 +1,19 @@
-import re
-import time
-
 from behaviors.Axis import Axis
-from socketInstrument import SocketInstrument
+from behaviors.CommandTable import command
+from behaviors.PositionerBehavior import PositionerBehavior
+
 
+class InncoBehavior(PositionerBehavior):
+    vendor = "innco GmbH"
+    model = "CO3000"
+    serial = "python"
+    firmware = "1.02.62"
+
+    staticResponses = {
+        "*IDN?": ','.join([vendor, model, serial, firmware]),
+    }
 
-class InncoBehavior(SocketInstrument):
+    devNamesToAttach = ['DS1', 'DS2', 'AS3']  # Shared by all instances.
 
     # Current problems (related to OneTE VisaConnector):
 
@@ -26,152 +34,60 @@ class InncoBehavior(SocketInstrument):
     # DONE: implementera LD # NSP
     # DONE: implementera att förställa målvärde från kommandoraden
 
+    @command(r"\*IDN\?", query=True)
     def Idn_response(self):
-        idnString = ','.join([self.vendor, self.model, self.serial, self.firmware])
-        return idnString
+        return self.staticResponses["*IDN?"]
 
+    @command(r"\*OPT\?", query=True)
     def OPT_response(self):
         deviceNames = [dev.name for dev in self.attachedDevices]
         return ','.join(deviceNames)
 
-    def LD_NP_GO_response(self):
-        command = self.command
-        assert command != ""
-        cd = self.currentDevice
-        cd.startPosition = cd.currentPosition
-        cd.busy = True
-        normalTarget = self.numberFromInncoCommand(command)
-        adjust = self.adjustment(normalTarget)
-        cd.targetPosition = normalTarget + adjust
-        cd.movementStartTime = time.time()
-        return str(normalTarget)
-
-    def adjustment(self, normalTarget):
-        if self.isDistant(normalTarget):
-            self.triesCount = 0
-            adjust = self.offset
-        elif self.triesCount < self.maxTries:
-            self.triesCount += 1
-            adjust = self.offset
-        else:
-            adjust = 0
-        return adjust
-
-    def isBusy(self):
-        """"the whole unit is busy, because one device is."""
-        devices = self.attachedDevices
-        states = [dev.busy for dev in devices]
-        busy = any(states)
-        return busy
-
-    def isDistant(self, target):
-        distance = abs(target - self.currentDevice.currentPosition)
-        return distance > self.farDistance
-
-    def BU_Response(self):
-        """"business"""
-        self.currentDevice.update()
-        if self.isBusy():
-            return "1"
-        else:
-            return "0"
-
+    @command(r"CP\ *", response="%.1f", query=True)
     def CP_response(self):
         """"current position"""
         self.currentDevice.update()
-        return "%.1f" % self.currentDevice.currentPosition
+        return self.currentDevice.currentPosition
 
+    @command(r"WL\ *", response="%.1f", query=True)
     def WL_response(self):
         """"clockwise limit"""
-        return "%.1f" % self.currentDevice.limit_clockwise
+        return self.currentDevice.limit_clockwise
 
+    @command(r"CL\ *", response="%.1f", query=True)
     def CL_response(self):
         """"anticlockwise limit"""
-        return "%.1f" % self.currentDevice.limit_anticlockwise
+        return self.currentDevice.limit_anticlockwise
 
+    @command(r"NSP", response="%.1f", query=True)
     def NSP_response(self):
         """"current speed"""
-        # self.updatePositionAndBusiness()
-        return "%.1f" % self.currentDevice.speedInDegPerSecond
+        return self.currentDevice.speedInDegPerSecond
 
-    def LD_ppp_NSP_response(self):
-        """"new numeric speed"""
-        self.currentDevice.speedInDegPerSecond = self.numberFromInncoCommand(self.command)
-        return "%.1f" % self.currentDevice.speedInDegPerSecond
+    @command(r"LD ([-]?\d+(?:\.\d+)?) DG NP GO")
+    def LD_NP_GO_response(self, normalTarget):
+        assert self.command != ""
+        self.startMovement(normalTarget)
+        return str(normalTarget)
 
-    def LD_dev_DV_response(self):
+    @command(r"LD (DS.) DV", str)  # TODO: regexp som tar olika värden istället för DS1
+    def LD_dev_DV_response(self, devname):
         """"set active device"""
         # For now, this returns a plausible value; the index of the selected device in the attached-device list
-
-        cmd = self.command
-        devname = cmd.split()[1]
         self.currentDevice = self.deviceByName(devname)
         return "1"
 
-    @staticmethod
-    def badCommand():
-        return "E - x"
-
-    patterns_to_select_command = {
-        # Just enough to recognize which command is being sent. Extraction of values is done in other places.
-        "en re": "vad den matchar",
-        "\*IDN\?": Idn_response,
-        "\*OPT\?": OPT_response,
-        "^CP\ *": CP_response,
-        "^WL\ *": WL_response,
-        "^CL\ *": CL_response,
-        "^NSP": NSP_response,
-        "LD [-]?\d+(\.\d+)? DG NP GO": LD_NP_GO_response,
-        "LD DS. DV": LD_dev_DV_response,  # TODO: regexp som tar olika värden istället för DS1
-        "^BU(\ )*": BU_Response,
-        "LD [-]?\d+(\.\d+)? NSP": LD_ppp_NSP_response
-    }
-
-    def commandFor(self, commandString):
-        rePatterns = self.patterns_to_select_command
-        for rePattern in rePatterns:
-            if re.match(rePattern, commandString):
-                return self.patterns_to_select_command[rePattern]
-        return None  # "no match"
-
-    def responseFunction(self, commandString):
-        commandString = commandString.strip()
-        command = self.commandFor(commandString)
-        if command:
-            self.command = commandString
-            return command(self)
-        return self.badCommand()
-
-    @staticmethod
-    def numberFromInncoCommand(s):
-        """"Extract a number from a command string such as 'LD -123.4 NP GO'. """
-
-        # All relevant Innco Commands seem to have the number at the second position.
-        words = s.split()
-        return float(words[1])
-
-    def deviceByName(self, name):
-        d = {}
-        for dev in self.attachedDevices:
-            devName = dev.name
-            d[devName] = dev
-        return d[name]
+    @command(r"LD ([-]?\d+(?:\.\d+)?) NSP", response="%.1f")
+    def LD_ppp_NSP_response(self, speed):
+        """"new numeric speed"""
+        self.currentDevice.speedInDegPerSecond = speed
+        return self.currentDevice.speedInDegPerSecond
 
     def __init__(self):
         super().__init__()
         self.port = 2049  # Vötsch standard port. According to Wikipedia, it's usually used for nfs.
         # Since we only use GPIB for the Innco RotaryDisc, this port will only be used for development tests
-        self.vendor = "innco GmbH"
-        self.model = "CO3000"
-        self.serial = "python"
-        self.firmware = "1.02.62"
-        self.devNamesToAttach = ['DS1', 'DS2', 'AS3']
         self.attachedDevices = [Axis(d) for d in self.devNamesToAttach]
-        self.command = ""
-        self.offset = 0
-        self.farDistance = 10
-        self.maxTries = 5
-        self.triesCount = 0
         self.limit_clockwise = 400
         self.limit_anticlockwise = -120
         self.currentDevice = self.attachedDevices[0]
\ No newline at end of file
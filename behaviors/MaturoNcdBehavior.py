@@ -1,32 +1,29 @@
-import re
-import time
-
 from behaviors.AntennaStand import AntennaStand
 from behaviors.Axis import Axis
-from socketInstrument import SocketInstrument
+from behaviors.CommandTable import command
+from behaviors.PositionerBehavior import PositionerBehavior
+
+
+class MaturoNcdBehavior(PositionerBehavior):
+    vendor = "Maturo"
+    model = "NCD"
+    serial = "266"
+    # firmware = "1.02.62"
 
+    staticResponses = {
+        "*IDN?": "%s,%s_%s" % (vendor, model, serial),
+    }
 
-class MaturoNcdBehavior(SocketInstrument):
+    devNamesToAttach = ['3', '1', '0']  # Shared by all instances.
 
     def __init__(self):
         """Constructor"""
         super().__init__()
         self.port = 200  # Maturo standard port.
-        self.communicator.port = self.port
         # Since we only use GPIB for the Innco RotaryDisc, this port will only be used for development tests
-        self.vendor = "Maturo"
-        self.model = "NCD"
-        self.serial = "266"
-        # self.firmware = "1.02.62"
 
         # Unit tests rely on devices 1 and 3 being RotaryDiscs, and 0 an AntennaStand.
-        self.devNamesToAttach = ['3', '1', '0']
         self.attachedDevices = [Axis('1'), Axis('3'), AntennaStand('0')]
-        self.command = ""
-        self.offset = 0
-        self.farDistance = 10
-        self.maxTries = 5
-        self.triesCount = 0
         self.currentDevice = self.attachedDevices[2]
 
     # Current problems (related to OneTE VisaConnector):
@@ -45,111 +42,72 @@ class MaturoNcdBehavior(SocketInstrument):
     # It's the same VisaConnector.
 
 
+    @command(r"\*IDN\?", query=True)
     def Idn_response(self):
         """Response to the *IDN? command, returning a string with vendor, model and serial number."""
-        idnString = "%s,%s_%s" % (self.vendor, self.model, self.serial)
-        return idnString
-
-    def LD_NP_GO_response(self):
-        command = self.command
-        assert command != ""
-        cd = self.currentDevice
-        cd.startPosition = cd.currentPosition
-        cd.busy = True
-        normalTarget = self.numberFromCommand(command)
-        adjust = self.adjustment(normalTarget)
-        cd.targetPosition = normalTarget + adjust
-        cd.movementStartTime = time.time()
-        return ""
-
-    def adjustment(self, normalTarget):
-        if self.isDistant(normalTarget):
-            self.triesCount = 0
-            adjust = self.offset
-        elif self.triesCount < self.maxTries:
-            self.triesCount += 1
-            adjust = self.offset
-        else:
-            adjust = 0
-        return adjust
-
-    def isBusy(self):
-        """The whole unit is busy, because one device is."""
-        devices = self.attachedDevices
-        states = [dev.busy for dev in devices]
-        busy = any(states)
-        return busy
-
-    def isDistant(self, target):
-        distance = abs(target - self.currentDevice.currentPosition)
-        return distance > self.farDistance
-
-    def BU_Response(self):
-        """"business"""
-        self.currentDevice.update()
-        if self.isBusy():
-            return "1"
-        else:
-            return "0"
+        return self.staticResponses["*IDN?"]
 
+    @command(r"CP\ *", response="%.0f", query=True)
     def CP_response(self):
         """current position"""
         self.currentDevice.update()
-        return "%.0f" % self.currentDevice.currentPosition
+        return self.currentDevice.currentPosition
 
+    @command(r"RP\ *", response="%.2f", query=True)
     def RP_response(self):
         """current position, with decimals"""
         self.currentDevice.update()
-        return "%.2f" % self.currentDevice.currentPosition
+        return self.currentDevice.currentPosition
 
+    @command(r"WL\ *", response="%.2f", query=True)
     def WL_response(self):
         """clockwise limit"""
-        return "%.2f" % self.currentDevice.limit_clockwise
+        return self.currentDevice.limit_clockwise
 
+    @command(r"CL\ *", response="%.2f", query=True)
     def CL_response(self):
         """anticlockwise limit"""
-        return "%.2f" % self.currentDevice.limit_anticlockwise
+        return self.currentDevice.limit_anticlockwise
 
+    @command(r"SP", response="%.0f", query=True)
     def SP_response(self):
         """current speed"""
-        # self.updatePositionAndBusiness()
-        try:
-            return "%.0f" % self.currentDevice.speedInDegPerSecond
-        except AttributeError:
-            return "E - V"
+        return self.currentDevice.speedInDegPerSecond
 
+    @command(r"ST")
     def ST_response(self):
-        self.currentDevice.busy = False
+        self.currentDevice.stop()
         return ""
 
-    def LD_SP_response(self):
-        """new numeric speed"""
-        self.currentDevice.speedInDegPerSecond = self.numberFromCommand(self.command)
+    @command(r"LD ([-]?\d+(?:\.\d+)?) DG NP GO")
+    def LD_NP_GO_response(self, normalTarget):
+        assert self.command != ""
+        self.startMovement(normalTarget)
         return ""
 
-    def LD_dev_DV_response(self):
-        """set active device"""
-        # For now, this returns a plausible value; the index of the selected device in the attached-device list
+    @command(r"LD ([-]?\d+(?:\.\d+)?) DG WL")
+    def LD_x_DG_WL_response(self, limit):
+        self.currentDevice.limit_clockwise = limit
+        return ""
 
-        cmd = self.command
-        devname = cmd.split()[1]
-        self.currentDevice = self.deviceByName(devname)
+    @command(r"LD ([-]?\d+(?:\.\d+)?) DG CL")
+    def LD_x_DG_CL_response(self, limit):
+        self.currentDevice.limit_anticlockwise = limit
         return ""
 
-    def LD_x_DG_WL_response(self):
-        command = self.command
-        cd = self.currentDevice
-        limit = self.numberFromCommand(command)
-        cd.limit_clockwise = limit
+    @command(r"LD (\d+) DV", str)
+    def LD_dev_DV_response(self, devname):
+        """set active device"""
+        self.currentDevice = self.deviceByName(devname)
         return ""
 
-    def LD_x_DG_CL_response(self):
-        command = self.command
-        cd = self.currentDevice
-        limit = self.numberFromCommand(command)
-        cd.limit_anticlockwise = limit
+    @command(r"LD ([-]?\d+(?:\.\d+)?) SP")
+    def LD_SP_response(self, speed):
+        """new numeric speed"""
+        self.currentDevice.speedInDegPerSecond = speed
         return ""
 
+    @command(r"PH")
     def PH_response(self):
         dev = self.currentDevice
         if isinstance(dev, AntennaStand):
@@ -158,6 +116,7 @@ class MaturoNcdBehavior(SocketInstrument):
         else:
             return "E - V"
 
+    @command(r"PV")
     def PV_response(self):
         dev = self.currentDevice
         if isinstance(dev, AntennaStand):
@@ -166,68 +125,18 @@ class MaturoNcdBehavior(SocketInstrument):
         else:
             return "E - V"
 
+    @command(r"P\?", query=True)
     def P_response(self):
+        pol = self.currentDevice.polarization
+        assert pol in ["H", "V"]
+        if pol == "V":
+            return "1"
+        return "0"
+
+    def execute(self, command, arguments):
         try:
-            pol = self.currentDevice.polarization
-            assert pol in ["H", "V"]
-            if pol == "V":
-                return "1"
-            return "0"
-        except AttributeError:
+            return super().execute(command, arguments)
+        except (AttributeError, KeyError):
+            # The current device doesn't have what the command needs, e.g. a polarization,
+            # or there is no device with the name.
             return "E - V"
-
-    def badCommand(self):
-        return "E - x"
-
-    def commandFor(self, commandString):
-        rePatterns = self.patterns_to_select_command
-        for rePattern in rePatterns:
-            if re.match(rePattern, commandString):
-                return self.patterns_to_select_command[rePattern]
-        return None  # "no match"
-
-    def responseFunction(self, commandString):
-        commandString = commandString.strip()
-        command = self.commandFor(commandString)
-        if command:
-            self.command = commandString
-            try:
-                return command(self)
-            except AttributeError:
-                return "E - V"
-        return self.badCommand()
-
-    def numberFromCommand(self, s):
-        """Extract a number from a command string such as 'LD -123.4 NP GO'. """
-
-        # All relevant Innco Commands seem to have the number at the second position.
-        words = s.split()
-        return float(words[1])
-
-    def deviceByName(self, name):
-        d = {}
-        for dev in self.attachedDevices:
-            devName = dev.name
-            d[devName] = dev
-        return d[name]
-
-    patterns_to_select_command = {
-        # Just enough to recognize which command is being sent. Extraction of values is done in other places.
-        "en re": "vad den matchar",
-        "\*IDN\?": Idn_response,
-        "^CP\ *": CP_response,
-        "^RP\ *": RP_response,
-        "^WL\ *": WL_response,
-        "^CL\ *": CL_response,
-        "^SP": SP_response,
-        "^ST": ST_response,
-        "LD [-]?\d+(\.\d+)? DG NP GO": LD_NP_GO_response,
-        "LD [-]?\d+(\.\d+)? DG WL": LD_x_DG_WL_response,
-        "LD [-]?\d+(\.\d+)? DG CL": LD_x_DG_CL_response,
-        "LD \d DV": LD_dev_DV_response,
-        "^BU(\ )*": BU_Response,
-        "LD [-]?\d+(\.\d+)? SP": LD_SP_response,
-        "PH": PH_response,
-        "PV": PV_response,
-        "P\?": P_response
-    }
\ No newline at end of file
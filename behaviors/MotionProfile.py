@@ -0,0 +1,103 @@
+"""
+How a device moves from its start position to its target.
+
+A profile plans each movement once, when it starts, as a Motion: a few segments, each with a
+closed-form distance as a function of time. The position at any time is then found by evaluating
+one segment. The segment of the last lookup is remembered, so polling is O(1).
+
+- ConstantSpeed: full speed from start to end. The default, at 0.8 times the nominal speed,
+  since the simulated devices have always been that much slower than their nominal speed.
+- Trapezoid: constant acceleration up to the nominal speed, and constant deceleration to the target.
+- SCurve: as Trapezoid, but the speed changes smoothly, without jumps in acceleration.
+"""
+import bisect
+import math
+
+
+class Motion:
+    """A planned movement. The segments are (start time, start distance, start speed, speed change,
+    duration, smooth), with times relative to the start of the movement."""
+    __slots__ = ('segments', 'starts', 'duration', 'distance', 'index')
+
+    def __init__(self, segments, distance):
+        self.segments = segments
+        self.starts = [segment[0] for segment in segments]
+        last = segments[-1]
+        self.duration = last[0] + last[4]
+        self.distance = distance
+        self.index = 0
+
+    def distanceAt(self, t):
+        """The distance travelled t seconds after the start."""
+        if t >= self.duration:
+            return self.distance
+        if t <= 0:
+            return 0.0
+        i = self.index
+        starts = self.starts
+        if t < starts[i] or (i + 1 < len(starts) and t >= starts[i + 1]):
+            i = self.index = bisect.bisect_right(starts, t) - 1
+        start, d0, v0, dv, duration, smooth = self.segments[i]
+        dt = t - start
+        if smooth:
+            return d0 + v0 * dt + dv / 2 * (dt - duration / math.pi * math.sin(math.pi * dt / duration))
+        return d0 + v0 * dt + dv / duration * dt * dt / 2
+
+
+class ConstantSpeed:
+    def __init__(self, slowDownFactor=0.8):
+        self.slowDownFactor = slowDownFactor
+
+    def plan(self, distance, speed):
+        speed = self.slowDownFactor * speed
+        duration = distance / speed if speed > 0 else math.inf
+        return Motion([(0.0, 0.0, speed, 0.0, duration, False)], distance)
+
+
+class Trapezoid:
+    smooth = False
+
+    def __init__(self, acceleration):
+        self.acceleration = acceleration  # Degrees per second squared.
+
+    def plan(self, distance, speed):
+        a = self.acceleration
+        if distance <= 0:
+            return Motion([(0.0, 0.0, 0.0, 0.0, 0.0, False)], distance)
+        if speed <= 0 or a <= 0:
+            return Motion([(0.0, 0.0, 0.0, 0.0, math.inf, False)], distance)
+        if speed * speed / a >= distance:
+            speed = math.sqrt(a * distance)  # Too short to reach full speed.
+        rampTime = speed / a
+        rampDistance = speed * rampTime / 2
+        cruiseTime = (distance - 2 * rampDistance) / speed
+        return Motion([
+            (0.0, 0.0, 0.0, speed, rampTime, self.smooth),
+            (rampTime, rampDistance, speed, 0.0, cruiseTime, False),
+            (rampTime + cruiseTime, distance - rampDistance, speed, -speed, rampTime, self.smooth),
+        ], distance)
+
+
+class SCurve(Trapezoid):
+    """The speed changes along half a cosine wave, which takes as long as the trapezoid's ramp."""
+    smooth = True
+
+
+constantSpeed = ConstantSpeed()
+
+profileTypes = {
+    'constant': ConstantSpeed,
+    'trapezoid': Trapezoid,
+    'scurve': SCurve,
+}
+
+
+def profileFrom(description):
+    """A profile from its description, such as {'type': 'trapezoid', 'acceleration': 20}, or just 'constant'."""
+    if isinstance(description, str):
+        description = {'type': description}
+    parameters = dict(description)
+    typeName = parameters.pop('type')
+    if typeName not in profileTypes:
+        raise ValueError("Unknown motion profile %s" % typeName)
+    return profileTypes[typeName](**parameters)
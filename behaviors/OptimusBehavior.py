@@ -1,89 +1,60 @@
-import re
+from behaviors.CommandBehavior import CommandBehavior
+from behaviors.CommandTable import command
 
-from socketInstrument import SocketInstrument
 
+class OptimusBehavior(CommandBehavior):
+    vendor = "Ericsson"
+    model = "Optimus"
+    serial = "123"
+    firmwareRevision = "PA1"
 
-class OptimusBehavior(SocketInstrument):
+    staticResponses = {
+        "*IDN?": vendor + ', ' + model + ', ' + serial + ', ' + firmwareRevision,
+    }
 
     def __init__(self):
         self.x, self.y, self.phi, self.theta = (None, None, None, None)
         self.xStatus, self.yStatus, self.phiStatus, self.thetaStatus = (0, 0, 0, 0)
         self.sensorPower = 0
         self.motorPower = 0
-        self.command = None
-        self.vendor = "Ericsson"
-        self.model = "Optimus"
-        self.serial = "123"
-        self.firmwareRevision = "PA1"
         super().__init__()
 
+    @command(r"\*IDN\?", query=True)
     def Idn_response(self):
-        # idnString = ','.join([self.vendor, self.model, self.serial, self.firmware])
-        idnString = self.vendor + ', ' + self.model + ', ' + self.serial + ', ' + self.firmwareRevision
-        return idnString
-
-    def commandFor(self, commandString):
-        rePatterns = self.patterns_to_select_command
-        for rePattern in rePatterns:
-            if re.match(rePattern, commandString):
-                return self.patterns_to_select_command[rePattern]
-        return None  # "no match"
-
-    def responseFunction(self, commandString):
-        commandString = commandString.strip()
-        command = self.commandFor(commandString)
-        if command:
-            self.command = commandString
-            return command(self)
-        return self.badCommand()
+        return self.staticResponses["*IDN?"]
 
+    @command(r"status", query=True)
     def statusResponse(self):
         return "%d, %d, %.1f (%d), %.1f (%d), %.1f (%d), %.1f (%d)" % (self.sensorPower, self.motorPower,
                                                                        self.x, self.xStatus, self.y, self.yStatus,
                                                                        self.phi, self.phiStatus, self.theta,
                                                                        self.thetaStatus)
 
+    @command(r"mv_to_zero")
     def zeroResponse(self):
         # TODO: Remove, not present in Optimus.
         self.x, self.y, self.phi, self.theta = (0, 0, 0, 0)
         return "ack"
 
-    def xToResponse(self):
-        self.x = self.numberFromCommand(self.command)
+    @command(r"move_x_to ([-]?\d+(?:\.\d+)?)")
+    def xToResponse(self, x):
+        self.x = x
         return "ok"
 
-    def yToResponse(self):
-        self.y = self.numberFromCommand(self.command)
+    @command(r"move_y_to ([-]?\d+(?:\.\d+)?)")
+    def yToResponse(self, y):
+        self.y = y
         return "ok"
 
-    def phiToResponse(self):
-        self.phi = self.numberFromCommand(self.command)
+    @command(r"rotate_phi_to ([-]?\d+(?:\.\d+)?)")
+    def phiToResponse(self, phi):
+        self.phi = phi
         return "ok"
 
-    def thetaToResponse(self):
-        self.theta = self.numberFromCommand(self.command)
+    @command(r"rotate_theta_to ([-]?\d+(?:\.\d+)?)")
+    def thetaToResponse(self, theta):
+        self.theta = theta
         return "ok"
 
-    @staticmethod
-    def badCommand():
+    def badCommand(self):
         return "nack"
-
-    @staticmethod
-    def numberFromCommand(s):
-        """Extract a number from a command string such as 'move_h_to -123.4'. """
-
-        # All relevant commands seem to have the number at the second position.
-        words = s.split()
-        return float(words[1])
-
-    patterns_to_select_command = {
-        # Just enough to recognize which command is being sent. Extraction of values is done in other places.
-        "en re": "vad den matchar",
-        "mv_to_zero": zeroResponse,
-        "move_x_to [-]?\d+(\.\d+)?": xToResponse,
-        "move_y_to [-]?\d+(\.\d+)?": yToResponse,
-        "rotate_phi_to [-]?\d+(\.\d+)?": phiToResponse,
-        "rotate_theta_to [-]?\d+(\.\d+)?": thetaToResponse,
-        "\*IDN\?": Idn_response,
-        "status": statusResponse
-    }
\ No newline at end of file
@@ -0,0 +1,126 @@
+import Scheduler
+from behaviors.AntennaStand import AntennaStand
+from behaviors.Axis import Axis
+from behaviors.CommandBehavior import CommandBehavior
+from behaviors.CommandTable import command
+
+# Device types by name, for devices that are attached from a configuration.
+deviceTypes = {
+    'Axis': Axis,  # Turntables, and the height of masts.
+    'AntennaStand': AntennaStand,  # Polarization.
+}
+
+
+class PositionerBehavior(CommandBehavior):
+    """Common behavior of positioner controllers, such as the innco CO3000 and the Maturo NCD.
+    A controller has several attached devices, and commands go to the current one.
+    The devices move independently, each with its own tries count, see adjustment.
+    """
+
+    otherSchedulers = ()  # Of attached devices with clocks of their own, see runDueEvents.
+
+    def __init__(self):
+        super().__init__()
+        self.busyCount = 0  # Kept up to date by the attached devices.
+        self.devicesByName = {}  # In the order that the devices were attached.
+        self.currentDevice = None
+        self.offset = 0  # For devices without an offset of their own.
+        self.farDistance = 10
+        self.maxTries = 5
+        self.scheduler = Scheduler.schedulerFor()
+
+    @property
+    def attachedDevices(self):
+        return list(self.devicesByName.values())
+
+    @attachedDevices.setter
+    def attachedDevices(self, devices):
+        devices = list(devices)
+        devicesByName = {device.name: device for device in devices}
+        if len(devicesByName) != len(devices):
+            raise ValueError("Several devices have the same name")
+        for device in self.devicesByName.values():
+            device.owner = None
+        self.devicesByName = devicesByName
+        for device in devices:
+            device.owner = self
+            self.useSchedulerOf(device)
+        self.busyCount = sum(1 for device in devices if device.busy)
+
+    def attach(self, device):
+        """Attach a device, in place of an attached device with the same name."""
+        if device.name in self.devicesByName:
+            self.detach(device.name)
+        self.devicesByName[device.name] = device
+        device.owner = self
+        self.useSchedulerOf(device)
+        if device.busy:
+            self.busyCount += 1
+        if self.currentDevice is None:
+            self.currentDevice = device
+
+    def detach(self, name):
+        """Detach a device, and return it. If it was the current device, the first remaining device is."""
+        device = self.devicesByName.pop(name)
+        device.owner = None
+        if device.busy:
+            self.busyCount -= 1
+        if self.currentDevice is device:
+            self.currentDevice = next(iter(self.devicesByName.values()), None)
+        return device
+
+    def useSchedulerOf(self, device):
+        scheduler = getattr(device, 'scheduler', None)
+        if scheduler is not None and scheduler is not self.scheduler and scheduler not in self.otherSchedulers:
+            self.otherSchedulers = self.otherSchedulers + (scheduler,)
+
+    def runDueEvents(self):
+        self.scheduler.runDue()
+        for scheduler in self.otherSchedulers:
+            scheduler.runDue()
+
+    def responseFunction(self, command):
+        # Movements of all devices, not only the current one, end when they are due.
+        self.runDueEvents()
+        return super().responseFunction(command)
+
+    def startMovement(self, normalTarget):
+        """Start moving the current device towards normalTarget, or a bit off from it, see adjustment."""
+        device = self.currentDevice
+        adjust = self.adjustment(normalTarget, device)
+        device.start_movement(normalTarget + adjust)
+
+    def adjustment(self, normalTarget, device=None):
+        """The offset from normalTarget that a device is moved to. It is the offset of the device, or of the
+        controller, unless the device has been moved near normalTarget maxTries times in a row."""
+        device = device or self.currentDevice
+        offset = self.offset if getattr(device, 'offset', None) is None else device.offset
+        if self.isDistant(normalTarget, device):
+            device.triesCount = 0
+            adjust = offset
+        elif device.triesCount < self.maxTries:
+            device.triesCount += 1
+            adjust = offset
+        else:
+            adjust = 0
+        return adjust
+
+    def isBusy(self):
+        """The whole unit is busy, because one device is."""
+        return self.busyCount > 0
+
+    def isDistant(self, target, device=None):
+        device = device or self.currentDevice
+        distance = abs(target - device.currentPosition)
+        return distance > self.farDistance
+
+    def deviceByName(self, name):
+        return self.devicesByName[name]
+
+    @command(r"BU\ *", query=True)
+    def BU_Response(self):
+        """"business" of all devices. The movements that are due have ended, see responseFunction."""
+        if self.isBusy():
+            return "1"
+        else:
+            return "0"
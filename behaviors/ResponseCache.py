@@ -0,0 +1,50 @@
+"""
+Responses to queries, kept for clients that poll in tight loops.
+
+A query that is answered from the state of the instrument and the time gives the same answer until
+the state changes, or the time moves on. The cache reuses the response to a query, by its Command and
+arguments, while the time is within the same quantum. It is emptied when the quantum changes, so it
+only ever holds the queries of one quantum, and by any command that isn't a query, since it may
+change the state.
+The responses are kept encoded, so a hit costs neither the handler, nor the formatting.
+
+The cache is opt-in, per instrument, see CommandBehavior.queryCacheQuantum, since a response may be
+up to one quantum old, e.g. about a movement that has just ended. The hits and misses are counted,
+by command, and served with the other metrics, see Metrics.
+"""
+import collections
+
+import Clock
+from Communicator import EncodedResponse
+
+
+class ResponseCache:
+    def __init__(self, quantum, clock=None, responseEOL="\r"):
+        self.quantum = quantum  # Seconds
+        self.clock = Clock.clockFor(clock)
+        self.responseEOL = responseEOL
+        self.timeKey = None  # The quantum of the responses.
+        self.responses = {}  # By (Command, arguments), only from the current quantum.
+        self.hits = collections.Counter()  # By command name
+        self.misses = collections.Counter()
+
+    def response(self, behavior, command, arguments):
+        """The response to a query, from the cache if it was answered within the same quantum."""
+        timeKey = self.clock.now() // self.quantum
+        if timeKey != self.timeKey:
+            self.responses.clear()
+            self.timeKey = timeKey
+        key = (command, arguments)
+        response = self.responses.get(key)
+        if response is not None:
+            self.hits[command.name] += 1
+            return response
+        self.misses[command.name] += 1
+        response = behavior.execute(command, arguments)
+        if isinstance(response, str) and type(response) is not EncodedResponse:
+            response = EncodedResponse(response, self.responseEOL)
+        self.responses[key] = response
+        return response
+
+    def invalidate(self):
+        self.responses.clear()
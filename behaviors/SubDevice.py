@@ -1,6 +1,22 @@
 class SubDevice:
+    __slots__ = ('name', 'busyFlag', 'owner')  # Thousands of devices can be simulated at once, see Fleet.
+
     def __init__(self, name):
         self.name = name
-        self.busy = False
+        self.owner = None  # The positioner that the device is attached to, which counts its busy devices.
+        self.busyFlag = False
 
+    @property
+    def busy(self):
+        return self.busyFlag
 
+    @busy.setter
+    def busy(self, busy):
+        busy = bool(busy)
+        if busy != self.busyFlag:
+            self.busyFlag = busy
+            if self.owner is not None:
+                self.owner.busyCount += 1 if busy else -1
+
+    def stop(self):
+        self.busy = False
@@ -0,0 +1,40 @@
+"""
+Compare updating axes one by one, with Axis.update, and all at once, with AxisBank.update.
+
+    python3 benchmarks/axisUpdate.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import Clock
+from behaviors.Axis import Axis
+from behaviors.AxisBank import AxisBank
+
+
+def movingAxes(axes, clock):
+    for i, axis in enumerate(axes):
+        axis.speedInDegPerSecond = 1 + i % 7
+        axis.start_movement(1000)
+    clock.advance(1)
+    return axes
+
+
+def main():
+    print("%8s %16s %16s %8s" % ("axes", "Axis.update", "AxisBank.update", "ratio"))
+    for count in (10, 1000, 100000):
+        clock = Clock.SteppedClock()
+        axes = movingAxes([Axis(str(i), clock=clock) for i in range(count)], clock)
+        bank = AxisBank(count, clock)
+        movingAxes([bank.axis(str(i)) for i in range(count)], clock)
+
+        repeat = max(1, 100000 // count)
+        perObject = min(timeit.repeat(lambda: [axis.update() for axis in axes], number=repeat, repeat=3)) / repeat
+        batched = min(timeit.repeat(bank.update, number=repeat, repeat=3)) / repeat
+        print("%8d %14.1f us %14.1f us %7.1fx" % (count, perObject * 1e6, batched * 1e6, perObject / batched))
+
+
+if __name__ == '__main__':
+    main()
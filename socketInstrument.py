@@ -22,26 +22,39 @@ Implemented instruments:
 
 from abc import abstractmethod, ABCMeta
 import Communicator
+import Framing
+from Communicator import EncodedResponse, toPrintable  # noqa: F401, toPrintable is also imported from here.
 
 
 class SocketInstrument(metaclass=ABCMeta):
+    # Each of these ends a command from the client. Override in subclasses, e.g. to add b";".
+    inputTerminators = Framing.defaultTerminators
+    responseEOL = "\r"
+
+    # Responses that never change, by command. Subclasses list them as plain strings,
+    # and they are encoded once, when the subclass is created.
+    staticResponses = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'staticResponses' in cls.__dict__:
+            cls.staticResponses = {command: EncodedResponse(text, cls.responseEOL)
+                                   for command, text in cls.staticResponses.items()}
+
     def __init__(self):
+        self.communicator = Communicator.AsyncSocketCommunicator(self.responseFunction, self.inputTerminators)
         self.port = 2049  # Should be overridden by subclass.
-        self.responseEOL = "\r"
-        self.communicator = Communicator.SocketCommunicator(self.responseFunction)
+        self.name = type(self).__name__  # Identifies the instrument on a bench of several.
+
+    @property
+    def port(self):
+        """The port that the communicator serves the instrument on."""
+        return self.communicator.port
+
+    @port.setter
+    def port(self, port):
+        self.communicator.port = port
 
     @abstractmethod
     def responseFunction(self, command):
         pass
-
-
-def toPrintable(stringWithControlChars):
-    result = ""
-    for char in stringWithControlChars:
-        if char == '\r':
-            result += '<CR>'
-        elif char == '\n':
-            result += '<LF>'
-        else:
-            result += char
-    return result
@@ -6,60 +6,193 @@ Here we use VISA over Socket, to be able to simulate instrument responses to com
 Implemented instruments:
 - Vötsch climate chamber models Vt 3 7060 and Vc 3 7060.
 - innco GmbH IN3000 RotaryDisc.
+
+Several instruments can be simulated by one process, each on its own port:
+    python3 socketMain.py NCD:200 BBA150:5025 Vc37060:2049
 """
 import argparse
-
+import collections
+import logging
+
+import Clock
+import Communicator
+import Fleet
+import Log
+import Metrics
+import Rack
+import Topology
 from Amplifier import PaRsBBA150, PaEmpower
-from Climate import VotschBase, Vc37060, Vt37060ExtCab, Vt37060ExtCabOttawa
+from Climate import VotschBase, Vc37060, Vt37060ExtCab, Vt37060ExtCabOttawa, VotschBus
+from GenericInstrument import GenericInstrument
 from behaviors.InncoBehavior import InncoBehavior
 from behaviors.OptimusBehavior import OptimusBehavior
 from behaviors.MaturoNcdBehavior import MaturoNcdBehavior
 
 
 def main():
-    attachedInstrument = instrumentTypeArgument()
-    attachedInstrument.communicator.start()
+    parser, args, specifications = parseArguments()
+    logLevel = getattr(logging, args.log_level)
+    Log.start(logLevel)
+    if args.rack is not None:
+        # The instruments are made in the workers, but also here, so that errors in the bench stop the rack
+        # before any worker is started.
+        instrumentsFor(parser, args, specifications)
+        try:
+            Rack.Supervisor(specifications, makeInstrument, args.rack, args.rates, Clock.defaultClock,
+                            logLevel=logLevel, metricsPort=args.metrics_port).run()
+        except RuntimeError as error:
+            raise SystemExit("The rack stopped: %s" % error)
+        return
+    instruments = instrumentsFor(parser, args, specifications)
+    if args.metrics_port is not None:
+        Metrics.serve([Metrics.metricsFor(instrument) for instrument in instruments], args.metrics_port)
+    if not isinstance(instruments[0].communicator, Communicator.AsyncSocketCommunicator):
+        instruments[0].communicator.start()  # --blocking
+        return
+    communicators = [instrument.communicator for instrument in instruments]
+    Fleet.raiseOpenFileLimit(2 * len(instruments) + 100)
+    # All ports are opened before any is served, so that a port in use stops the whole bench.
+    listeningSockets = [communicator.openListeningSocket() for communicator in communicators]
+    print(Topology.portReport(instruments, listeningSockets), flush=True)
+    Communicator.serveAll(communicators, listeningSockets)
+
+
+def votschChamber(ccType):
+    chamber = VotschBase()
+    chamber.CcType = ccType
+    return chamber
+
+
+# Instrument type name: function that makes the instrument, from its specification, see Topology.
+instrumentTypes = {
+    'Vc': lambda specification: votschChamber('Vc'),
+    'Vt': lambda specification: votschChamber('Vt'),
+    'Vc37060': lambda specification: Vc37060(),
+    'Vt37060ExtCab': lambda specification: Vt37060ExtCab(),
+    'Vt37060ExtCabOttawa': lambda specification: Vt37060ExtCabOttawa(),
+    'VotschBus': lambda specification: VotschBus.ofTypes(specification.get('chambers', ['Vc37060'])),
+    'RotaryDisc': lambda specification: InncoBehavior(),
+    'NCD': lambda specification: MaturoNcdBehavior(),
+    'BBA150': lambda specification: PaRsBBA150(),
+    'Empower': lambda specification: PaEmpower(),
+    'Optimus': lambda specification: OptimusBehavior(),
+    'Generic': lambda specification: GenericInstrument(specification['description']),
+}
+
+
+def makeInstrument(specification):
+    return instrumentTypes[specification['type']](specification)
+
+
+def instrumentSpecification(text):
+    """Type[:port], for instance NCD or NCD:2000."""
+    typeName, _, port = text.partition(":")
+    if typeName not in instrumentTypes:
+        raise argparse.ArgumentTypeError("invalid instrument type: '%s' (choose from %s)"
+                                         % (typeName, ", ".join(instrumentTypes)))
+    try:
+        return {'type': typeName, 'port': int(port) if port else None}
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid port in '%s'" % text)
 
 
 def instrumentTypeArgument():
-    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
-    parser.add_argument('InstrumentType', help='Type of instrument or Vötsch model',
-                        choices=['Vc', 'Vt', 'Vc37060', 'Vt37060ExtCab', 'Vt37060ExtCabOttawa', 'RotaryDisc', 'NCD', 'BBA150', 'Empower', 'Optimus'])
-    parser.add_argument('--offset', help="How far the used target pos is from the requested one.", type=float)
-    args = parser.parse_args()
-    if args.InstrumentType in ['Vc', 'Vt']:
-        attachedInstrument = VotschBase()
-        attachedInstrument.CcType = args.InstrumentType
-
-    elif args.InstrumentType == 'Vc37060':
-        attachedInstrument = Vc37060()
-
-    elif args.InstrumentType == 'Vt37060ExtCab':
-        attachedInstrument = Vt37060ExtCab()
+    """The instrument of the first instrument argument."""
+    return instrumentsArgument()[0]
 
-    elif args.InstrumentType == 'Vt37060ExtCabOttawa':
-        attachedInstrument = Vt37060ExtCabOttawa()
 
-    elif args.InstrumentType in ['RotaryDisc']:
-        attachedInstrument = InncoBehavior()
-        if args.offset:
-            attachedInstrument.offset = args.offset
+def instrumentsArgument():
+    return instrumentsFor(*parseArguments())
 
-    elif args.InstrumentType == 'NCD':
-        attachedInstrument = MaturoNcdBehavior()
 
-    elif args.InstrumentType in ['BBA150']:
-        attachedInstrument = PaRsBBA150()
-
-    elif args.InstrumentType in ['Empower']:
-        attachedInstrument = PaEmpower()
-
-    elif args.InstrumentType == "Optimus":
-        attachedInstrument = OptimusBehavior()
-
-    else:
-        raise NotImplementedError
-    return attachedInstrument
+def parseArguments():
+    """Return the argument parser, the parsed arguments, and the specifications of the instruments."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('InstrumentType', nargs='*', type=instrumentSpecification, metavar='Type[:port]',
+                        help='Type of instrument or Vötsch model, one of %s, optionally with the port to '
+                             'serve it on. Several instruments are served from one process.'
+                             % ", ".join(instrumentTypes))
+    parser.add_argument('--topology', help="Topology file, with the instruments of a whole bench.")
+    parser.add_argument('--offset', help="How far the used target pos is from the requested one.", type=float)
+    parser.add_argument('--description', help="Instrument description file, for the Generic instrument type.")
+    parser.add_argument('--blocking', action='store_true',
+                        help="Serve one client at a time, with the old blocking communicator.")
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help="How many times faster than real time the simulated movements and ramps run.")
+    parser.add_argument('--fleet', type=int, default=1, metavar='COUNT',
+                        help="Serve this many instances of each instrument, on consecutive ports from its port.")
+    parser.add_argument('--rack', type=int, metavar='WORKERS',
+                        help="Serve the instruments from this many worker processes, 0 for one per CPU core.")
+    parser.add_argument('--rates', help="File with the measured command rates, to balance the --rack workers by.")
+    parser.add_argument('--log-level', default='INFO', type=str.upper,
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="DEBUG logs each command and response. Logging never holds up the responses.")
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help="Serve the metrics of the instruments in the Prometheus format on this local port.")
+    parser.add_argument('--query-cache', type=float, metavar='SECONDS',
+                        help="Reuse the responses to queries for this long, for clients that poll in tight loops.")
+    args = parser.parse_args()
+    if args.time_scale <= 0:
+        parser.error("The time scale must be positive.")
+    if args.time_scale != 1.0:
+        Clock.setDefaultClock(Clock.ScaledClock(args.time_scale))
+
+    specifications = args.InstrumentType
+    for specification in specifications:
+        specification['description'] = args.description
+        if args.offset and specification['type'] == 'RotaryDisc':
+            specification['parameters'] = {'offset': args.offset}
+    if args.topology:
+        try:
+            specifications = specifications + Topology.loadTopology(args.topology)
+        except (OSError, ValueError) as error:
+            parser.error("Can't read the topology %s: %s" % (args.topology, error))
+    if args.query_cache is not None:
+        if args.query_cache < 0:
+            parser.error("The --query-cache time can't be negative.")
+        for specification in specifications:
+            specification.setdefault('queryCache', args.query_cache)
+    if args.fleet < 1:
+        parser.error("The --fleet count must be at least 1.")
+    try:
+        specifications = Fleet.expand(specifications, args.fleet)
+    except ValueError as error:
+        parser.error(str(error))
+    if not specifications:
+        parser.error("No instruments. Give an instrument type or a --topology file.")
+    for specification in specifications:
+        if specification['type'] not in instrumentTypes:
+            parser.error("Unknown instrument type %s" % specification['type'])
+        if specification['type'] == 'Generic' and not specification.get('description'):
+            parser.error("The Generic instrument type needs a --description file.")
+    if args.blocking and len(specifications) > 1:
+        parser.error("Only one instrument can be served with --blocking.")
+    if args.blocking and args.rack is not None:
+        parser.error("--blocking can't be used with --rack.")
+    if args.rack is not None and args.rack < 0:
+        parser.error("The number of --rack workers can't be negative.")
+    return parser, args, specifications
+
+
+def instrumentsFor(parser, args, specifications):
+    try:
+        instruments = Topology.bringUp(specifications, makeInstrument)
+    except ValueError as error:
+        parser.error(str(error))
+
+    if args.blocking:
+        attachedInstrument = instruments[0]
+        port = attachedInstrument.port
+        attachedInstrument.communicator = Communicator.SocketCommunicator(attachedInstrument.responseFunction,
+                                                                          attachedInstrument.inputTerminators)
+        attachedInstrument.port = port
+
+    ports = [instrument.port for instrument in instruments if instrument.port != 0]
+    duplicates = sorted(port for port, count in collections.Counter(ports).items() if count > 1)
+    if duplicates:
+        parser.error("Several instruments on port %s. Give each one its own port, as in NCD:2000."
+                     % ", ".join(map(str, duplicates)))
+    return instruments
 
 
 if __name__ == '__main__':
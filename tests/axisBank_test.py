@@ -0,0 +1,100 @@
+import unittest
+
+import Clock
+from behaviors import MotionProfile
+from behaviors.Axis import Axis
+
+try:
+    import numpy
+    from behaviors.AxisBank import AxisBank
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class AxisBank_tests(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock.SteppedClock()
+        self.bank = AxisBank(capacity=2, clock=self.clock)
+
+    def test_that_a_bank_axis_works_like_an_axis(self):
+        axis = self.bank.axis('1')
+        self.assertEqual('1', axis.name)
+        self.assertIs(axis.busy, False)
+        axis.speedInDegPerSecond = 10
+        axis.start_movement(80)
+        self.clock.advance(5)
+        axis.update()
+        self.assertTrue(axis.busy)
+        self.assertAlmostEqual(40, axis.currentPosition)
+
+    def test_batch_update_matches_axis_update(self):
+        targets = [30, -20, 5, 0, 200]
+        single = [Axis(str(i), clock=self.clock) for i in range(len(targets))]
+        banked = [self.bank.axis(str(i)) for i in range(len(targets))]  # The bank grows past its capacity.
+        for axes in (single, banked):
+            for axis, target in zip(axes, targets):
+                axis.speedInDegPerSecond = 5
+                axis.start_movement(target)
+        for _ in range(3):
+            self.clock.advance(2.5)
+            for axis in single:
+                axis.update()
+            self.bank.update()
+            self.assertEqual([a.busy for a in single], [a.busy for a in banked])
+            for a, b in zip(single, banked):
+                self.assertAlmostEqual(a.currentPosition, b.currentPosition)
+
+    def test_that_axes_that_are_not_moving_stay_put(self):
+        axis = self.bank.axis('1')
+        axis.currentPosition = 12
+        self.clock.advance(10)
+        self.bank.update()
+        self.assertEqual(12, axis.currentPosition)
+
+    def test_that_the_owner_counts_busy_bank_axes(self):
+        from behaviors.InncoBehavior import InncoBehavior
+        innco = InncoBehavior()
+        innco.attachedDevices = [self.bank.axis('DS1'), self.bank.axis('DS2')]
+        for axis in innco.attachedDevices:
+            axis.speedInDegPerSecond = 10
+            axis.start_movement(8)
+        self.assertEqual(2, innco.busyCount)
+        self.clock.advance(1)
+        self.bank.update()
+        self.assertEqual(0, innco.busyCount)
+
+    def test_that_a_bank_axis_has_no_motion_or_scheduled_end(self):
+        axis = self.bank.axis('1')
+        axis.start_movement(80)
+        self.assertIsNone(axis.motion)
+        self.assertIsNone(axis.completion)
+
+    def test_that_other_profiles_are_rejected(self):
+        axis = self.bank.axis('1')
+        with self.assertRaises(ValueError):
+            axis.profile = MotionProfile.Trapezoid(acceleration=10)
+        with self.assertRaises(ValueError):
+            axis.profile = MotionProfile.ConstantSpeed(slowDownFactor=1)
+        axis.profile = MotionProfile.constantSpeed
+
+    def test_that_a_speed_change_applies_to_the_rest_of_a_movement(self):
+        axis = self.bank.axis('1')
+        axis.speedInDegPerSecond = 10
+        axis.start_movement(80)
+        self.clock.advance(5)
+        axis.speedInDegPerSecond = 5
+        self.clock.advance(5)
+        self.bank.update()
+        self.assertAlmostEqual(60, axis.currentPosition)
+
+    def test_that_the_owner_updates_the_bank_before_it_answers(self):
+        from behaviors.InncoBehavior import InncoBehavior
+        innco = InncoBehavior()
+        innco.attachedDevices = [self.bank.axis('DS1')]
+        innco.currentDevice = innco.deviceByName('DS1')
+        innco.responseFunction("LD 10 NSP")
+        innco.responseFunction("LD 8 DG NP GO")
+        self.assertEqual("1", innco.responseFunction("BU"))
+        self.clock.advance(2)
+        self.assertEqual("0", innco.responseFunction("BU"))
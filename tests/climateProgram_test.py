@@ -0,0 +1,73 @@
+import os
+import unittest
+
+import Climate
+import ClimateProgram
+import Clock
+import Topology
+
+exampleProgram = os.path.join(os.path.dirname(__file__), "..", "instruments", "ClimateCycle.toml")
+
+
+class Profile_tests(unittest.TestCase):
+    def test_ramps_and_holds(self):
+        profile = ClimateProgram.Profile([0, 10, 20, 20, 30], [0, 50, 50, 10, 20])
+        for t, value in [(-5, 0), (0, 0), (5, 25), (15, 50), (20, 10), (25, 15), (40, 20), (3, 15)]:
+            self.assertEqual(value, profile.valueAt(t), "at %s" % t)
+
+    def test_target(self):
+        profile = ClimateProgram.Profile([0, 10, 20], [0, 50, 30])
+        self.assertEqual([50, 30, 30], [profile.targetAt(t) for t in (5, 10, 25)])
+
+    def test_ramp(self):
+        ramp = ClimateProgram.Profile.ramp(100, 40, 20, 2)
+        self.assertEqual(700, ramp.endTime)
+        self.assertEqual(30, ramp.valueAt(400))
+        self.assertEqual(100, ClimateProgram.Profile.ramp(100, 40, 20, 0).endTime)
+
+    def test_long_program(self):
+        steps = [(60, i % 50, None) for i in range(5000)]
+        temperature, humidity = ClimateProgram.Program(steps).profiles(0, 0, 40)
+        self.assertEqual(5000 * 60, temperature.endTime)
+        self.assertEqual(5.5, temperature.valueAt(3456 * 60 + 30))
+        self.assertEqual(40, humidity.valueAt(1234))
+
+
+class ChamberProgram_tests(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock.SteppedClock()
+        self.chamber = Climate.Vc37060(clock=self.clock)
+
+    def nominalValues(self):
+        parts = self.chamber.responseFunction("$01I").split()
+        return float(parts[0]), float(parts[2])
+
+    def test_example_program(self):
+        program = ClimateProgram.loadProgram(exampleProgram)
+        self.assertEqual(20400, program.duration)
+        self.chamber.runProgram(program)
+        self.assertEqual(25, self.chamber.nominalTemp)
+        self.clock.advance(300)
+        self.assertEqual((12.5, 25), self.nominalValues())
+        self.clock.advance(3000)
+        self.assertEqual((55, 67.5), self.nominalValues())
+        self.assertEqual(85, self.chamber.nominalTemp)
+        self.assertEqual(58, self.chamber.actualTemperature)  # The moving setpoint, plus the offset.
+        self.clock.advance(20000)
+        self.assertEqual((25, 0), self.nominalValues())
+        self.assertIsNone(self.chamber.programStep)
+
+    def test_that_a_set_command_stops_the_program(self):
+        self.chamber.runProgram(ClimateProgram.Program([(600, 60, 50), (600, 60, 50)]))
+        self.clock.advance(300)
+        self.chamber.responseFunction("$01E 0010.0 0020.0 0050.0 0000.0 0000.0 0000.0 0000.0 " + 32 * "0")
+        self.clock.advance(600)
+        self.assertEqual((10, 20), self.nominalValues())
+
+    def test_program_in_a_topology(self):
+        chamber = Topology.configure(self.chamber, {'type': 'Vc37060', 'program': exampleProgram})
+        self.assertIsNotNone(chamber.programStep)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import time
+import unittest
+
+import Clock
+import Climate
+from behaviors.Axis import Axis
+from behaviors.InncoBehavior import InncoBehavior
+
+
+class Clock_tests(unittest.TestCase):
+    def test_real_clock_is_monotonic(self):
+        clock = Clock.RealClock()
+        first = clock.now()
+        self.assertGreaterEqual(clock.now(), first)
+
+    def test_scaled_clock_runs_faster(self):
+        clock = Clock.ScaledClock(1000)
+        first = clock.now()
+        time.sleep(0.01)
+        self.assertGreaterEqual(clock.now() - first, 5)
+
+    def test_stepped_clock_only_moves_when_advanced(self):
+        clock = Clock.SteppedClock(10)
+        self.assertEqual(clock.now(), 10)
+        clock.advance(2.5)
+        self.assertEqual(clock.now(), 12.5)
+
+    def test_default_clock_is_used_when_none_is_given(self):
+        clock = Clock.SteppedClock()
+        previous = Clock.defaultClock
+        Clock.setDefaultClock(clock)
+        try:
+            self.assertIs(Axis('1').clock, clock)
+        finally:
+            Clock.setDefaultClock(previous)
+
+
+class SteppedMovement_tests(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock.SteppedClock()
+
+    def test_axis_moves_with_the_clock(self):
+        axis = Axis('1', clock=self.clock)
+        axis.speedInDegPerSecond = 10
+        axis.start_movement(80)
+        self.clock.advance(5)  # 0.8 * 10 deg/s * 5 s
+        axis.update()
+        self.assertTrue(axis.busy)
+        self.assertAlmostEqual(axis.currentPosition, 40)
+        self.clock.advance(6)
+        axis.update()
+        self.assertFalse(axis.busy)
+        self.assertEqual(axis.currentPosition, 80)
+
+    def test_that_a_speed_change_applies_to_the_rest_of_a_movement(self):
+        axis = Axis('1', clock=self.clock)
+        axis.speedInDegPerSecond = 10
+        axis.start_movement(80)
+        self.clock.advance(5)  # 40 degrees at 8 deg/s.
+        axis.speedInDegPerSecond = 5
+        self.assertAlmostEqual(axis.currentPosition, 40)
+        self.clock.advance(5)  # 20 more at 4 deg/s.
+        axis.update()
+        self.assertAlmostEqual(axis.currentPosition, 60)
+        self.clock.advance(5)
+        axis.update()
+        self.assertFalse(axis.busy)
+        self.assertEqual(axis.currentPosition, 80)
+
+    def test_that_the_speed_command_changes_a_movement_in_progress(self):
+        innco = InncoBehavior()
+        innco.attachedDevices = [Axis('DS1', clock=self.clock)]
+        innco.currentDevice = innco.deviceByName('DS1')
+        innco.responseFunction("LD 10 NSP")
+        innco.responseFunction("LD 80 DG NP GO")
+        self.clock.advance(5)
+        innco.responseFunction("LD 20 NSP")
+        self.clock.advance(1)  # 40 degrees, then 16 more at 16 deg/s.
+        self.assertEqual(innco.responseFunction("CP"), "56.0")
+
+    def test_positioner_movement_uses_the_device_clock(self):
+        innco = InncoBehavior()
+        innco.currentDevice = Axis('DS1', clock=self.clock)
+        innco.attachedDevices = [innco.currentDevice]
+        innco.responseFunction("LD 20 DG NP GO")
+        self.assertEqual(innco.responseFunction("BU"), "1")
+        self.clock.advance(3600)
+        self.assertEqual(innco.responseFunction("BU"), "0")
+
+    def test_climate_ramp_follows_the_clock(self):
+        chamber = Climate.Vc37060(clock=self.clock)
+        chamber.rampSetpoints(20, 0)
+        chamber.tempUp = 6  # Kelvin per minute
+        chamber.rampSetpoints(30, 0)
+        self.clock.advance(60)
+        self.assertAlmostEqual(chamber.getMovingSetpoint(), 26)
+        self.clock.advance(60)
+        self.assertEqual(chamber.getMovingSetpoint(), 30)
@@ -0,0 +1,110 @@
+import re
+import unittest
+
+from behaviors.CommandBehavior import CommandBehavior
+from behaviors.CommandTable import Command, CommandTable, command
+
+
+def first():
+    pass
+
+
+def second():
+    pass
+
+
+def third():
+    pass
+
+
+class CommandTable_tests(unittest.TestCase):
+    def setUp(self):
+        self.table = CommandTable({
+            r"BU\ *": first,
+            r"LD ([-]?\d+(?:\.\d+)?) DG NP GO": second,
+            r"LD ([-]?\d+) ([-]?\d+) XY": third,
+            r"LD": first,
+        })
+
+    def test_a_command_without_arguments(self):
+        self.assertEqual((first, ()), self.table.match("BU  ; "))
+
+    def test_that_arguments_are_extracted(self):
+        self.assertEqual((second, (-123.4,)), self.table.match("LD -123.4 DG NP GO"))
+        self.assertEqual((third, (3.0, -4.0)), self.table.match("LD 3 -4 XY"))
+
+    def test_that_the_first_matching_pattern_wins(self):
+        self.assertEqual((first, ()), self.table.match("LD 12 DG WL"))
+
+    def test_no_match(self):
+        self.assertEqual((None, ()), self.table.match("CP"))
+
+    def test_same_selection_as_trying_each_pattern(self):
+        commands = ["BU", "LD 1 DG NP GO", "LD 1 2 XY", "LD x", "XY", "LD 1.5 DG NP GO"]
+        for command in commands:
+            expected = None
+            for pattern, handler in self.table.patternsToHandlers.items():
+                if re.match(pattern, command):
+                    expected = handler
+                    break
+            self.assertEqual(expected, self.table.match(command)[0], command)
+
+
+class Declared(CommandBehavior):
+    def __init__(self):
+        super().__init__()
+        self.value = 1.5
+
+    @command(r"VAL\?", response="%.2f", query=True)
+    def valueQuery(self):
+        return self.value
+
+    @command(r"VAL ([-]?\d+(?:\.\d+)?)")
+    def setValue(self, value):
+        self.value = value
+        return ""
+
+    @command(r"NAME (\w+) (\d+)", str, int, query=True)
+    def name(self, text, number):
+        return "%s:%d" % (text, number)
+
+
+class Derived(Declared):
+    @command(r"VAL\?", response="%.1f", query=True)
+    def valueQuery(self):
+        return self.value
+
+
+class CommandBehavior_tests(unittest.TestCase):
+    def setUp(self):
+        self.behavior = Declared()
+
+    def test_that_responses_are_formatted(self):
+        self.assertEqual("1.50", self.behavior.responseFunction("VAL?"))
+
+    def test_that_arguments_are_passed_to_the_handler(self):
+        self.behavior.responseFunction("VAL -2")
+        self.assertEqual(-2.0, self.behavior.value)
+
+    def test_typed_arguments(self):
+        self.assertEqual("abc:12", self.behavior.responseFunction("NAME abc 12"))
+
+    def test_bad_command(self):
+        self.assertEqual("E - x", self.behavior.responseFunction("what?"))
+
+    def test_command_metadata(self):
+        table = self.behavior.commandTable
+        info = table.lookup("VAL?")[0]
+        self.assertTrue(info.isQuery)
+        self.assertEqual("valueQuery", info.name)
+        self.assertFalse(table.lookup("VAL 3")[0].isQuery)
+        self.assertIsNone(table.lookup("what?")[0])
+
+    def test_that_a_subclass_overrides_a_command_in_place(self):
+        derived = Derived()
+        self.assertEqual("1.5", derived.responseFunction("VAL?"))
+        self.assertEqual(["valueQuery", "setValue", "name"], [c.name for c in Derived.commandTable.commands])
+
+    def test_that_argument_types_must_match_the_pattern(self):
+        with self.assertRaises(ValueError):
+            CommandTable([Command(r"X (\d+)", first, (int, int))])
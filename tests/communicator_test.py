@@ -0,0 +1,150 @@
+import asyncio
+import unittest
+
+import Amplifier
+import Communicator
+
+
+def upperCaseResponse(command):
+    if command.strip() == "fail":
+        raise ValueError("Failing command")
+    return command.strip().upper()
+
+
+class AsyncSocketCommunicator_tests(unittest.TestCase):
+    def setUp(self):
+        self.communicator = Communicator.AsyncSocketCommunicator(upperCaseResponse)
+        self.communicator.port = 0  # Let the OS pick a free port.
+
+    def runWithServer(self, clientScenario):
+        async def scenario():
+            listeningSocket = self.communicator.openListeningSocket()
+            port = listeningSocket.getsockname()[1]
+            server = asyncio.create_task(self.communicator.serve(listeningSocket))
+            try:
+                return await asyncio.wait_for(clientScenario(port), 5)
+            finally:
+                server.cancel()
+                await asyncio.gather(server, return_exceptions=True)
+
+        return asyncio.run(scenario())
+
+    @staticmethod
+    async def query(reader, writer, command):
+        writer.write(command)
+        await writer.drain()
+        return await reader.readuntil(b"\r")
+
+    def test_that_a_query_gets_a_response(self):
+        async def client(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            response = await self.query(reader, writer, b"hello\r\n")
+            writer.close()
+            return response
+
+        self.assertEqual(b"HELLO\r", self.runWithServer(client))
+
+    def test_that_an_idle_client_does_not_block_another(self):
+        async def client(port):
+            idleReader, idleWriter = await asyncio.open_connection('127.0.0.1', port)
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            response = await self.query(reader, writer, b"second\r\n")
+            idleWriter.close()
+            writer.close()
+            return response
+
+        self.assertEqual(b"SECOND\r", self.runWithServer(client))
+
+    def test_that_many_clients_are_served_concurrently(self):
+        async def oneClient(port, n):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            response = await self.query(reader, writer, b"client%d\r\n" % n)
+            writer.close()
+            return response
+
+        async def clients(port):
+            return await asyncio.gather(*[oneClient(port, n) for n in range(20)])
+
+        responses = self.runWithServer(clients)
+        self.assertEqual([b"CLIENT%d\r" % n for n in range(20)], responses)
+
+    def test_that_pipelined_commands_are_answered_in_order(self):
+        async def client(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b"one\r\ntwo\r\nthr")
+            writer.write(b"ee\r\n")
+            await writer.drain()
+            responses = [await reader.readuntil(b"\r") for _ in range(3)]
+            writer.close()
+            return responses
+
+        self.assertEqual([b"ONE\r", b"TWO\r", b"THREE\r"], self.runWithServer(client))
+
+    def test_that_a_failing_command_is_logged_and_the_next_one_answered(self):
+        async def client(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b"fail\r\n")
+            response = await self.query(reader, writer, b"next\r\n")
+            writer.close()
+            return response
+
+        with self.assertLogs("socketInstrument", "ERROR") as logs:
+            self.assertEqual(b"NEXT\r", self.runWithServer(client))
+        self.assertIn("Error in the response to 'fail'", logs.output[0])
+
+    def test_that_the_commands_after_a_failing_one_get_their_responses(self):
+        amplifier = Amplifier.PaEmpower()
+        with self.assertLogs("socketInstrument", "ERROR"):
+            self.assertEqual(b"BBS3G6QHM\r", amplifier.communicator.responsesFor(["Gx\r\n", "IN?\r\n"]))
+
+
+class ServeTogether_tests(unittest.TestCase):
+    def test_that_instruments_on_different_ports_share_one_loop(self):
+        communicators = [Communicator.AsyncSocketCommunicator(upperCaseResponse),
+                         Communicator.AsyncSocketCommunicator(lambda command: command.strip()[::-1])]
+        for communicator in communicators:
+            communicator.port = 0
+
+        async def scenario():
+            sockets = [communicator.openListeningSocket() for communicator in communicators]
+            ports = [s.getsockname()[1] for s in sockets]
+            server = asyncio.create_task(Communicator.serveTogether(communicators, sockets))
+            try:
+                responses = []
+                for port in ports:
+                    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                    responses.append(await asyncio.wait_for(
+                        AsyncSocketCommunicator_tests.query(reader, writer, b"abc\r\n"), 5))
+                    writer.close()
+                return responses
+            finally:
+                server.cancel()
+                await asyncio.gather(server, return_exceptions=True)
+
+        self.assertEqual([b"ABC\r", b"cba\r"], asyncio.run(scenario()))
+
+
+class EncodedResponse_tests(unittest.TestCase):
+    def setUp(self):
+        self.communicator = Communicator.SocketCommunicator(lambda command: self.response)
+
+    def test_that_an_encoded_response_is_still_a_string(self):
+        response = Communicator.EncodedResponse("47.7")
+        self.assertEqual("47.7", response)
+        self.assertEqual(b"47.7\r", response.encoded)
+
+    def test_that_an_encoded_response_is_sent_as_it_is(self):
+        self.response = Communicator.EncodedResponse("47.7", eol="\r\n")
+        self.assertIs(self.response.encoded, self.communicator.responseFor("SENS:NPOW?"))
+
+    def test_that_bytes_are_sent_as_they_are(self):
+        self.response = b"raw\r\n"
+        self.assertEqual(b"raw\r\n", self.communicator.responseFor("query?"))
+
+    def test_that_strings_get_the_response_EOL(self):
+        self.response = "text"
+        self.assertEqual(b"text\r", self.communicator.responseFor("query?"))
+
+    def test_that_empty_responses_are_not_sent(self):
+        self.response = ""
+        self.assertIsNone(self.communicator.responseFor("set"))
@@ -0,0 +1,42 @@
+import sys
+import unittest
+from io import StringIO
+
+import Fleet
+import socketMain
+
+
+class Expand_tests(unittest.TestCase):
+    def test_consecutive_ports_and_numbered_names(self):
+        expanded = Fleet.expand([{'type': 'NCD', 'port': 20000}, {'type': 'BBA150', 'port': 5025, 'count': 1}], 3)
+        self.assertEqual([20000, 20001, 20002, 5025], [s['port'] for s in expanded])
+        self.assertEqual(["NCD-0", "NCD-1", "NCD-2"], [s['name'] for s in expanded[:3]])
+
+    def test_count_of_a_specification(self):
+        expanded = Fleet.expand([{'type': 'NCD', 'name': 'table', 'port': 0, 'count': 2}])
+        self.assertEqual([('table-0', 0), ('table-1', 0)], [(s['name'], s['port']) for s in expanded])
+        self.assertNotIn('count', expanded[0])
+
+    def test_that_a_fleet_needs_a_first_port(self):
+        self.assertRaises(ValueError, Fleet.expand, [{'type': 'NCD', 'port': None}], 2)
+        self.assertRaises(ValueError, Fleet.expand, [{'type': 'NCD', 'port': 65000}], 1000)
+
+    def test_fleet_argument(self):
+        stdErrSave = sys.stderr
+        sys.stderr = StringIO()
+        try:
+            sys.argv = ["", "NCD:20000", "--fleet", "5"]
+            instruments = socketMain.instrumentsArgument()
+            self.assertEqual(list(range(20000, 20005)), [instrument.port for instrument in instruments])
+            sys.argv = ["", "NCD", "--fleet", "5"]
+            self.assertRaises(SystemExit, socketMain.instrumentsArgument)
+        finally:
+            sys.stderr = stdErrSave
+
+
+class MemoryBudget_tests(unittest.TestCase):
+    def test_that_instances_stay_within_their_memory_budget(self):
+        for typeName, budget in Fleet.memoryBudgets.items():
+            with self.subTest(typeName):
+                size = Fleet.memoryPerInstance(socketMain.makeInstrument, {'type': typeName})
+                self.assertLessEqual(size, budget)
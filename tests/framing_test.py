@@ -0,0 +1,69 @@
+import unittest
+
+from Framing import CommandFramer
+
+
+class CommandFramer_tests(unittest.TestCase):
+    def setUp(self):
+        self.framer = CommandFramer()
+
+    def test_one_command(self):
+        self.assertEqual(["*IDN?"], self.framer.feed(b"*IDN?\r\n"))
+
+    def test_pipelined_commands_come_out_in_order(self):
+        commands = self.framer.feed(b"LD 1 DV\r\nLD 12 DG NP GO\rBU\n")
+        self.assertEqual(["LD 1 DV", "LD 12 DG NP GO", "BU"], commands)
+
+    def test_that_a_split_command_is_joined(self):
+        self.assertEqual([], self.framer.feed(b"$01E 0023"))
+        self.assertEqual(["$01E 0023.1"], self.framer.feed(b".1\r"))
+
+    def test_that_CRLF_split_between_reads_gives_no_empty_command(self):
+        self.assertEqual(["CP"], self.framer.feed(b"CP\r"))
+        self.assertEqual(["BU"], self.framer.feed(b"\nBU\r\n"))
+
+    def test_configurable_terminators(self):
+        framer = CommandFramer(terminators=(b";",))
+        self.assertEqual(["CP", "BU"], framer.feed(b"CP;BU;RP"))
+        self.assertEqual(["RP"], framer.feed(b";"))
+
+    def test_that_too_long_lines_are_dropped(self):
+        framer = CommandFramer(maxLineLength=10)
+        self.assertEqual([], framer.feed(b"x" * 8))
+        self.assertEqual([], framer.feed(b"x" * 8))
+        self.assertEqual(["CP"], framer.feed(b"xxx\rCP\r"))
+        self.assertEqual(1, framer.overlongCount)
+
+    def test_that_a_too_long_complete_line_is_dropped(self):
+        framer = CommandFramer(maxLineLength=10)
+        self.assertEqual(["BU"], framer.feed(b"x" * 11 + b"\rBU\r"))
+        self.assertEqual(1, framer.overlongCount)
+
+    def test_that_a_split_multibyte_character_is_decoded(self):
+        encoded = "$01? Vötsch\r".encode('utf-8')
+        split = encoded.index(b"\xc3") + 1
+        self.assertEqual([], self.framer.feed(encoded[:split]))
+        self.assertEqual(["$01? Vötsch"], self.framer.feed(encoded[split:]))
+
+    def test_that_a_command_split_after_a_multibyte_character_is_decoded(self):
+        self.assertEqual([], self.framer.feed("TEMP ö".encode('utf-8')))
+        self.assertEqual(["TEMP ö"], self.framer.feed(b"\r"))
+
+    def test_that_invalid_utf8_is_dropped(self):
+        self.assertEqual(["CP"], self.framer.feed(b"\xff\xfe\rCP\r"))
+        self.assertEqual(1, self.framer.decodeErrorCount)
+
+    def test_receiving_into_the_buffer(self):
+        data = b"RP\rBU\r"
+        self.framer.receiveView()[:len(data)] = data
+        self.assertEqual(["RP", "BU"], self.framer.received(len(data)))
+
+    def test_a_terminator_split_between_reads(self):
+        framer = CommandFramer(terminators=(b"\r\n",))
+        self.assertEqual([], framer.feed(b"CP\r"))
+        self.assertEqual(["CP"], framer.feed(b"\n"))
+
+    def test_many_reads_reuse_the_buffer(self):
+        framer = CommandFramer(maxLineLength=16, receiveSize=8)
+        commands = framer.feed(b"LD 12 DG NP GO\r" * 100)
+        self.assertEqual(100 * ["LD 12 DG NP GO"], commands)
@@ -0,0 +1,78 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import GenericInstrument
+
+exampleDescription = os.path.join(os.path.dirname(__file__), "..", "instruments", "SignalGenerator.toml")
+
+
+class GenericInstrument_tests(unittest.TestCase):
+    def setUp(self):
+        self.cacheDirectory = tempfile.mkdtemp()
+        self.instrument = GenericInstrument.GenericInstrument(exampleDescription, self.cacheDirectory)
+
+    def tearDown(self):
+        shutil.rmtree(self.cacheDirectory)
+
+    def test_static_response(self):
+        self.assertEqual("Simulated,Generic signal generator,1,1.0", self.instrument.responseFunction("*IDN?"))
+
+    def test_start_state(self):
+        self.assertEqual("1000000000", self.instrument.responseFunction("FREQ?"))
+        self.assertEqual("0", self.instrument.responseFunction("OUTP?"))
+
+    def test_set_and_query(self):
+        self.instrument.responseFunction("SOUR:FREQ:CW 2.5e9;:POW -12.5;:OUTP ON")
+        self.assertEqual("2500000000;-12.50;1", self.instrument.responseFunction("FREQ?;POW?;:OUTP:STAT?"))
+
+    def test_units(self):
+        self.instrument.responseFunction("FREQ 2 GHz")
+        self.assertEqual("2000000000", self.instrument.responseFunction("FREQ?"))
+        self.instrument.responseFunction("FREQ 3 V")
+        self.assertEqual('-131,"Invalid suffix"', self.instrument.responseFunction("SYST:ERR?"))
+        self.assertEqual("2000000000", self.instrument.responseFunction("FREQ?"))
+
+    def test_discrete_state(self):
+        self.instrument.responseFunction("UNIT:POW dbuv")
+        self.assertEqual("DBUV", self.instrument.responseFunction("UNIT:POW?"))
+
+    def test_errors_and_unknown_queries(self):
+        self.assertEqual("0", self.instrument.responseFunction("SOME:QUERY?"))
+        self.instrument.responseFunction("UNIT:POW WATT")
+        self.assertEqual('-224,"Illegal parameter value"', self.instrument.responseFunction("SYST:ERR?"))
+        self.assertEqual('0,"No error"', self.instrument.responseFunction("SYST:ERR?"))
+
+    def test_that_the_port_is_taken_from_the_description(self):
+        self.assertEqual(5025, self.instrument.communicator.port)
+
+    def test_that_the_compiled_description_is_cached(self):
+        self.assertFalse(self.instrument.description.loadedFromCache)
+        again = GenericInstrument.GenericInstrument(exampleDescription, self.cacheDirectory)
+        self.assertTrue(again.description.loadedFromCache)
+        self.assertEqual("Simulated,Generic signal generator,1,1.0", again.responseFunction("*IDN?"))
+        self.assertEqual(b"Simulated,Generic signal generator,1,1.0\r", again.responseFunction("*IDN?").encoded)
+
+    def test_that_instances_have_their_own_state(self):
+        other = GenericInstrument.GenericInstrument(exampleDescription, self.cacheDirectory)
+        other.responseFunction("FREQ 5")
+        self.assertEqual("1000000000", self.instrument.responseFunction("FREQ?"))
+
+    def test_json_description(self):
+        path = os.path.join(self.cacheDirectory, "meter.json")
+        with open(path, "w") as f:
+            json.dump({"state": {"power": -3.0},
+                       "commands": [{"header": "MEASure:POWer?", "query": "power", "format": "%.1f"}]}, f)
+        meter = GenericInstrument.GenericInstrument(path, self.cacheDirectory)
+        self.assertEqual("-3.0", meter.responseFunction("meas:pow?"))
+
+    def test_that_undeclared_state_variables_are_errors(self):
+        path = os.path.join(self.cacheDirectory, "meter.json")
+        with open(path, "w") as f:
+            json.dump({"commands": [{"header": "MEASure:POWer?", "query": "power"}]}, f)
+        with self.assertRaises(ValueError) as context:
+            GenericInstrument.GenericInstrument(path, self.cacheDirectory)
+        self.assertIn("meter.json", str(context.exception))
+        self.assertIn("'power'", str(context.exception))
@@ -1,6 +1,7 @@
 import time
 import unittest
 
+import Clock
 import behaviors.Axis
 import behaviors.InncoBehavior
 
@@ -230,3 +231,49 @@ class rotary_Functions_tests(unittest.TestCase):
                                "not close enough", 0.1)
 
 
+class rotary_ConcurrentMovement_tests(unittest.TestCase):
+    def setUp(self):
+        self.previousClock = Clock.defaultClock
+        self.clock = Clock.SteppedClock()
+        Clock.setDefaultClock(self.clock)
+        self.rd = behaviors.InncoBehavior.InncoBehavior()
+
+    def tearDown(self):
+        Clock.setDefaultClock(self.previousClock)
+
+    def test_that_two_devices_move_at_the_same_time(self):
+        self.rd.responseFunction("LD 40 DG NP GO")  # DS1, at 0.8 * 4.9 deg/s
+        self.rd.responseFunction("LD DS2 DV")
+        self.clock.advance(5)
+        self.rd.responseFunction("LD 10 DG NP GO")
+        ds1, ds2 = self.rd.deviceByName("DS1"), self.rd.deviceByName("DS2")
+        self.assertTrue(ds1.busy and ds2.busy)
+        self.assertEqual(2, self.rd.busyCount)
+        self.clock.advance(5)
+        self.assertEqual("1", self.rd.responseFunction("BU"))
+        self.assertFalse(ds2.busy)
+        self.clock.advance(5)
+        self.assertEqual("0", self.rd.responseFunction("BU"))
+        self.assertEqual(40, ds1.currentPosition)
+
+    def test_that_tries_are_counted_per_device(self):
+        self.rd.offset = 1
+        ds1, ds2 = self.rd.deviceByName("DS1"), self.rd.deviceByName("DS2")
+        for _ in range(3):
+            self.rd.adjustment(0, ds1)
+        self.assertEqual(3, ds1.triesCount)
+        self.assertEqual(0, ds2.triesCount)
+
+    def test_device_offset(self):
+        self.rd.offset = 1
+        ds2 = self.rd.deviceByName("DS2")
+        ds2.offset = 2.5
+        self.assertEqual(1, self.rd.adjustment(90, self.rd.deviceByName("DS1")))
+        self.assertEqual(2.5, self.rd.adjustment(90, ds2))
+
+    def test_that_replaced_devices_are_not_counted(self):
+        old = self.rd.attachedDevices[0]
+        self.rd.attachedDevices = [behaviors.Axis.Axis('DS4')]
+        old.busy = True
+        self.assertEqual(0, self.rd.busyCount)
+        self.assertFalse(self.rd.isBusy())
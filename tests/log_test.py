@@ -0,0 +1,65 @@
+import logging
+import queue
+import unittest
+from io import StringIO
+
+import Communicator
+import Log
+
+
+class RingBufferQueue_tests(unittest.TestCase):
+    def test_that_the_oldest_records_are_dropped_and_counted(self):
+        ringBuffer = Log.RingBufferQueue(3)
+        for i in range(5):
+            ringBuffer.put_nowait(i)
+        self.assertEqual(2, ringBuffer.dropped)
+        self.assertEqual([2, 3, 4], [ringBuffer.get() for _ in range(3)])
+        self.assertRaises(queue.Empty, ringBuffer.get, False)
+
+
+class Log_tests(unittest.TestCase):
+    def setUp(self):
+        self.stream = StringIO()
+
+    def tearDown(self):
+        Log.stop()
+        for handler in list(Log.log.handlers):
+            Log.log.removeHandler(handler)
+        Log.log.setLevel(logging.NOTSET)
+        Log.log.propagate = True
+
+    def test_that_records_are_written_by_the_listener(self):
+        Log.start(logging.INFO, self.stream)
+        Log.log.info("port is %d", 2049)
+        Log.log.debug("not written")
+        Log.stop()
+        self.assertEqual("port is 2049\n", self.stream.getvalue())
+
+    def test_that_dropped_records_are_reported(self):
+        listener = Log.start(logging.INFO, self.stream, bufferSize=2)
+        listener.stop()  # Nothing is written while the listener is stopped, so the buffer fills up.
+        for i in range(5):
+            Log.log.info("message %d", i)
+        self.assertEqual(3, Log.droppedCount())
+        listener.start()
+        Log.stop()
+        self.assertEqual("3 log messages dropped\nmessage 3\nmessage 4\n", self.stream.getvalue())
+
+    def test_commands_at_debug_level(self):
+        Log.start(logging.DEBUG, self.stream)
+        communicator = Communicator.SocketCommunicator(lambda command: "OK")
+        communicator.responseFor("*IDN?\r\n")
+        Log.stop()
+        self.assertEqual("Received: '*IDN?'\nSent:     'OK' (length: 3)\n", self.stream.getvalue())
+
+    def test_that_nothing_is_formatted_below_the_level(self):
+        Log.start(logging.INFO, self.stream)
+        communicator = Communicator.SocketCommunicator(lambda command: "OK")
+        self.assertEqual(b"OK\r", communicator.responseFor("*IDN?"))
+        Log.stop()
+        self.assertEqual("", self.stream.getvalue())
+
+
+class Printable_tests(unittest.TestCase):
+    def test_control_characters(self):
+        self.assertEqual("A<CR><LF>B", Communicator.toPrintable("A\r\nB"))
@@ -0,0 +1,122 @@
+import asyncio
+import pickle
+import random
+import unittest
+import urllib.request
+
+import Communicator
+import Metrics
+from behaviors.MaturoNcdBehavior import MaturoNcdBehavior
+
+
+class Histogram_tests(unittest.TestCase):
+    def test_that_small_values_are_exact(self):
+        histogram = Metrics.Histogram()
+        for value in range(32):
+            histogram.record(value)
+        self.assertEqual(15, histogram.quantile(0.5))
+        self.assertEqual(31, histogram.quantile(1.0))
+
+    def test_relative_error_of_quantiles(self):
+        histogram = Metrics.Histogram()
+        values = sorted(random.Random(1).randrange(10 ** 3, 10 ** 9) for _ in range(10000))
+        for value in values:
+            histogram.record(value)
+        for q in Metrics.quantiles:
+            exact = values[int(q * len(values)) - 1]
+            self.assertAlmostEqual(1, histogram.quantile(q) / exact, delta=1 / 16)
+        self.assertEqual(sum(values), histogram.sum)
+
+    def test_buckets(self):
+        histogram = Metrics.Histogram()
+        for value in (32, 33, 63, 64, 67, 68, 10 ** 6):
+            histogram.record(value)
+            self.assertLessEqual(value, histogram.highestValueIn(len(histogram.counts) - 1))
+        self.assertEqual(33, histogram.highestValueIn(32))
+        self.assertEqual(67, histogram.highestValueIn(48))
+
+
+class InstrumentMetrics_tests(unittest.TestCase):
+    def test_declared_commands(self):
+        ncd = MaturoNcdBehavior()
+        metrics = Metrics.metricsFor(ncd)
+        for command in ("CP", "CP", "XYZ", "LD 1 DV"):
+            ncd.communicator.responseFor(command)
+        self.assertEqual({"CP_response": 2, "unknown": 1, "LD_dev_DV_response": 1}, dict(metrics.commands))
+        self.assertEqual(1, metrics.badCommands)
+        self.assertEqual(4, metrics.latencies['dispatch'].count)
+        text = Metrics.text([metrics])
+        self.assertIn('socketinstrument_commands_total{instrument="MaturoNcdBehavior",command="CP_response"} 2\n', text)
+        self.assertIn('socketinstrument_bad_commands_total{instrument="MaturoNcdBehavior"} 1\n', text)
+        self.assertIn('socketinstrument_stage_seconds_count{instrument="MaturoNcdBehavior",stage="format"} 4\n',
+                      text)
+
+    def test_query_cache(self):
+        ncd = MaturoNcdBehavior()
+        ncd.queryCacheQuantum = 3600
+        metrics = Metrics.metricsFor(ncd)
+        for command in ("CP", "CP", "CP"):
+            ncd.communicator.responseFor(command)
+        text = Metrics.text([metrics])
+        labels = '{instrument="MaturoNcdBehavior",command="CP_response"}'
+        self.assertIn('socketinstrument_query_cache_hits_total%s 2\n' % labels, text)
+        self.assertIn('socketinstrument_query_cache_misses_total%s 1\n' % labels, text)
+        self.assertNotIn("query_cache_hits_total{", Metrics.text([Metrics.metricsFor(MaturoNcdBehavior())]))
+
+    def test_that_a_snapshot_is_sent_without_the_instrument(self):
+        ncd = MaturoNcdBehavior()
+        ncd.queryCacheQuantum = 3600
+        metrics = Metrics.metricsFor(ncd)
+        for command in ("CP", "CP"):
+            ncd.communicator.responseFor(command)
+        snapshot = pickle.loads(pickle.dumps(metrics.snapshot()))
+        ncd.communicator.responseFor("CP")
+        self.assertIsNone(snapshot.behavior)
+        self.assertEqual({"CP_response": 2}, dict(snapshot.commands))
+        hits, misses = snapshot.queryCacheCounts()
+        self.assertEqual(({"CP_response": 1}, {"CP_response": 1}), (dict(hits), dict(misses)))
+
+    def test_that_command_labels_are_limited(self):
+        metrics = Metrics.InstrumentMetrics("Empower")
+        metrics.maxCommandLabels = 2
+        for command in ("G100", "G-20.5 ", "IN?", "M?", "G300"):
+            metrics.countCommand(command, 1, 1)
+        self.assertEqual({"G#": 3, "IN?": 1, "other": 1}, dict(metrics.commands))
+
+
+class MetricsEndpoint_tests(unittest.TestCase):
+    def test_scrape_while_serving(self):
+        ncd = MaturoNcdBehavior()
+        ncd.port = 0
+        metrics = Metrics.metricsFor(ncd)
+        server = Metrics.serve([metrics], 0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = "http://127.0.0.1:%d/metrics" % server.server_address[1]
+
+        async def scenario():
+            listeningSocket = ncd.communicator.openListeningSocket()
+            port = listeningSocket.getsockname()[1]
+            serving = asyncio.create_task(Communicator.serveTogether([ncd.communicator], [listeningSocket]))
+            try:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                writer.write(b"LD 1 DV\r\nCP\r\n")
+                self.assertEqual(b"0\r", await asyncio.wait_for(reader.readuntil(b"\r"), 5))
+                loop = asyncio.get_running_loop()
+                scraped = await loop.run_in_executor(None, lambda: urllib.request.urlopen(url, timeout=5).read())
+                writer.close()
+                return scraped.decode()
+            finally:
+                serving.cancel()
+                await asyncio.gather(serving, return_exceptions=True)
+
+        text = asyncio.run(scenario())
+        self.assertIn('socketinstrument_connections{instrument="MaturoNcdBehavior"} 1\n', text)
+        self.assertIn('socketinstrument_received_bytes_total{instrument="MaturoNcdBehavior"} 13\n', text)
+        self.assertRegex(text, r'socketinstrument_stage_seconds_count\{instrument="MaturoNcdBehavior",stage="decode"\} [12]\n')
+        self.assertEqual(1, metrics.latencies['send'].count)
+        self.assertEqual(2, metrics.bytesSent)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+import Clock
+from behaviors import MotionProfile
+from behaviors.Axis import Axis
+from behaviors.MaturoNcdBehavior import MaturoNcdBehavior
+import Topology
+
+
+class MotionProfile_tests(unittest.TestCase):
+    def test_constant_speed_is_slowed_down(self):
+        motion = MotionProfile.constantSpeed.plan(80, 10)
+        self.assertEqual(10, motion.duration)
+        self.assertAlmostEqual(40, motion.distanceAt(5))
+
+    def test_trapezoid(self):
+        motion = MotionProfile.Trapezoid(acceleration=10).plan(100, 20)
+        # 2 s to full speed, 20 m, 3 s cruising, 60 m, and 2 s to stop, 20 m.
+        self.assertAlmostEqual(7, motion.duration)
+        self.assertAlmostEqual(5, motion.distanceAt(1))
+        self.assertAlmostEqual(20, motion.distanceAt(2))
+        self.assertAlmostEqual(50, motion.distanceAt(3.5))
+        self.assertAlmostEqual(95, motion.distanceAt(6))
+        self.assertEqual(100, motion.distanceAt(8))
+
+    def test_short_trapezoid_does_not_reach_full_speed(self):
+        motion = MotionProfile.Trapezoid(acceleration=10).plan(10, 20)
+        self.assertAlmostEqual(2, motion.duration)
+        self.assertAlmostEqual(5, motion.distanceAt(1))
+
+    def test_s_curve_takes_as_long_as_the_trapezoid(self):
+        trapezoid = MotionProfile.Trapezoid(acceleration=10).plan(100, 20)
+        sCurve = MotionProfile.SCurve(acceleration=10).plan(100, 20)
+        self.assertAlmostEqual(trapezoid.duration, sCurve.duration)
+        self.assertAlmostEqual(trapezoid.distanceAt(3.5), sCurve.distanceAt(3.5))
+        self.assertLess(sCurve.distanceAt(1), trapezoid.distanceAt(1))  # Starts more gently.
+
+    def test_lookups_in_any_order(self):
+        motion = MotionProfile.Trapezoid(acceleration=10).plan(100, 20)
+        times = [6, 0.5, 3, 6.5, 1]
+        expected = [MotionProfile.Trapezoid(acceleration=10).plan(100, 20).distanceAt(t) for t in times]
+        self.assertEqual(expected, [motion.distanceAt(t) for t in times])
+
+    def test_profile_from_description(self):
+        profile = MotionProfile.profileFrom({'type': 'scurve', 'acceleration': 5})
+        self.assertIsInstance(profile, MotionProfile.SCurve)
+        self.assertEqual(5, profile.acceleration)
+        self.assertIsInstance(MotionProfile.profileFrom('constant'), MotionProfile.ConstantSpeed)
+        self.assertRaises(ValueError, MotionProfile.profileFrom, 'linear')
+
+
+class AxisProfile_tests(unittest.TestCase):
+    def test_axis_with_trapezoid_profile(self):
+        clock = Clock.SteppedClock()
+        axis = Axis('1', clock=clock, profile=MotionProfile.Trapezoid(acceleration=10))
+        axis.speedInDegPerSecond = 20
+        axis.start_movement(-100)
+        clock.advance(1)
+        axis.update()
+        self.assertAlmostEqual(-5, axis.currentPosition)
+        clock.advance(6)
+        axis.update()
+        self.assertFalse(axis.busy)
+        self.assertEqual(-100, axis.currentPosition)
+
+    def test_profile_per_device_from_topology(self):
+        ncd = Topology.configure(MaturoNcdBehavior(), {
+            'type': 'NCD', 'devices': {'1': {'profile': {'type': 'trapezoid', 'acceleration': 20}}}})
+        self.assertIsInstance(ncd.deviceByName('1').profile, MotionProfile.Trapezoid)
+        self.assertIs(MotionProfile.constantSpeed, ncd.deviceByName('3').profile)
@@ -240,6 +240,12 @@ class Ncd_AntennaStand_response_tests(unittest.TestCase):
         response = self.ncd.responseFunction("SP?")
         self.assertEqual(response, "E - V")
 
+    def test_bu_command_on_antenna_stand(self):
+        self.ncd.currentDevice = self.ncd.deviceByName("0")
+        self.assertEqual("0", self.ncd.responseFunction("BU"))
+        self.ncd.deviceByName("1").busy = True
+        self.assertEqual("1", self.ncd.responseFunction("BU"))
+
     def test_pol_command_on_rotary_disc(self):
         ttDevice = self.ncd.deviceByName("1")
         # Precondition
@@ -265,3 +271,36 @@ class Ncd_top_level_function_tests(unittest.TestCase):
         devs = self.rd.attachedDevices
         devsByName = [self.rd.deviceByName(n) for n in self.rd.devNamesToAttach]
         self.assertEqual(set(devs), set(devsByName))
+
+
+class Ncd_device_registry_tests(unittest.TestCase):
+    def setUp(self):
+        self.ncd = behaviors.MaturoNcdBehavior.MaturoNcdBehavior()
+
+    def test_many_devices_with_long_names(self):
+        for n in range(4, 13):
+            self.ncd.attach(behaviors.Axis.Axis(str(n)))
+        self.assertEqual("", self.ncd.responseFunction("LD 12 DV"))
+        self.assertIs(self.ncd.deviceByName("12"), self.ncd.currentDevice)
+        self.assertEqual(12, len(self.ncd.attachedDevices))
+
+    def test_that_an_unknown_device_is_an_error(self):
+        self.assertEqual("E - V", self.ncd.responseFunction("LD 7 DV"))
+
+    def test_attach_in_place_of_a_device(self):
+        replacement = behaviors.AntennaStand.AntennaStand("1")
+        self.ncd.attach(replacement)
+        self.assertIs(replacement, self.ncd.deviceByName("1"))
+        self.assertEqual(3, len(self.ncd.attachedDevices))
+
+    def test_detach(self):
+        current = self.ncd.currentDevice
+        current.busy = True
+        self.assertIs(current, self.ncd.detach(current.name))
+        self.assertIsNot(current, self.ncd.currentDevice)
+        self.assertFalse(self.ncd.isBusy())
+        self.assertEqual("E - V", self.ncd.responseFunction("LD %s DV" % current.name))
+
+    def test_that_device_names_must_be_unique(self):
+        with self.assertRaises(ValueError):
+            self.ncd.attachedDevices = [behaviors.Axis.Axis("1"), behaviors.Axis.Axis("1")]
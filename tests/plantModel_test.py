@@ -0,0 +1,148 @@
+import math
+import unittest
+
+import Clock
+import Climate
+import ClimateProgram
+import PlantModel
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class LagResponse_tests(unittest.TestCase):
+    def test_first_order_lag(self):
+        self.assertAlmostEqual(20, PlantModel.lagResponse(20, 80, 0, 60))
+        self.assertAlmostEqual(80 - 60 / math.e, PlantModel.lagResponse(20, 80, 60, 60))
+        self.assertAlmostEqual(80, PlantModel.lagResponse(20, 80, 6000, 60))
+
+    def test_no_time_constant(self):
+        self.assertEqual(80, PlantModel.lagResponse(20, 80, 0, 0))
+
+    def test_overshoot(self):
+        values = [PlantModel.lagResponse(0, 100, t / 10, 10, overshoot=0.2) for t in range(2000)]
+        self.assertAlmostEqual(120, max(values), places=1)
+        self.assertAlmostEqual(100, values[-1], places=3)
+
+    def test_that_an_overshoot_of_1_or_more_is_an_error(self):
+        with self.assertRaises(ValueError):
+            PlantModel.lagResponse(0, 100, 10, 10, overshoot=1)
+
+    def test_that_a_lag_follows_a_profile(self):
+        # Against the equation of motion, y'' + 2 zeta omega y' + omega**2 y = omega**2 u, integrated in small steps.
+        profile = ClimateProgram.Profile([0, 100, 150, 150, 400], [0, 50, 50, 10, 30])
+        timeConstant, overshoot = 10, 0.2
+        zeta = PlantModel.dampingRatio(overshoot)
+        omega = 1 / (zeta * timeConstant)
+        lag = PlantModel.Lag(0, 0)
+        lag.follow(profile, 3, 0, timeConstant, overshoot)
+        value, velocity, dt = 0.0, 0.0, 0.002
+        for step in range(1, 250001):
+            t = step * dt
+            acceleration = omega ** 2 * (profile.valueAt(t) + 3 - value) - 2 * zeta * omega * velocity
+            velocity += acceleration * dt
+            value += velocity * dt
+            if step % 25000 == 0:
+                self.assertAlmostEqual(value, lag.valueAt(t, timeConstant, overshoot), places=1, msg="at %s" % t)
+        self.assertAlmostEqual(33, lag.valueAt(1000, timeConstant, overshoot))
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_many_chambers_at_once(self):
+        starts = numpy.array([20.0, 20.0, -40.0])
+        targets = numpy.array([80.0, 20.0, 0.0])
+        values = PlantModel.lagResponse(starts, targets, 30.0, 60, overshoot=0.1, math=numpy)
+        for start, target, value in zip(starts, targets, values):
+            self.assertAlmostEqual(PlantModel.lagResponse(start, target, 30.0, 60, overshoot=0.1), value)
+
+
+class ChamberPlant_tests(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock.SteppedClock()
+
+    @staticmethod
+    def eCommand(temperature, humidity):
+        return "$01E %06.1f %06.1f 0050.0 0000.0 0000.0 0000.0 0000.0 " % (temperature, humidity) + 32 * "0"
+
+    def test_that_the_actual_temperature_settles(self):
+        chamber = Climate.Vc37060(clock=self.clock)
+        chamber.temperatureTimeConstant = 60
+        chamber.humidityTimeConstant = 120
+        chamber.responseFunction(self.eCommand(50, 40))
+        self.assertEqual(0, chamber.actualTemperature)
+        self.clock.advance(60)
+        self.assertAlmostEqual(53 * (1 - 1 / math.e), chamber.actualTemperature)
+        self.assertAlmostEqual(45 * (1 - 1 / math.exp(0.5)), chamber.actualHumidity)
+        self.clock.advance(6000)
+        self.assertAlmostEqual(53, chamber.actualTemperature)
+
+    def test_that_values_jump_without_time_constants(self):
+        chamber = Climate.Vc37060(clock=self.clock)
+        chamber.responseFunction(self.eCommand(50, 40))
+        self.assertEqual(53, chamber.actualTemperature)
+        self.assertEqual(45, chamber.actualHumidity)
+
+    def test_that_the_actual_temperature_follows_a_ramp(self):
+        chamber = Climate.Vc37060(clock=self.clock)
+        chamber.responseFunction("$01U 0002.0 0000.0 0000.0 0000.0")
+        chamber.responseFunction(self.eCommand(40, 0))
+        self.assertEqual(["0000.0", "0003.0"], chamber.responseFunction("$01I").split()[:2])
+        self.clock.advance(600)
+        self.assertEqual(["0020.0", "0023.0"], chamber.responseFunction("$01I").split()[:2])
+        self.clock.advance(1200)
+        self.assertEqual(["0040.0", "0043.0"], chamber.responseFunction("$01I").split()[:2])
+
+    def test_that_the_actual_temperature_lags_behind_a_ramp(self):
+        chamber = Climate.Vc37060(clock=self.clock)
+        chamber.temperatureTimeConstant = 60
+        chamber.responseFunction("$01U 0002.0 0000.0 0000.0 0000.0")
+        chamber.responseFunction(self.eCommand(40, 0))
+        self.clock.advance(1000)
+        # Settled into the ramp, one time constant, 2 K, behind the setpoint plus the offset.
+        self.assertAlmostEqual(chamber.getMovingSetpoint() + 3 - 2, chamber.actualTemperature, places=3)
+        self.clock.advance(6000)
+        self.assertAlmostEqual(43, chamber.actualTemperature)
+
+    def test_external_cabinet(self):
+        for chamberType in (Climate.Vt37060ExtCab, Climate.Vt37060ExtCabOttawa):
+            chamber = chamberType(clock=self.clock)
+            chamber.cabinetTimeConstant = 10
+            chamber.responseFunction("$01E 0020.0 0000.0 0000.0 0000.0 0000.0 0000.0 0000.0 0000.0 0000.0 " + 32 * "0")
+            self.assertEqual(24, chamber.actualTemperature)
+            self.assertEqual(0, chamber.actualCabinetTemp)
+            self.clock.advance(200)
+            self.assertAlmostEqual(20.3, chamber.actualCabinetTemp, places=3)
+
+
+class ActualValuesCache_tests(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock.SteppedClock()
+        self.chamber = Climate.Vc37060(clock=self.clock)
+
+    def test_that_an_unchanged_chamber_returns_the_cached_response(self):
+        first = self.chamber.responseFunction("$01I")
+        self.clock.advance(60)
+        self.assertIs(first, self.chamber.responseFunction("$01I"))
+        self.assertEqual(first.encoded, bytes(first + "\r", 'utf-8'))
+
+    def test_that_a_change_of_state_makes_a_new_response(self):
+        first = self.chamber.responseFunction("$01I")
+        self.chamber.fanSpeed = 60
+        self.assertEqual("0060.0", self.chamber.responseFunction("$01I").split()[4])
+        self.chamber.responseFunction(ChamberPlant_tests.eCommand(50, 40))
+        self.assertEqual("0050.0", self.chamber.responseFunction("$01I").split()[0])
+        self.assertIsNot(first, self.chamber.responseFunction("$01I"))
+
+    def test_that_the_response_follows_the_time_while_the_values_change(self):
+        self.chamber.temperatureTimeConstant = 60
+        self.chamber.responseFunction(ChamberPlant_tests.eCommand(50, 40))
+        self.clock.advance(60)
+        self.assertEqual("%06.1f" % (53 * (1 - 1 / math.e)), self.chamber.responseFunction("$01I").split()[1])
+        self.clock.advance(60)
+        self.assertEqual("%06.1f" % (53 * (1 - 1 / math.e ** 2)), self.chamber.responseFunction("$01I").split()[1])
+        self.clock.advance(6000)
+        settled = self.chamber.responseFunction("$01I")
+        self.assertEqual("0053.0", settled.split()[1])
+        self.clock.advance(60)
+        self.assertIs(settled, self.chamber.responseFunction("$01I"))
@@ -0,0 +1,150 @@
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import urllib.request
+from io import StringIO
+
+import Rack
+import socketMain
+
+
+class Assignment_tests(unittest.TestCase):
+    def test_busy_instruments_get_their_own_workers(self):
+        specifications = [{'type': 'NCD', 'name': name} for name in ("a", "b", "c", "d")]
+        rates = {"a": 100, "b": 90, "c": 5, "d": 5}
+        assignment = Rack.assignToWorkers(specifications, rates, 2)
+        names = [sorted(s['name'] for s in worker) for worker in assignment]
+        self.assertEqual([["a"], ["b", "c", "d"]], names)
+
+    def test_that_instruments_of_the_same_type_have_their_own_rates(self):
+        specifications = [{'type': 'NCD', 'port': port} for port in (2000, 2001, 2002)]
+        rates = {"NCD:2000": 100, "NCD:2001": 90, "NCD:2002": 5}
+        assignment = Rack.assignToWorkers(specifications, rates, 2)
+        ports = [sorted(s['port'] for s in worker) for worker in assignment]
+        self.assertEqual([[2000], [2001, 2002]], ports)
+
+    def test_that_no_worker_is_left_without_instruments(self):
+        assignment = Rack.assignToWorkers([{'type': 'NCD'}], {}, 4)
+        self.assertEqual([[{'type': 'NCD'}]], assignment)
+
+
+class QueueWriter_tests(unittest.TestCase):
+    def test_that_complete_lines_are_sent(self):
+        class Messages(list):
+            put = list.append
+
+        messages = Messages()
+        writer = Rack.QueueWriter(messages, 3)
+        print("one", file=writer)
+        writer.write("two\nthr")
+        self.assertEqual([('log', 3, "one"), ('log', 3, "two")], messages)
+
+
+class Supervisor_tests(unittest.TestCase):
+    def setUp(self):
+        self.stdOutSave = sys.stdout
+        sys.stdout = StringIO()
+        self.directory = tempfile.TemporaryDirectory()
+        self.ratesPath = os.path.join(self.directory.name, "rates.json")
+        specifications = [{'type': 'NCD', 'port': 0}, {'type': 'Vc37060', 'port': 0}]
+        self.supervisor = Rack.Supervisor(specifications, socketMain.makeInstrument, 2, self.ratesPath,
+                                          reportInterval=0.1, metricsPort=0)
+        self.supervisor.restartDelay = 0
+        self.error = None
+        self.thread = threading.Thread(target=self.runSupervisor)
+        self.thread.start()
+
+    def runSupervisor(self):
+        try:
+            self.supervisor.run()
+        except RuntimeError as error:
+            self.error = error
+
+    def tearDown(self):
+        self.supervisor.stop()
+        self.thread.join()
+        sys.stdout = self.stdOutSave
+        self.directory.cleanup()
+
+    def waitFor(self, condition):
+        deadline = time.monotonic() + 10
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "Timed out")
+            time.sleep(0.05)
+
+    def port(self, name):
+        return next(entry['port'] for ports in self.supervisor.ports.values() for entry in ports
+                    if entry['name'] == name)
+
+    def query(self, port, command):
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as s:
+            s.sendall(command)
+            return s.recv(100)
+
+    def test_instruments_are_served_and_rates_are_measured(self):
+        self.waitFor(lambda: len(self.supervisor.ports) == 2)
+        self.assertEqual(b"Maturo,NCD_266\r", self.query(self.port("NCD"), b"*IDN?\r\n"))
+        self.waitFor(lambda: self.supervisor.rates.get("NCD:0", 0) > 0)
+        self.supervisor.stop()
+        self.thread.join()
+        with open(self.ratesPath) as f:
+            self.assertGreater(json.load(f)["NCD:0"], 0)
+
+    def test_that_an_exited_worker_is_restarted(self):
+        self.waitFor(lambda: len(self.supervisor.ports) == 2)
+        self.supervisor.workers[0].kill()
+        self.waitFor(lambda: self.supervisor.restartCount == 1 and len(self.supervisor.ports) == 2)
+        name = self.supervisor.assignment[0][0]['type']
+        self.assertTrue(self.query(self.port(name), b"*IDN?\r\n"))
+
+    def test_that_the_metrics_of_all_workers_are_served(self):
+        self.waitFor(lambda: len(self.supervisor.ports) == 2)
+        self.query(self.port("NCD"), b"CP\r\n")
+        self.waitFor(lambda: any(m.commands for m in self.supervisor.allMetrics()))
+        url = "http://127.0.0.1:%d/metrics" % self.supervisor.metricsServer.server_address[1]
+        with urllib.request.urlopen(url, timeout=5) as response:
+            text = response.read().decode()
+        self.assertIn('socketinstrument_commands_total{instrument="NCD",command="CP_response"} 1', text)
+        self.assertIn('socketinstrument_connections{instrument="Vc37060"}', text)
+
+    def test_that_a_worker_that_keeps_exiting_stops_the_rack(self):
+        self.supervisor.maxRestarts = 1
+        self.waitFor(lambda: len(self.supervisor.ports) == 2)
+        self.supervisor.workers[0].kill()
+        self.waitFor(lambda: self.supervisor.restartCount == 1 and len(self.supervisor.ports) == 2)
+        self.supervisor.workers[0].kill()
+        self.thread.join(10)
+        self.assertIn("1 restarts in a row", str(self.error))
+
+
+class BringUp_tests(unittest.TestCase):
+    def setUp(self):
+        self.stdErrSave = sys.stderr
+        sys.stderr = StringIO()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        sys.stderr = self.stdErrSave
+        self.directory.cleanup()
+
+    def test_that_a_worker_that_fails_to_start_stops_the_rack(self):
+        specifications = [{'type': 'NCD', 'port': 0, 'parameters': {'noSuchParameter': 1}}]
+        supervisor = Rack.Supervisor(specifications, socketMain.makeInstrument, 1)
+        with self.assertRaisesRegex(RuntimeError, "before it served its instruments"):
+            supervisor.run()
+        self.assertEqual(0, supervisor.restartCount)
+
+    def test_that_the_bench_is_checked_before_the_workers_start(self):
+        path = os.path.join(self.directory.name, "bench.json")
+        with open(path, 'w') as f:
+            json.dump({'instruments': [{'type': 'NCD', 'parameters': {'noSuchParameter': 1}}]}, f)
+        sys.argv = ["", "--topology", path, "--rack", "2"]
+        with self.assertRaises(SystemExit) as exit:
+            socketMain.main()
+        self.assertEqual(2, exit.exception.code)  # As from parser.error
+        self.assertIn("noSuchParameter", sys.stderr.getvalue())
@@ -0,0 +1,62 @@
+import unittest
+
+import Clock
+import Topology
+from Communicator import EncodedResponse
+from behaviors.MaturoNcdBehavior import MaturoNcdBehavior
+
+
+class ResponseCache_tests(unittest.TestCase):
+    def setUp(self):
+        self.previousClock = Clock.defaultClock
+        self.clock = Clock.SteppedClock()
+        Clock.setDefaultClock(self.clock)
+        self.ncd = MaturoNcdBehavior()
+        self.ncd.queryCacheQuantum = 0.01
+
+    def tearDown(self):
+        Clock.setDefaultClock(self.previousClock)
+
+    def test_that_polls_within_a_quantum_are_answered_from_the_cache(self):
+        first = self.ncd.responseFunction("CP")
+        self.assertIs(EncodedResponse, type(first))
+        self.assertIs(first, self.ncd.responseFunction("CP"))
+        self.clock.advance(0.01)
+        self.assertIsNot(first, self.ncd.responseFunction("CP"))
+        self.assertEqual({'CP_response': 1}, dict(self.ncd.queryCache.hits))
+        self.assertEqual({'CP_response': 2}, dict(self.ncd.queryCache.misses))
+
+    def test_that_the_cache_keeps_only_the_current_quantum(self):
+        first = self.ncd.responseFunction("CP")
+        self.assertIs(first, self.ncd.responseFunction("CP   "))
+        self.ncd.responseFunction("LD 1 DV")
+        self.ncd.responseFunction("CP")
+        self.ncd.responseFunction("BU")
+        self.assertEqual(2, len(self.ncd.queryCache.responses))
+        self.clock.advance(0.01)
+        self.ncd.responseFunction("CP")
+        self.assertEqual(1, len(self.ncd.queryCache.responses))
+
+    def test_that_commands_invalidate_the_cache(self):
+        self.ncd.responseFunction("LD 1 DV")
+        self.assertEqual("0", self.ncd.responseFunction("BU"))
+        self.ncd.responseFunction("LD 20 DG NP GO")
+        self.assertEqual("1", self.ncd.responseFunction("BU"))
+        self.clock.advance(3600)
+        self.assertEqual("0", self.ncd.responseFunction("BU"))
+        self.assertEqual("20", self.ncd.responseFunction("CP"))
+
+    def test_that_the_cache_is_opt_in(self):
+        ncd = MaturoNcdBehavior()
+        self.assertEqual(0, ncd.queryCacheQuantum)
+        self.assertIsNot(EncodedResponse, type(ncd.responseFunction("CP")))
+        self.ncd.queryCacheQuantum = 0
+        self.assertIsNone(self.ncd.queryCache)
+
+    def test_query_cache_in_a_topology(self):
+        ncd = Topology.configure(MaturoNcdBehavior(), {'type': 'NCD', 'queryCache': 0.002})
+        self.assertEqual(0.002, ncd.queryCacheQuantum)
+
+
+if __name__ == '__main__':
+    unittest.main()
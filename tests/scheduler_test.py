@@ -0,0 +1,90 @@
+import unittest
+
+import Clock
+import Scheduler
+from behaviors.Axis import Axis
+from behaviors.MaturoNcdBehavior import MaturoNcdBehavior
+
+
+class Scheduler_tests(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock.SteppedClock()
+        self.scheduler = Scheduler.Scheduler(self.clock)
+        self.fired = []
+
+    def test_events_run_in_time_order_when_due(self):
+        self.scheduler.at(2, lambda: self.fired.append("second"))
+        self.scheduler.at(1, lambda: self.fired.append("first"))
+        self.scheduler.at(5, lambda: self.fired.append("later"))
+        self.clock.advance(3)
+        self.assertEqual(self.scheduler.runDue(), 2)
+        self.assertEqual(self.fired, ["first", "second"])
+        self.assertEqual(self.scheduler.nextTime(), 5)
+
+    def test_an_event_runs_once(self):
+        self.scheduler.after(1, lambda: self.fired.append("done"))
+        self.clock.advance(1)
+        self.scheduler.runDue()
+        self.scheduler.runDue()
+        self.assertEqual(self.fired, ["done"])
+
+    def test_cancelled_events_do_not_run(self):
+        event = self.scheduler.after(1, lambda: self.fired.append("cancelled"))
+        event.cancel()
+        self.clock.advance(2)
+        self.assertEqual(self.scheduler.runDue(), 0)
+        self.assertIsNone(self.scheduler.nextTime())
+
+    def test_scheduler_is_shared_per_clock(self):
+        self.assertIs(Scheduler.schedulerFor(self.clock), Scheduler.schedulerFor(self.clock))
+        self.assertIsNot(Scheduler.schedulerFor(self.clock), Scheduler.schedulerFor(Clock.SteppedClock()))
+
+
+class MovementCompletion_tests(unittest.TestCase):
+    def setUp(self):
+        self.previousClock = Clock.defaultClock
+        self.clock = Clock.SteppedClock()
+        Clock.setDefaultClock(self.clock)
+
+    def tearDown(self):
+        Clock.setDefaultClock(self.previousClock)
+
+    def test_movement_ends_without_update(self):
+        axis = Axis('1')
+        axis.speedInDegPerSecond = 10
+        axis.start_movement(40)  # 5 s at 0.8 * 10 deg/s
+        self.clock.advance(5)
+        axis.scheduler.runDue()
+        self.assertFalse(axis.busy)
+        self.assertEqual(axis.currentPosition, 40)
+
+    def test_a_new_movement_replaces_the_scheduled_end(self):
+        axis = Axis('1')
+        axis.speedInDegPerSecond = 10
+        axis.start_movement(8)
+        axis.start_movement(80)
+        self.clock.advance(2)
+        axis.scheduler.runDue()
+        self.assertTrue(axis.busy)
+
+    def test_device_that_is_not_current_stops_being_busy(self):
+        ncd = MaturoNcdBehavior()
+        ncd.responseFunction("LD 1 DV")
+        ncd.responseFunction("LD 10 DG NP GO")
+        ncd.responseFunction("LD 3 DV")
+        self.assertEqual(ncd.responseFunction("BU"), "1")
+        self.clock.advance(3600)
+        self.assertEqual(ncd.responseFunction("BU"), "0")
+        self.assertEqual(ncd.deviceByName('1').currentPosition, 10)
+
+    def test_stop_keeps_the_position_reached(self):
+        ncd = MaturoNcdBehavior()
+        ncd.responseFunction("LD 1 DV")
+        device = ncd.currentDevice
+        device.speedInDegPerSecond = 10
+        ncd.responseFunction("LD 80 DG NP GO")
+        self.clock.advance(5)
+        ncd.responseFunction("ST")
+        self.clock.advance(3600)
+        self.assertEqual(ncd.responseFunction("BU"), "0")
+        self.assertAlmostEqual(device.currentPosition, 40)
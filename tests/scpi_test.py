@@ -0,0 +1,131 @@
+import unittest
+
+import Amplifier
+import Scpi
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def set(self, parameters, suffixes):
+        self.calls.append(("set", parameters, suffixes))
+        return ""
+
+    def query(self, parameters, suffixes):
+        self.calls.append(("query", parameters, suffixes))
+        return "q%d" % len(self.calls)
+
+
+class ScpiCommandTree_tests(unittest.TestCase):
+    def setUp(self):
+        self.tree = Scpi.ScpiCommandTree()
+        self.tree.add("SENSe:NPOWer?", Recorder.query)
+        self.tree.add("SENSe:NFRequency?", Recorder.query)
+        self.tree.add("[SOURce]:FREQuency", Recorder.set, [Scpi.quantity("Hz")])
+        self.tree.add("OUTPut#:STATe", Recorder.set, [Scpi.boolean])
+        self.tree.add("UNIT:POWer", Recorder.set, [Scpi.discrete("DBM", "Watt")])
+        self.tree.add("SYSTem:ERRor[:NEXT]?", Recorder.query)
+        self.tree.add("*IDN?", Recorder.query)
+        self.recorder = Recorder()
+
+    def execute(self, message):
+        return self.tree.execute(message, self.recorder)
+
+    def test_short_and_long_forms_in_any_case(self):
+        for message in ["SENS:NPOW?", "SENSE:NPOWER?", "sense:npow?", "Sens:NPower?"]:
+            self.execute(message)
+        self.assertEqual(4, len(self.recorder.calls))
+
+    def test_that_other_abbreviations_are_undefined(self):
+        with self.assertRaises(Scpi.ScpiError) as context:
+            self.execute("SEN:NPOW?")
+        self.assertEqual(-113, context.exception.code)
+
+    def test_optional_mnemonics(self):
+        self.execute("FREQ 1e9")
+        self.execute("SOUR:FREQ 2 GHz")
+        self.execute("SYST:ERR:NEXT?")
+        self.execute("SYST:ERR?")
+        self.assertEqual([("set", [1e9], []), ("set", [2e9], [])], self.recorder.calls[:2])
+        self.assertEqual(4, len(self.recorder.calls))
+
+    def test_units(self):
+        for text, value in [("2.5e3", 2500), ("2 GHz", 2e9), ("3 MHz", 3e6), ("5khz", 5e3), ("7 HZ", 7)]:
+            self.assertEqual(value, Scpi.quantity("Hz")(text), text)
+        self.assertEqual(0.5, Scpi.quantity("V")("500 mV"))
+        self.assertEqual(2e6, Scpi.quantity("V")("2 MAV"))
+        for text in ("2 GV", "2 G", "2 XHz"):
+            with self.assertRaises(Scpi.ScpiError) as context:
+                Scpi.quantity("Hz")(text)
+            self.assertEqual(-131, context.exception.code)
+        with self.assertRaises(Scpi.ScpiError):
+            Scpi.numeric("2 Hz")
+
+    def test_numeric_suffixes(self):
+        self.execute("OUTP2:STAT ON")
+        self.execute("OUTP:STAT OFF")
+        self.assertEqual([("set", [True], [2]), ("set", [False], [1])], self.recorder.calls)
+
+    def test_discrete_parameters(self):
+        self.execute("UNIT:POW watt")
+        self.assertEqual([("set", ["W"], [])], self.recorder.calls)
+        with self.assertRaises(Scpi.ScpiError):
+            self.execute("UNIT:POW VOLT")
+
+    def test_parameter_count(self):
+        with self.assertRaises(Scpi.ScpiError):
+            self.execute("FREQ")
+        with self.assertRaises(Scpi.ScpiError):
+            self.execute("FREQ 1,2")
+
+    def test_compound_message_with_relative_headers(self):
+        response = self.execute("SENS:NPOW?;NFR?;*IDN?;NPOW?;:SYST:ERR?")
+        self.assertEqual("q1;q2;q3;q4;q5", response)
+
+    def test_that_a_relative_header_needs_the_right_path(self):
+        with self.assertRaises(Scpi.ScpiError):
+            self.execute("SENS:NPOW?;ERR?")
+
+    def test_that_errors_are_queued_and_the_other_commands_executed(self):
+        errors = []
+        response = self.tree.execute("SENS:NPOW? 3;NFR?;*IDN?;:FREQ", self.recorder, errors)
+        self.assertEqual("q1;q2", response)
+        self.assertEqual(['-108,"Parameter not allowed"', '-109,"Missing parameter"'], errors)
+
+
+class PaRsBBA150_tests(unittest.TestCase):
+    def setUp(self):
+        self.amplifier = Amplifier.PaRsBBA150()
+
+    def test_identity(self):
+        self.assertEqual("Rohde & Schwarz,simulated BBA150,102044,SW:01.96,FPGA:01.05",
+                         self.amplifier.responseFunction("*IDN?"))
+
+    def test_long_and_lower_case_forms(self):
+        self.assertEqual("47.7", self.amplifier.responseFunction("SENSe:NPOWer?"))
+        self.assertEqual("47.7", self.amplifier.responseFunction("sens:npow?"))
+        self.assertEqual("47.7", self.amplifier.responseFunction("CONT1:AMOD:FGA?"))
+
+    def test_compound_message(self):
+        response = self.amplifier.responseFunction("UNIT:POW DBM;:SENS:NFR?;NPOW?")
+        self.assertEqual("2600000000,5900000000;47.7", response)
+
+    def test_power_unit(self):
+        self.assertEqual("", self.amplifier.responseFunction("unit:power w"))
+        self.assertEqual("W", self.amplifier.responseFunction("UNIT:POW?"))
+
+    def test_unknown_commands(self):
+        self.assertEqual("example BBS150 response value for 'OUTP:STAT?'",
+                         self.amplifier.responseFunction("OUTP:STAT?"))
+        self.assertEqual("", self.amplifier.responseFunction("OUTP:STAT ON"))
+
+    def test_that_errors_are_queued(self):
+        self.assertEqual("", self.amplifier.responseFunction("UNIT:POW VOLT"))
+        self.assertEqual('-224,"Illegal parameter value"', self.amplifier.responseFunction("SYST:ERR?"))
+        self.assertEqual("Simulated error", self.amplifier.responseFunction("SYST:ERR?"))
+
+    def test_that_an_error_keeps_the_other_responses(self):
+        self.assertEqual("Rohde & Schwarz,simulated BBA150,102044,SW:01.96,FPGA:01.05",
+                         self.amplifier.responseFunction("SENS:NPOW? 3;*IDN?"))
+        self.assertEqual('-108,"Parameter not allowed"', self.amplifier.responseFunction("SYST:ERR?"))
@@ -95,14 +95,23 @@ class main_Tests(unittest.TestCase):
         instrument = socketMain.instrumentTypeArgument()
         self.assertIsInstance(instrument, Climate.Vt37060ExtCabOttawa)
 
+    def test_several_instruments_with_ports(self):
+        sys.argv = ["", "NCD:2200", "BBA150:2201"]
+        ncd, amplifier = socketMain.instrumentsArgument()
+        self.assertIsInstance(amplifier, Amplifier.PaRsBBA150)
+        self.assertEqual(ncd.communicator.port, 2200)
+        self.assertEqual(amplifier.communicator.port, 2201)
 
+    def test_that_instruments_on_the_same_port_raise_SystemExit(self):
+        sys.argv = ["", "Vc37060", "Vt37060ExtCab"]
+        self.assertRaises(SystemExit, socketMain.instrumentsArgument)
+
+    def test_that_an_invalid_port_raises_SystemExit(self):
+        sys.argv = ["", "NCD:x"]
+        self.assertRaises(SystemExit, socketMain.instrumentsArgument)
 
-class function_Tests(unittest.TestCase):
-    def test_extraction_of_number_from_command(self):
-        command = "LD -123.3 DG NP GO"
-        number = behaviors.InncoBehavior.InncoBehavior.numberFromInncoCommand(command)
-        self.assertEqual(number, -123.3)
 
+class function_Tests(unittest.TestCase):
     def test_prettyprinting_nonprints(self):
         sample = ".\n.\r."
         expected = ".<LF>.<CR>."
@@ -110,6 +119,22 @@ class function_Tests(unittest.TestCase):
         self.assertEqual(actual, expected)
 
 
+class StaticResponse_Tests(unittest.TestCase):
+    def test_that_static_responses_are_encoded_once(self):
+        amplifier = Amplifier.PaRsBBA150()
+        first = amplifier.responseFunction("*IDN?")
+        second = amplifier.responseFunction("*idn?")
+        self.assertIs(first, second)
+        self.assertEqual(b"Rohde & Schwarz,simulated BBA150,102044,SW:01.96,FPGA:01.05\r", first.encoded)
+
+    def test_that_the_help_text_is_encoded_once(self):
+        chamber = Climate.Vc37060()
+        helpText = chamber.responseFunction("$01?")
+        self.assertIs(helpText, Climate.Vc37060().responseFunction("$01?"))
+        self.assertTrue(helpText.encoded.endswith(b"\r"))
+        self.assertIn("\r\n", helpText)
+
+
 class AntennaStandTests(unittest.TestCase):
     def setUp(self):
         self.dev = behaviors.AntennaStand.AntennaStand("someName")
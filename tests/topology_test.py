@@ -0,0 +1,134 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from io import StringIO
+
+import Climate
+import Topology
+import socketMain
+from behaviors.MaturoNcdBehavior import MaturoNcdBehavior
+
+exampleTopology = os.path.join(os.path.dirname(__file__), "..", "instruments", "Bench.toml")
+
+
+class Topology_tests(unittest.TestCase):
+    def test_example_topology(self):
+        specifications = Topology.loadTopology(exampleTopology)
+        self.assertEqual(["NCD", "RotaryDisc", "Vc37060", "Generic"], [s['type'] for s in specifications])
+        self.assertTrue(os.path.isabs(specifications[3]['description']))
+
+    def test_configure(self):
+        ncd = Topology.configure(MaturoNcdBehavior(), {
+            'type': 'NCD', 'name': 'turntable', 'port': 2200,
+            'parameters': {'offset': 1.5},
+            'devices': {1: {'speedInDegPerSecond': 3}},
+            'commands': ["LD 1 DV"],
+        })
+        self.assertEqual("turntable", ncd.name)
+        self.assertEqual(2200, ncd.communicator.port)
+        self.assertEqual(1.5, ncd.offset)
+        self.assertEqual(3, ncd.deviceByName('1').speedInDegPerSecond)
+        self.assertIs(ncd.deviceByName('1'), ncd.currentDevice)
+
+    def test_that_unknown_parameters_are_errors(self):
+        with self.assertRaises(ValueError):
+            Topology.configure(Climate.Vc37060(), {'type': 'Vc37060', 'parameters': {'ofset': 1}})
+        with self.assertRaises(ValueError):
+            Topology.configure(Climate.Vc37060(), {'type': 'Vc37060', 'devices': {'1': {'speed': 1}}})
+
+    def test_that_overshoots_must_be_below_1(self):
+        for overshoot in (-0.1, 1, 1.5):
+            with self.assertRaises(ValueError):
+                Topology.configure(Climate.Vt37060ExtCab(), {'type': 'Vt37060ExtCab',
+                                                             'parameters': {'cabinetOvershoot': overshoot}})
+        chamber = Topology.configure(Climate.Vc37060(), {'type': 'Vc37060',
+                                                         'parameters': {'temperatureOvershoot': 0.2}})
+        self.assertEqual(0.2, chamber.temperatureOvershoot)
+
+    def test_bring_up_keeps_the_order(self):
+        specifications = [{'type': 'NCD', 'port': 0}, {'type': 'Vc37060', 'port': 0}, {'type': 'NCD', 'port': 0}]
+        instruments = Topology.bringUp(specifications, socketMain.makeInstrument)
+        self.assertEqual(["NCD", "Vc37060", "NCD"], [instrument.name for instrument in instruments])
+        self.assertIsNot(instruments[0], instruments[2])
+
+    def test_port_report(self):
+        instrument = Climate.Vc37060()
+        instrument.port = 0
+        with instrument.communicator.openListeningSocket() as s:
+            report = json.loads(Topology.portReport([instrument], [s]))
+            self.assertEqual([{'name': 'Vc37060', 'port': s.getsockname()[1]}], report['instruments'])
+
+
+class TopologyArgument_tests(unittest.TestCase):
+    def setUp(self):
+        self.stdErrSave = sys.stderr
+        sys.stderr = StringIO()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "bench.json")
+
+    def tearDown(self):
+        sys.stderr = self.stdErrSave
+        self.directory.cleanup()
+
+    def writeTopology(self, topology):
+        with open(self.path, 'w') as f:
+            json.dump(topology, f)
+
+    def test_topology_and_arguments_together(self):
+        self.writeTopology({'instruments': [{'type': 'Vc37060', 'port': 2300, 'parameters': {'chamberTempOffset': 1}}]})
+        sys.argv = ["", "NCD:2301", "--topology", self.path]
+        ncd, chamber = socketMain.instrumentsArgument()
+        self.assertEqual(2301, ncd.port)
+        self.assertEqual(1, chamber.chamberTempOffset)
+
+    def test_that_a_bad_topology_raises_SystemExit(self):
+        self.writeTopology({'instruments': [{'type': 'Vc37060', 'parameters': {'noSuchParameter': 1}}]})
+        sys.argv = ["", "--topology", self.path]
+        self.assertRaises(SystemExit, socketMain.instrumentsArgument)
+
+    def test_chamber_sections_of_a_bus(self):
+        program = os.path.join(os.path.dirname(exampleTopology), "ClimateCycle.toml")
+        self.writeTopology({'instruments': [{'type': 'VotschBus', 'name': 'bus', 'chambers': ['Vc37060', 'Vc37060'],
+                                             'chamber': [{'address': 2, 'program': program,
+                                                          'parameters': {'chamberTempOffset': 1}}]}]})
+        bus, = Topology.bringUp(Topology.loadTopology(self.path), socketMain.makeInstrument)
+        self.assertEqual(Climate.Vc37060().chamberTempOffset, bus.chamber(1).chamberTempOffset)
+        self.assertIsNone(bus.chamber(1).programStep)
+        self.assertEqual(1, bus.chamber(2).chamberTempOffset)
+        self.assertIsNotNone(bus.chamber(2).programStep)
+        self.assertEqual("bus", bus.name)
+
+    def test_that_a_chamber_section_needs_a_chamber_at_its_address(self):
+        for specification in ({'type': 'VotschBus', 'chamber': [{'address': 3}]},
+                              {'type': 'Vc37060', 'chamber': [{'address': 1}]}):
+            with self.assertRaises(ValueError):
+                Topology.bringUp([specification], socketMain.makeInstrument)
+
+    def test_that_no_instruments_raises_SystemExit(self):
+        sys.argv = [""]
+        self.assertRaises(SystemExit, socketMain.instrumentsArgument)
+
+
+class Port_tests(unittest.TestCase):
+    def test_that_the_port_is_the_communicator_port(self):
+        chamber = Climate.Vc37060()
+        chamber.port = 2400
+        self.assertEqual(2400, chamber.communicator.port)
+
+
+class DeviceTopology_tests(unittest.TestCase):
+    def test_attach_and_detach_devices(self):
+        ncd = Topology.configure(MaturoNcdBehavior(), {
+            'type': 'NCD', 'detach': ['3'],
+            'devices': {'8': {'type': 'Axis', 'speedInDegPerSecond': 2}, '9': {'type': 'AntennaStand'}},
+        })
+        self.assertEqual(['1', '0', '8', '9'], [device.name for device in ncd.attachedDevices])
+        self.assertEqual(2, ncd.deviceByName('8').speedInDegPerSecond)
+        self.assertEqual("", ncd.responseFunction("LD 9 DV"))
+        self.assertEqual("", ncd.responseFunction("PV"))
+
+    def test_that_unknown_device_types_are_errors(self):
+        with self.assertRaises(ValueError):
+            Topology.configure(MaturoNcdBehavior(), {'type': 'NCD', 'devices': {'8': {'type': 'Laser'}}})
@@ -1,6 +1,7 @@
 import unittest
 import time
 import Climate
+import Clock
 
 
 class vc3_Tests(unittest.TestCase):
@@ -165,7 +166,28 @@ class vc3_Tests(unittest.TestCase):
         t3, h = self.temp_hum_nom()
         self.assertEqual(t3, tgoal, "Temperature should have reached %d by now" % tgoal)
 
-    # TODO: Test down temp ramping
+    def test_that_temperature_is_ramped_down(self):
+        clock = Clock.SteppedClock()
+        self.chamber = Climate.Vc37060(clock=clock)
+        self.chamber.responseFunction(self.cmd_for_set(40))
+        self.chamber.responseFunction("$01U 0000.0 0002.0 0000.0 0000.0")  # Down slope 2 deg per minute
+        self.chamber.responseFunction(self.cmd_for_set(20))
+        clock.advance(300)
+        self.assertEqual((30, 0), self.temp_hum_nom())
+        clock.advance(300)
+        self.assertEqual((20, 0), self.temp_hum_nom())
+        clock.advance(300)
+        self.assertEqual((20, 0), self.temp_hum_nom())
+
+    def test_that_humidity_is_ramped(self):
+        clock = Clock.SteppedClock()
+        self.chamber = Climate.Vc37060(clock=clock)
+        self.chamber.responseFunction("$01U 0000.0 0000.0 0001.0 0000.0")  # Up slope 1 % per minute
+        self.chamber.responseFunction(self.cmd_for_set(20, 60))
+        clock.advance(1800)
+        self.assertEqual((20, 30), self.temp_hum_nom())
+        clock.advance(3600)
+        self.assertEqual((20, 60), self.temp_hum_nom())
 
     @unittest.skip("Test not done.")
     def QQtest_positive_temp_slope(self):
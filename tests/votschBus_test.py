@@ -0,0 +1,34 @@
+import unittest
+
+import Climate
+
+
+class VotschBus_tests(unittest.TestCase):
+    def setUp(self):
+        self.bus = Climate.VotschBus.ofTypes(['Vc37060', 'Vt37060ExtCab', 'Vc37060'])
+
+    def test_that_each_address_has_its_own_chamber(self):
+        self.bus.responseFunction("$02E 0040.0 0000.0 0000.0 0050.0 0000.0 0000.0 0000.0 0000.0 0000.0 " + 32 * "0")
+        self.bus.responseFunction("$03E 0021.5 0030.0 0050.0 0000.0 0000.0 0000.0 0000.0 " + 32 * "0")
+        self.assertEqual("0000.0", self.bus.responseFunction("$01I").split()[0])
+        self.assertEqual(16 + 1, len(self.bus.responseFunction("$02I").split()))
+        self.assertEqual("0040.0", self.bus.responseFunction("$02I").split()[0])
+        self.assertEqual("0021.5", self.bus.responseFunction("$03I").split()[0])
+        self.assertEqual(21.5, self.bus.chamber(3).nominalTemp)
+
+    def test_unknown_addresses(self):
+        self.assertEqual("'$04I' is an unknown command.", self.bus.responseFunction("$04I"))
+        self.assertEqual("'$01X' is an unknown command.", self.bus.responseFunction("$01X"))
+
+    def test_that_a_chamber_only_answers_its_own_address(self):
+        self.assertEqual("'$02I' is an unknown command.", self.bus.chamber(1).responseFunction("$02I"))
+
+    def test_bus_addresses(self):
+        self.assertRaises(ValueError, self.bus.connect, Climate.Vc37060(), 33)
+        self.assertRaises(ValueError, Climate.VotschBus.ofTypes, ['Vx'])
+        self.bus.connect(Climate.Vc37060(), 32)
+        self.assertEqual("$32", self.bus.chamber(32).address)
+
+
+if __name__ == '__main__':
+    unittest.main()